@@ -1,5 +1,5 @@
 -- Drop existing tables to avoid conflicts (if re-running this script)
-DROP TABLE IF EXISTS MemberSchedule, Payments, EquipmentMaintenance, FitnessClasses, HealthMetrics, FitnessGoals, Members, Trainers, Rooms, AdministrativeStaff CASCADE;
+DROP TABLE IF EXISTS SchemaMigrations, TrainerUnavailability, MemberSchedule, Payments, EquipmentMaintenance, FitnessClasses, HealthMetrics, FitnessGoals, Members, Trainers, Rooms, AdministrativeStaff CASCADE;
 
 -- AdministrativeStaff Table for a single admin user
 CREATE TABLE AdministrativeStaff (
@@ -24,7 +24,7 @@ CREATE TABLE Trainers (
     Email VARCHAR(255) UNIQUE NOT NULL,
     Password VARCHAR(255),
     Specialization VARCHAR(255) CHECK (Specialization IN ('Weight Loss', 'Strength', 'Cardio', 'Yoga', 'Swimming', 'Rehab', 'Health')),
-    UnavailableTimes VARCHAR(255) DEFAULT NULL;
+    UnavailableTimes VARCHAR(255) DEFAULT NULL
 );
 
 -- FitnessGoals Table
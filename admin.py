@@ -1,18 +1,26 @@
-from utils import format_datetime_for_postgres, is_equipment_under_maintenance, is_trainer_available, fetch_trainers_by_specialization, prompt_for_integer, get_date_time_input, get_duration, get_session_type
+from utils import format_datetime_for_postgres, is_equipment_under_maintenance, is_trainer_available, fetch_trainers_by_specialization, prompt_for_integer, get_date_time_input, get_duration, get_session_type, prompt_for_optional_date, prompt_for_optional_choice
 from datetime import datetime, timedelta
 import logging
 from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index
+from dashboard_cache import dashboard_cache
+from billing import process_payments_batch, print_payment_summary
+from metrics import record_booking
+import calendar
 
 
 # Database instance
 db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
 
-# Setup logging configuration
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 
 #################################################### Room Booking Management Section ###################################################
 
+ROOM_AVAILABILITY_QUERY = """
+SELECT COUNT(*) FROM FitnessClasses
+WHERE RoomID = %s AND (StartTime, EndTime) OVERLAPS (%s, %s) AND Status != 'Cancelled';
+"""
+
+
 def check_room_availability(room_id, start_datetime_str, duration):
     """
     Checks if a room is available for a fitness class at the given time.
@@ -25,21 +33,19 @@ def check_room_availability(room_id, start_datetime_str, duration):
     Returns:
         bool: True if the room is available, False otherwise.
     """
-    if is_equipment_under_maintenance(db, start_datetime_str, duration):
+    if is_equipment_under_maintenance(start_datetime_str, duration):
         logging.info("Room scheduling conflict due to equipment maintenance.")
         return False
 
     start_time = datetime.strptime(format_datetime_for_postgres(start_datetime_str), '%Y-%m-%d %H:%M:%S')
     end_time = start_time + timedelta(minutes=duration)
 
-    query = """
-    SELECT COUNT(*) FROM FitnessClasses
-    WHERE RoomID = %s AND (StartTime, EndTime) OVERLAPS (%s, %s) AND Status != 'Cancelled';
-    """
-    params = (room_id, start_time, end_time)
-    result = db.execute_query(query, params, fetch=True)
-
-    available = result[0][0] == 0
+    if schedule_index.loaded:
+        available = not schedule_index.room_booked(room_id, start_time, end_time)
+    else:
+        params = (room_id, start_time, end_time)
+        result = db.execute_query(ROOM_AVAILABILITY_QUERY, params, fetch=True)
+        available = result[0][0] == 0
     logging.info(f"Room {room_id} availability check: {available}")
     return available
 
@@ -71,9 +77,10 @@ def schedule_equipment_maintenance(start_datetime_str, duration):
         if not check_for_overlapping_bookings(start_time, end_time):
             insert_query = """
             INSERT INTO EquipmentMaintenance (MaintenanceSchedule, Duration, Status)
-            VALUES (%s, %s, 'Scheduled');
+            VALUES (%s, %s, 'Scheduled') RETURNING MaintenanceID;
             """
-            db.execute_query(insert_query, (start_time, duration))
+            maintenance_id = db.execute_query(insert_query, (start_time, duration), fetch=True)[0][0]
+            schedule_index.add_maintenance(maintenance_id, start_time, end_time)
             return "Maintenance scheduled successfully."
         else:
             return "Cannot schedule maintenance due to conflicting bookings."
@@ -86,6 +93,9 @@ def check_for_overlapping_bookings(start_time, end_time):
     """
     Checks for overlapping fitness classes and personal training sessions that might use the equipment.
     """
+    if schedule_index.loaded:
+        return schedule_index.sessions_overlap(start_time, end_time)
+
     query_classes = """
         SELECT COUNT(*) FROM FitnessClasses
         WHERE (StartTime, EndTime) OVERLAPS (%s, %s) AND ClassName IN ('Yoga', 'Swimming', 'Strength', 'Cardio') AND Status != 'Cancelled';
@@ -123,9 +133,19 @@ def update_maintenance_status(maintenance_id, new_status):
         query = """
         UPDATE EquipmentMaintenance
         SET Status = %s
-        WHERE MaintenanceID = %s;
+        WHERE MaintenanceID = %s
+        RETURNING MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration;
         """
-        db.execute_query(query, (new_status, maintenance_id))
+        # execute_query returns None when the update fails, so the index only follows a row that really changed
+        result = db.execute_query(query, (new_status, maintenance_id), fetch=True)
+        if result is None:
+            return "Error updating maintenance status."
+        if not result:
+            return "Maintenance record not found."
+        if new_status == 'Scheduled':
+            schedule_index.add_maintenance(maintenance_id, result[0][0], result[0][1])
+        else:
+            schedule_index.remove_maintenance(maintenance_id)
         return f"Maintenance status updated to {new_status} successfully."
     except Exception as e:
         logging.error(f"Failed to update maintenance status: {e}")
@@ -149,9 +169,16 @@ def schedule_fitness_class(class_name, room_id, trainer_id, start_datetime_str,
     Returns:
         str: Status message indicating the outcome of the scheduling attempt.
     """
-    if not is_trainer_available(trainer_id, start_datetime_str, duration, "Group Class") or \
-       not check_room_availability(room_id, start_datetime_str, duration) or \
-       is_equipment_under_maintenance(start_datetime_str, duration):
+    if not is_trainer_available(trainer_id, start_datetime_str, duration, "Group Class"):
+        reason = 'trainer_unavailable'
+    elif not check_room_availability(room_id, start_datetime_str, duration):
+        reason = 'room_booked'
+    elif is_equipment_under_maintenance(start_datetime_str, duration):
+        reason = 'maintenance'
+    else:
+        reason = None
+    if reason is not None:
+        record_booking('class_schedule', reason)
         return "Scheduling failed due to unavailability or maintenance."
 
     start_time = datetime.strptime(format_datetime_for_postgres(start_datetime_str), '%Y-%m-%d %H:%M:%S')
@@ -160,13 +187,16 @@ def schedule_fitness_class(class_name, room_id, trainer_id, start_datetime_str,
     try:
         query = """
         INSERT INTO FitnessClasses (ClassName, RoomID, TrainerID, StartTime, EndTime, Status)
-        VALUES (%s, %s, %s, %s, %s, 'Scheduled');
+        VALUES (%s, %s, %s, %s, %s, 'Scheduled') RETURNING ClassID;
         """
         params = (class_name, room_id, trainer_id, start_time, end_time)
-        db.execute_query(query, params)
+        class_id = db.execute_query(query, params, fetch=True)[0][0]
+        schedule_index.add_class(class_id, room_id, trainer_id, class_name, start_time, end_time)
+        record_booking('class_schedule')
         return "Fitness class scheduled successfully."
     except Exception as e:
         logging.error(f"Failed to schedule fitness class: {e}")
+        record_booking('class_schedule', 'error')
         return "Error scheduling class."
 
 
@@ -205,9 +235,19 @@ def update_class_schedule(class_id, new_start_datetime_str, new_duration):
     query_update = """
     UPDATE FitnessClasses
     SET StartTime = %s, EndTime = %s
-    WHERE ClassID = %s;
+    WHERE ClassID = %s
+    RETURNING ClassID;
     """
-    db.execute_query(query_update, (new_start_time, new_end_time, class_id))
+    # execute_query returns None when the update fails, so the index only follows a row that really moved
+    updated = db.execute_query(query_update, (new_start_time, new_end_time, class_id), fetch=True)
+    if updated is None:
+        return "Error updating class schedule."
+    if not updated:
+        return "Class not found."
+    schedule_index.move_class(class_id, new_start_time, new_end_time)
+    # Registered members see the class times on their dashboards
+    registered = db.execute_query("SELECT MemberID FROM MemberSchedule WHERE ClassID = %s;", (class_id,), fetch=True)
+    dashboard_cache.invalidate(*{res[0] for res in registered})
     return "Class schedule updated successfully."
 
 
@@ -226,17 +266,21 @@ def cancel_class_by_admin(class_id):
         # First, deregister all members from the class
         deregister_query = """
         DELETE FROM MemberSchedule
-        WHERE ClassID = %s;
+        WHERE ClassID = %s
+        RETURNING MemberID;
         """
-        db.execute_query(deregister_query, (class_id,))
+        deregistered = db.execute_query(deregister_query, (class_id,), fetch=True)
+        dashboard_cache.invalidate(*{res[0] for res in deregistered})
+        schedule_index.remove_class_sessions(class_id)
 
         # Then, cancel the class
         cancel_query = """
         UPDATE FitnessClasses
-        SET Status = 'Cancelled'
+        SET Status = 'Cancelled', EnrolledCount = 0
         WHERE ClassID = %s;
         """
         db.execute_query(cancel_query, (class_id,))
+        schedule_index.remove_class(class_id)
         return "Class cancelled successfully and all members were deregistered."
     except Exception as e:
         logging.error(f"Failed to cancel class by admin: {e}")
@@ -261,9 +305,14 @@ def update_payment_status(payment_id, new_status):
     query = """
     UPDATE Payments
     SET Status = %s
-    WHERE PaymentID = %s;
+    WHERE PaymentID = %s
+    RETURNING PaymentID;
     """
-    db.execute_query(query, (new_status, payment_id))
+    updated = db.execute_query(query, (new_status, payment_id), fetch=True)
+    if updated is None:
+        return "Error updating payment status."
+    if not updated:
+        return "Payment not found."
     return "Payment status updated successfully."
 
 
@@ -274,118 +323,309 @@ def update_payment_status(payment_id, new_status):
 
 # helper functions:
 
+# Rows shown per page on the admin list screens
+PAGE_SIZE = 20
 
-def fetch_unprocessed_payments():
+
+def fetch_keyset_page(query, conditions, params, key_column, after_id=None, before_id=None, page_size=PAGE_SIZE):
     """
-    Fetches unprocessed payments from the database.
-    Returns a list of dictionaries containing payment details.
+    Runs one page of a keyset-paginated list query.
+    
+    The page is found with "key > last key seen" (or "key < first key seen" when paging back) instead of
+    OFFSET, so every page costs the same single bounded query however deep the admin pages.
+    
+    Args:
+        query (str): SELECT ... FROM ... without WHERE, ORDER BY or LIMIT. The key must be the first column.
+        conditions (list): WHERE conditions joined with AND, using named parameters.
+        params (dict): Values for the named parameters.
+        key_column (str): The unique, increasing column the pages are ordered by.
+        after_id (int): Return the page after this key.
+        before_id (int): Return the page before this key.
+        page_size (int): The number of rows per page.
+        
+    Returns:
+        tuple: (rows, has_previous, has_next) with the rows in ascending key order.
     """
-    query = """
-    SELECT PaymentID, MemberID, Amount, Service, Status
-    FROM Payments
-    WHERE Status = 'Unprocessed';
+    page_query, params = keyset_page_query(query, conditions, params, key_column, after_id, before_id, page_size)
+    rows = db.execute_query(page_query, params, fetch=True)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before_id is not None:
+        return rows[::-1], has_more, True
+    return rows, after_id is not None, has_more
+
+
+def keyset_page_query(query, conditions, params, key_column, after_id=None, before_id=None, page_size=PAGE_SIZE):
+    """
+    Builds the SQL and parameters fetch_keyset_page runs, asking for one extra row to tell whether another page follows.
     """
-    results = db.execute_query(query, fetch=True)
-    return [{'PaymentID': res[0], 'MemberID': res[1], 'Amount': res[2], 'Service': res[3], 'Status': res[4]} for res in results]
+    conditions = list(conditions)
+    params = dict(params, page_size=page_size + 1)
+    if before_id is not None:
+        conditions.append(f"{key_column} < %(before_id)s")
+        params['before_id'] = before_id
+        order = "DESC"
+    else:
+        if after_id is not None:
+            conditions.append(f"{key_column} > %(after_id)s")
+            params['after_id'] = after_id
+        order = "ASC"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{query} {where} ORDER BY {key_column} {order} LIMIT %(page_size)s;", params
 
 
-def fetch_scheduled_fitness_classes():
+def fetch_unprocessed_payments(after_id=None, before_id=None, page_size=PAGE_SIZE, service=None, member_id=None, start_date=None, end_date=None):
     """
-    Fetches scheduled fitness classes from the database.
-    Returns a list of dictionaries containing class details.
+    Fetches one page of unprocessed payments, ordered by PaymentID.
+    
+    Args:
+        after_id (int): Return the page after this PaymentID.
+        before_id (int): Return the page before this PaymentID.
+        page_size (int): The number of payments per page.
+        service (str): Only payments for this service.
+        member_id (int): Only payments made by this member.
+        start_date (datetime): Only payments made on or after this date.
+        end_date (datetime): Only payments made before this date.
+        
+    Returns:
+        tuple: (payments, has_previous, has_next) where payments is a list of payment dictionaries.
     """
-    query = """
-    SELECT ClassID, ClassName, StartTime, EndTime, Status
-    FROM FitnessClasses
-    WHERE Status = 'Scheduled';
+    query, conditions, params = unprocessed_payments_filter(service, member_id, start_date, end_date)
+    rows, has_previous, has_next = fetch_keyset_page(query, conditions, params, "PaymentID", after_id, before_id, page_size)
+    payments = [{'PaymentID': res[0], 'MemberID': res[1], 'Amount': res[2], 'Service': res[3], 'Status': res[4], 'PaymentDate': res[5]} for res in rows]
+    return payments, has_previous, has_next
+
+
+def unprocessed_payments_filter(service=None, member_id=None, start_date=None, end_date=None):
+    """
+    Returns the (query, conditions, params) of the unprocessed payments list, for fetch_keyset_page.
+    """
+    query = "SELECT PaymentID, MemberID, Amount, Service, Status, PaymentDate FROM Payments"
+    conditions = ["Status = 'Unprocessed'"]
+    params = {'service': service, 'member_id': member_id, 'start_date': start_date, 'end_date': end_date}
+    if service is not None:
+        conditions.append("Service = %(service)s")
+    if member_id is not None:
+        conditions.append("MemberID = %(member_id)s")
+    if start_date is not None:
+        conditions.append("PaymentDate >= %(start_date)s")
+    if end_date is not None:
+        conditions.append("PaymentDate < %(end_date)s")
+    return query, conditions, params
+
+
+def fetch_scheduled_fitness_classes(after_id=None, before_id=None, page_size=PAGE_SIZE, class_name=None, start_date=None, end_date=None):
+    """
+    Fetches one page of scheduled fitness classes, ordered by ClassID.
+    
+    Args:
+        after_id (int): Return the page after this ClassID.
+        before_id (int): Return the page before this ClassID.
+        page_size (int): The number of classes per page.
+        class_name (str): Only classes of this type.
+        start_date (datetime): Only classes starting on or after this date.
+        end_date (datetime): Only classes starting before this date.
+        
+    Returns:
+        tuple: (classes, has_previous, has_next) where classes is a list of class dictionaries.
     """
-    results = db.execute_query(query, fetch=True)
-    return [{'ClassID': res[0], 'ClassName': res[1], 'StartTime': res[2], 'EndTime': res[3], 'Status': res[4]} for res in results]
+    query, conditions, params = scheduled_classes_filter(class_name, start_date, end_date)
+    rows, has_previous, has_next = fetch_keyset_page(query, conditions, params, "ClassID", after_id, before_id, page_size)
+    classes = [{'ClassID': res[0], 'ClassName': res[1], 'StartTime': res[2], 'EndTime': res[3], 'Status': res[4]} for res in rows]
+    return classes, has_previous, has_next
 
 
-def fetch_scheduled_maintenance():
+def scheduled_classes_filter(class_name=None, start_date=None, end_date=None):
     """
-    Fetches scheduled maintenance records from the database.
-    Returns a list of dictionaries containing maintenance details.
+    Returns the (query, conditions, params) of the scheduled classes list, for fetch_keyset_page.
     """
-    query = """
-    SELECT MaintenanceID, MaintenanceSchedule, Status
-    FROM EquipmentMaintenance
-    WHERE Status = 'Scheduled';
+    query = "SELECT ClassID, ClassName, StartTime, EndTime, Status FROM FitnessClasses"
+    conditions = ["Status = 'Scheduled'"]
+    params = {'class_name': class_name, 'start_date': start_date, 'end_date': end_date}
+    if class_name is not None:
+        conditions.append("ClassName = %(class_name)s")
+    if start_date is not None:
+        conditions.append("StartTime >= %(start_date)s")
+    if end_date is not None:
+        conditions.append("StartTime < %(end_date)s")
+    return query, conditions, params
+
+
+def fetch_scheduled_maintenance(after_id=None, before_id=None, page_size=PAGE_SIZE, start_date=None, end_date=None):
+    """
+    Fetches one page of scheduled maintenance records, ordered by MaintenanceID.
+    
+    Args:
+        after_id (int): Return the page after this MaintenanceID.
+        before_id (int): Return the page before this MaintenanceID.
+        page_size (int): The number of records per page.
+        start_date (datetime): Only maintenance scheduled on or after this date.
+        end_date (datetime): Only maintenance scheduled before this date.
+        
+    Returns:
+        tuple: (records, has_previous, has_next) where records is a list of maintenance dictionaries.
     """
-    results = db.execute_query(query, fetch=True)
-    return [{'MaintenanceID': res[0], 'MaintenanceSchedule': res[1], 'Status': res[2]} for res in results]
+    query, conditions, params = scheduled_maintenance_filter(start_date, end_date)
+    rows, has_previous, has_next = fetch_keyset_page(query, conditions, params, "MaintenanceID", after_id, before_id, page_size)
+    records = [{'MaintenanceID': res[0], 'MaintenanceSchedule': res[1], 'Status': res[2]} for res in rows]
+    return records, has_previous, has_next
 
 
-def process_user_choice_for_payments():
-    payments = fetch_unprocessed_payments()
-    if payments:
+def scheduled_maintenance_filter(start_date=None, end_date=None):
+    """
+    Returns the (query, conditions, params) of the scheduled maintenance list, for fetch_keyset_page.
+    """
+    query = "SELECT MaintenanceID, MaintenanceSchedule, Status FROM EquipmentMaintenance"
+    conditions = ["Status = 'Scheduled'"]
+    params = {'start_date': start_date, 'end_date': end_date}
+    if start_date is not None:
+        conditions.append("MaintenanceSchedule >= %(start_date)s")
+    if end_date is not None:
+        conditions.append("MaintenanceSchedule < %(end_date)s")
+    return query, conditions, params
+
+
+def prompt_for_date_range():
+    """
+    Asks for an optional date range. The end date is inclusive for the user, so one day is added to it.
+    """
+    start_date = prompt_for_optional_date("From date (MM/DD/YYYY, blank for any): ")
+    end_date = prompt_for_optional_date("To date (MM/DD/YYYY, blank for any): ")
+    if end_date is not None:
+        end_date += timedelta(days=1)
+    return start_date, end_date
+
+
+def choose_from_pages(fetch_page, key, heading, describe, prompt_message):
+    """
+    Shows a list one page at a time and lets the admin page forward and back or pick a row.
+    
+    Args:
+        fetch_page (callable): Called with after_id and before_id, returns (rows, has_previous, has_next).
+        key (str): The key of each row dictionary used for paging.
+        heading (str): Printed above each page.
+        describe (callable): Formats one row for printing.
+        prompt_message (str): The selection prompt.
+        
+    Returns:
+        tuple: (row, listed) where row is the selected row or None if the admin exits, and listed
+        is False when there was nothing to show.
+    """
+    after_id, before_id = None, None
+    while True:
+        rows, has_previous, has_next = fetch_page(after_id=after_id, before_id=before_id)
+        if not rows:
+            if after_id is None and before_id is None:
+                return None, False
+            # The rows on this page were processed elsewhere; start again from the first page
+            after_id, before_id = None, None
+            continue
+        print(heading)
+        for idx, row in enumerate(rows):
+            print(f"{idx + 1}. {describe(row)}")
+        options = []
+        if has_previous:
+            options.append("'p' for the previous page")
+        if has_next:
+            options.append("'n' for the next page")
+        options.append("'exit' to exit")
         while True:
-            print("Unprocessed Payments:")
-            for idx, payment in enumerate(payments):
-                print(f"{idx+1}. Payment ID: {payment['PaymentID']}, Member ID: {payment['MemberID']}, Amount: ${payment['Amount']}, Service: {payment['Service']}, Status: {payment['Status']}")
-            choice = input("Select a payment to process (number) or type 'exit' to exit: ")
-            if choice.lower() == 'exit':
-                return "Exiting payment processing."
+            choice = input(f"{prompt_message} or type {', '.join(options)}: ").strip().lower()
+            if choice == 'exit':
+                return None, True
+            if choice == 'n' and has_next:
+                after_id, before_id = rows[-1][key], None
+                break
+            if choice == 'p' and has_previous:
+                after_id, before_id = None, rows[0][key]
+                break
             try:
                 choice = int(choice) - 1
-                if 0 <= choice < len(payments):
-                    return update_payment_status(payments[choice]['PaymentID'], 'Processed')
+                if 0 <= choice < len(rows):
+                    return rows[choice], True
                 else:
                     print("Invalid selection, please try again.")
             except ValueError:
                 print("Invalid input, please enter a valid number.")
-    else:
+
+
+def process_user_choice_for_payments():
+    print("Filter unprocessed payments (leave blank to skip a filter):")
+    service = prompt_for_optional_choice("Service (number): ", ['Membership Fee', 'Personal Training', 'Group Class'])
+    member_id = input("Member ID: ").strip()
+    member_id = int(member_id) if member_id.isdigit() else None
+    start_date, end_date = prompt_for_date_range()
+
+    def fetch_page(after_id, before_id):
+        return fetch_unprocessed_payments(after_id, before_id, service=service, member_id=member_id, start_date=start_date, end_date=end_date)
+
+    def describe(payment):
+        return f"Payment ID: {payment['PaymentID']}, Member ID: {payment['MemberID']}, Amount: ${payment['Amount']}, Service: {payment['Service']}, Date: {payment['PaymentDate']}, Status: {payment['Status']}"
+
+    payment, listed = choose_from_pages(fetch_page, 'PaymentID', "Unprocessed Payments:", describe, "Select a payment to process (number)")
+    if not listed:
         return "No unprocessed payments available."
+    if payment is None:
+        return "Exiting payment processing."
+    return update_payment_status(payment['PaymentID'], 'Processed')
+
+
+def settle_payments_in_batch():
+    """
+    Asks for optional filters and settles every matching unprocessed payment in one batch run.
+    """
+    print("Settle unprocessed payments (leave blank to skip a filter):")
+    service = prompt_for_optional_choice("Service (number): ", ['Membership Fee', 'Personal Training', 'Group Class'])
+    member_id = input("Member ID: ").strip()
+    member_id = int(member_id) if member_id.isdigit() else None
+    start_date, end_date = prompt_for_date_range()
+    if input("Process all matching payments? (yes/no): ").strip().lower() != 'yes':
+        return "Batch processing cancelled."
+    summary = process_payments_batch(service=service, member_id=member_id, start_date=start_date, end_date=end_date)
+    print_payment_summary(summary)
+    return "Batch payment processing complete." if summary['completed'] else "Batch payment processing did not finish."
 
 
 def display_scheduled_classes():
-    classes = fetch_scheduled_fitness_classes()
-    if classes:
-        while True:
-            print("Scheduled Fitness Classes:")
-            for idx, cls in enumerate(classes):
-                print(f"{idx+1}. Class ID: {cls['ClassID']}, Name: {cls['ClassName']}, Start Time: {cls['StartTime']}, End Time: {cls['EndTime']}, Status: {cls['Status']}")
-            choice = input("Select a class to view or modify (number) or type 'exit' to exit: ")
-            if choice.lower() == 'exit':
-                return "Exiting class selection."
-            try:
-                choice = int(choice) - 1
-                if 0 <= choice < len(classes):
-                    # Here you could invoke a function to modify or view details of the selected class
-                    # or just return Class ID
-                    return f"Class ID {classes[choice]['ClassID']} selected."
-                else:
-                    print("Invalid selection, please try again.")
-            except ValueError:
-                print("Invalid input, please enter a valid number.")
-    else:
+    print("Filter scheduled classes (leave blank to skip a filter):")
+    class_name = prompt_for_optional_choice("Class type (number): ", ['Swimming', 'Cardio', 'Yoga', 'Strength'])
+    start_date, end_date = prompt_for_date_range()
+
+    def fetch_page(after_id, before_id):
+        return fetch_scheduled_fitness_classes(after_id, before_id, class_name=class_name, start_date=start_date, end_date=end_date)
+
+    def describe(cls):
+        return f"Class ID: {cls['ClassID']}, Name: {cls['ClassName']}, Start Time: {cls['StartTime']}, End Time: {cls['EndTime']}, Status: {cls['Status']}"
+
+    cls, listed = choose_from_pages(fetch_page, 'ClassID', "Scheduled Fitness Classes:", describe, "Select a class to view or modify (number)")
+    if not listed:
         return "No scheduled classes available."
+    if cls is None:
+        return "Exiting class selection."
+    # Here you could invoke a function to modify or view details of the selected class
+    # or just return Class ID
+    return f"Class ID {cls['ClassID']} selected."
 
 
 
 def manage_maintenance_schedule():
-    maintenance_records = fetch_scheduled_maintenance()
-    if maintenance_records:
-        while True:
-            print("Scheduled Maintenance:")
-            for idx, record in enumerate(maintenance_records):
-                print(f"{idx+1}. Maintenance ID: {record['MaintenanceID']}, Scheduled Time: {record['MaintenanceSchedule']}, Status: {record['Status']}")
-            choice = input("Select a maintenance record to update or review (number) or type 'exit' to exit: ")
-            if choice.lower() == 'exit':
-                return "Exiting maintenance management."
-            try:
-                choice = int(choice) - 1
-                if 0 <= choice < len(maintenance_records):
-                    # Additional functionality can be added here such as updating status or viewing detailed info
-                    # or can be used to just return maintenance ID
-                    return f"Maintenance ID {maintenance_records[choice]['MaintenanceID']} selected."
-                else:
-                    print("Invalid selection, please try again.")
-            except ValueError:
-                print("Invalid input, please enter a valid number.")
-    else:
+    print("Filter scheduled maintenance (leave blank to skip a filter):")
+    start_date, end_date = prompt_for_date_range()
+
+    def fetch_page(after_id, before_id):
+        return fetch_scheduled_maintenance(after_id, before_id, start_date=start_date, end_date=end_date)
+
+    def describe(record):
+        return f"Maintenance ID: {record['MaintenanceID']}, Scheduled Time: {record['MaintenanceSchedule']}, Status: {record['Status']}"
+
+    record, listed = choose_from_pages(fetch_page, 'MaintenanceID', "Scheduled Maintenance:", describe, "Select a maintenance record to update or review (number)")
+    if not listed:
         return "No maintenance schedules found."
+    if record is None:
+        return "Exiting maintenance management."
+    # Additional functionality can be added here such as updating status or viewing detailed info
+    # or can be used to just return maintenance ID
+    return f"Maintenance ID {record['MaintenanceID']} selected."
 
 
 def schedule_class():
@@ -414,6 +654,11 @@ def schedule_class():
     room_name, room_id, specialization = classes_and_rooms[class_name]
     print(f"Room automatically selected: {room_name} (Room ID: {room_id})")
 
+    print("1. Find the next available times across all trainers")
+    print("2. Choose a trainer and time myself")
+    if prompt_for_integer("Choose an option (number): ", 1, 2) == 1:
+        return schedule_class_from_search(class_name, year, month)
+
     # Fetch trainers based on the required specialization
     trainers = fetch_trainers_by_specialization(specialization)
     if not trainers:
@@ -426,10 +671,11 @@ def schedule_class():
     trainer_choice = prompt_for_integer("Choose a trainer (number): ", 1, len(trainers))
     trainer_id = trainer_choice
 
-    # Get date and time
+    # Get duration, then date and time
     try:
-        start_datetime = get_date_time_input(year, month)
         duration = get_duration()
+        show_open_class_times(class_name, room_id, trainer_id, duration, year, month)
+        start_datetime = get_date_time_input(year, month)
         # Call to schedule the fitness class
         result = schedule_fitness_class(class_name, room_id, trainer_id, start_datetime.strftime('%m/%d/%Y %H:%M'), duration)
         print(result)
@@ -437,8 +683,53 @@ def schedule_class():
         print(f"An error occurred: {e}")
 
 
+def schedule_class_from_search(class_name, year, month, limit=10):
+    """
+    Lists the earliest times in the month when any qualified trainer and a matching room are free,
+    and schedules the option the admin picks.
+    """
+    try:
+        duration = get_duration()
+        window_start = datetime(year, month, 1)
+        window_end = window_start + timedelta(days=calendar.monthrange(year, month)[1])
+        # Imported here so that importing admin does not load numpy
+        from availability_engine import find_next_available_slots
+        options = find_next_available_slots(class_name, duration, window_start, window_end, limit)
+        if not options:
+            print("No available times found this month.")
+            return "Failed to schedule class."
+        trainer_names = fetch_trainers_by_specialization(class_name)
+        print("Next available times:")
+        for idx, (trainer_id, room_id, start) in enumerate(options, 1):
+            print(f"{idx}. {start.strftime('%m/%d/%Y %H:%M')} with {trainer_names.get(trainer_id, trainer_id)} (Room ID: {room_id})")
+        choice = prompt_for_integer("Choose a time (number): ", 1, len(options))
+        trainer_id, room_id, start = options[choice - 1]
+        result = schedule_fitness_class(class_name, room_id, trainer_id, start.strftime('%m/%d/%Y %H:%M'), duration)
+        print(result)
+        return result
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+
+def show_open_class_times(class_name, room_id, trainer_id, duration, year, month, limit=10):
+    """
+    Prints the first open start times in the month where both the trainer and the room are free.
+    """
+    from availability_engine import AvailabilityEngine
+    engine = AvailabilityEngine(datetime(year, month, 1), days=calendar.monthrange(year, month)[1])
+    # Only the chosen trainer and room are read, not the whole club
+    engine.load(trainer_ids=[trainer_id], room_ids=[room_id])
+    open_times = [start for t_id, r_id, start in engine.class_windows(class_name, duration)
+                  if t_id == trainer_id and r_id == room_id]
+    if not open_times:
+        print("No open times this month for this trainer and room.")
+        return
+    print(f"Open start times ({len(open_times)} this month, showing the first {min(limit, len(open_times))}):")
+    for start in open_times[:limit]:
+        print(f"  {start.strftime('%m/%d/%Y %H:%M')}")
+
+
 def update_existing_class():
-    db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
     print("Updating an Existing Class")
 
     # Function to display all scheduled classes and choose one to update
@@ -454,9 +745,13 @@ def update_existing_class():
 
     # Fetch details for all classes that are not cancelled
     def fetch_scheduled_classes():
-        query = "SELECT ClassID, ClassName, StartTime, Duration FROM FitnessClasses WHERE Status != 'Cancelled'"
+        query = """
+        SELECT ClassID, ClassName, StartTime, EXTRACT(EPOCH FROM EndTime - StartTime)::integer / 60, TrainerID, RoomID
+        FROM FitnessClasses WHERE Status != 'Cancelled' ORDER BY StartTime, ClassID;
+        """
         result = db.execute_query(query, fetch=True)
-        return [{'ClassID': res[0], 'ClassName': res[1], 'StartTime': res[2], 'Duration': res[3]} for res in result]
+        return [{'ClassID': res[0], 'ClassName': res[1], 'StartTime': res[2], 'Duration': res[3], 'TrainerID': res[4], 'RoomID': res[5]}
+                for res in result]
 
     # Get new time and duration input
     def get_new_timing():
@@ -473,11 +768,17 @@ def update_existing_class():
            check_room_availability(selected_class['RoomID'], new_start_datetime.strftime('%m/%d/%Y %H:%M'), new_duration) and \
            not is_equipment_under_maintenance(new_start_datetime.strftime('%m/%d/%Y %H:%M'), new_duration):
             
+            new_end_datetime = new_start_datetime + timedelta(minutes=new_duration)
             update_query = """
-            UPDATE FitnessClasses SET StartTime = %s, Duration = %s WHERE ClassID = %s;
+            UPDATE FitnessClasses SET StartTime = %s, EndTime = %s WHERE ClassID = %s RETURNING ClassID;
             """
-            db.execute_query(update_query, (new_start_datetime, new_duration, selected_class['ClassID']))
-            print("Class updated successfully.")
+            if db.execute_query(update_query, (new_start_datetime, new_end_datetime, selected_class['ClassID']), fetch=True):
+                schedule_index.move_class(selected_class['ClassID'], new_start_datetime, new_end_datetime)
+                registered = db.execute_query("SELECT MemberID FROM MemberSchedule WHERE ClassID = %s;", (selected_class['ClassID'],), fetch=True)
+                dashboard_cache.invalidate(*{res[0] for res in registered or []})
+                print("Class updated successfully.")
+            else:
+                print("Failed to update class.")
         else:
             print("Failed to update class due to a scheduling conflict or maintenance issue.")
     else:
@@ -532,15 +833,18 @@ def manage_payments():
     while True:
         print("\nManage Payments:")
         print("1. Process unprocessed payments")
-        print("2. Review all payments")
-        print("3. Return to main menu")
+        print("2. Settle unprocessed payments in batch")
+        print("3. Review all payments")
+        print("4. Return to main menu")
         choice = input("Please enter your choice: ")
 
         if choice == '1':
-            process_payments()
+            print(process_user_choice_for_payments())
         elif choice == '2':
-            review_payments()
+            print(settle_payments_in_batch())
         elif choice == '3':
+            review_payments()
+        elif choice == '4':
             break
         else:
             print("Invalid input, please try again.")
@@ -0,0 +1,580 @@
+import argparse
+import base64
+import hmac
+import http.client
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from Workflow.db_connection import HealthClubDatabase
+from auth import lookup_member_login, lookup_trainer_login, register_members_bulk
+from member import (display_member_dashboard, book_private_session, book_private_sessions, register_for_class, drop_class_by_member,
+                    find_private_session_times)
+from trainer import view_upcoming_sessions, search_members
+from admin import (schedule_fitness_class, update_payment_status, fetch_unprocessed_payments, schedule_equipment_maintenance,
+                   update_maintenance_status, fetch_scheduled_maintenance)
+from billing import process_payments_batch
+from schedule_index import schedule_index
+from metrics import API_REQUEST_SECONDS, start_metrics_server
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+
+class ApiError(Exception):
+    """
+    Raised by an endpoint to answer with an HTTP error status and a message.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+#################################################### Sessions Section ###################################################
+
+class SessionStore:
+    """
+    Bearer tokens handed out by POST /login, kept in memory. A token expires ttl seconds after
+    login and every token is lost when the server restarts.
+    """
+
+    def __init__(self, ttl=8 * 3600):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def create(self, role, user_id):
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self.lock:
+            if len(self.sessions) % 1024 == 1023:
+                self.sessions = {key: session for key, session in self.sessions.items() if session[2] > now}
+            self.sessions[token] = (role, user_id, now + self.ttl)
+        return token
+
+    def lookup(self, token):
+        """
+        Returns (role, user_id) for a live token, or None.
+        """
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            if session[2] <= time.monotonic():
+                del self.sessions[token]
+                return None
+        return session[0], session[1]
+
+    def revoke(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+
+sessions = SessionStore()
+
+# Trainers and the admin have no password until their first login sets it, as in the console.
+# The update only succeeds while the password is still empty, so two first logins cannot both win.
+FIRST_LOGIN_QUERIES = {
+    'trainer': "UPDATE Trainers SET Password = %s WHERE TrainerID = %s AND COALESCE(Password, '') = '' RETURNING TrainerID;",
+    'admin': "UPDATE AdministrativeStaff SET Password = %s WHERE AdminID = %s AND COALESCE(Password, '') = '' RETURNING AdminID;"
+}
+
+
+def lookup_login(role, email):
+    if role == 'member':
+        return lookup_member_login(email, by_email=True)
+    if role == 'trainer':
+        return lookup_trainer_login(email)
+    return db.execute_query("SELECT AdminID, Password FROM AdministrativeStaff WHERE AdminID = 1;", fetch=True)
+
+
+#################################################### Request Parsing Section ###################################################
+
+class ApiRequest:
+    def __init__(self, query, body, token=None, role=None, user_id=None):
+        self.query = query
+        self.body = body
+        self.token = token
+        self.role = role
+        self.user_id = user_id
+
+
+def text(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+def start_time(value):
+    # The operations take start times in the console's 'MM/DD/YYYY HH:MM' format
+    datetime.strptime(text(value), '%m/%d/%Y %H:%M')
+    return value
+
+
+def day(value):
+    return datetime.strptime(text(value), '%Y-%m-%d')
+
+
+def field(data, name, parse=text, required=True, default=None, choices=None):
+    """
+    Reads one value from a JSON body or the query string and converts it with parse.
+    Missing or invalid values are answered with 400 Bad Request.
+    """
+    value = data.get(name)
+    if value is None or value == '':
+        if required:
+            raise ApiError(400, f"{name} is required.")
+        return default
+    try:
+        value = parse(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Invalid {name}: {value!r}.")
+    if choices is not None and value not in choices:
+        raise ApiError(400, f"{name} must be one of {', '.join(map(str, choices))}.")
+    return value
+
+
+def search_cursor(value):
+    """
+    Decodes the next_cursor returned by the member search: its (rank, last name, first name, MemberID) sort key.
+    """
+    # Bad base64 or JSON raises ValueError, which field answers with 400
+    rank, last_name, first_name, member_id = json.loads(base64.urlsafe_b64decode(text(value).encode()))
+    if not all(isinstance(part, kind) for part, kind in zip((rank, last_name, first_name, member_id), (int, str, str, int))):
+        raise ValueError(value)
+    return rank, last_name, first_name, member_id
+
+
+def encode_search_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode() if cursor else None
+
+
+def positive(value):
+    value = int(value)
+    if value <= 0:
+        raise ValueError(value)
+    return value
+
+
+def outcome(message, success_message):
+    """
+    Turns an operation's status message into a response: 200 for success, 500 for the operation's
+    own "Error ..." messages and 409 Conflict for everything else it refused.
+    """
+    if message == success_message:
+        return 200, {'ok': True, 'message': message}
+    return 500 if message.startswith("Error") else 409, {'ok': False, 'message': message}
+
+
+def page_params(query):
+    params = {
+        'after_id': field(query, 'after_id', int, required=False),
+        'before_id': field(query, 'before_id', int, required=False),
+        'page_size': min(field(query, 'page_size', positive, required=False, default=20), 100),
+        'start_date': field(query, 'from', day, required=False),
+        'end_date': field(query, 'to', day, required=False)
+    }
+    if params['end_date'] is not None:
+        # The end date is inclusive for the caller
+        params['end_date'] += timedelta(days=1)
+    return params
+
+
+#################################################### Endpoints Section ###################################################
+
+def register_member(request):
+    member = tuple(field(request.body, name) for name in ('first_name', 'last_name', 'email', 'password'))
+    try:
+        member_id = register_members_bulk([member])[0]
+    except Exception as e:
+        logging.error(f"Failed to register member: {e}")
+        raise ApiError(409, "Could not register the member; the email may already be in use.")
+    return 201, {'member_id': member_id}
+
+
+def login(request):
+    role = field(request.body, 'role', choices=('member', 'trainer', 'admin'))
+    email = field(request.body, 'email', required=role != 'admin')
+    password = field(request.body, 'password')
+    rows = lookup_login(role, email)
+    if rows and not rows[0][1] and role in FIRST_LOGIN_QUERIES:
+        db.execute_query(FIRST_LOGIN_QUERIES[role], (password, rows[0][0]), fetch=True)
+        rows = lookup_login(role, email)
+    if not rows or not rows[0][1] or not hmac.compare_digest(rows[0][1].encode(), password.encode()):
+        raise ApiError(401, "Invalid credentials.")
+    return 200, {'token': sessions.create(role, rows[0][0]), 'role': role, 'id': rows[0][0]}
+
+
+def logout(request):
+    if request.token:
+        sessions.revoke(request.token)
+    return 200, {'ok': True}
+
+
+def member_dashboard(request):
+    return 200, display_member_dashboard(request.user_id)
+
+
+# Open start times offered when the requested one is taken
+SUGGESTED_TIMES_LIMIT = 10
+
+
+def member_book_session(request):
+    body = request.body
+    trainer_id, start, duration = field(body, 'trainer_id', int), field(body, 'start', start_time), field(body, 'duration', positive)
+    message = book_private_session(request.user_id, trainer_id, start, duration)
+    status, response = outcome(message, "Private training session booked successfully.")
+    if message == "Failed to book session due to trainer unavailability.":
+        # Offer the times the trainer is free that day instead
+        response['open_times'] = find_private_session_times(trainer_id, duration, datetime.strptime(start, '%m/%d/%Y %H:%M'),
+                                                            SUGGESTED_TIMES_LIMIT)
+    return status, response
+
+
+def member_open_session_times(request):
+    query = request.query
+    open_times = find_private_session_times(field(query, 'trainer_id', int), field(query, 'duration', positive),
+                                            field(query, 'date', day), field(query, 'limit', positive, required=False))
+    return 200, {'open_times': open_times}
+
+
+def member_register_class(request):
+    return outcome(register_for_class(request.user_id, field(request.body, 'class_id', int)), "Registered for class successfully.")
+
+
+def member_drop_class(request, class_id):
+    return outcome(drop_class_by_member(request.user_id, class_id), "Successfully dropped from the class.")
+
+
+def trainer_sessions(request):
+    upcoming = [{'ID': res[0], 'Name': res[1], 'StartTime': res[2], 'EndTime': res[3], 'Status': res[4]}
+                for res in view_upcoming_sessions(request.user_id) or []]
+    return 200, {'sessions': upcoming}
+
+
+def trainer_member_search(request):
+    name = field(request.query, 'name')
+    limit = min(field(request.query, 'limit', positive, required=False, default=20), 100)
+    members, next_cursor = search_members(name, limit, field(request.query, 'cursor', search_cursor, required=False))
+    return 200, {'members': members, 'next_cursor': encode_search_cursor(next_cursor)}
+
+
+def admin_schedule_class(request):
+    body = request.body
+    message = schedule_fitness_class(field(body, 'class_name'), field(body, 'room_id', int), field(body, 'trainer_id', int),
+                                     field(body, 'start', start_time), field(body, 'duration', positive))
+    return outcome(message, "Fitness class scheduled successfully.")
+
+
+# The most sessions one batch request may book
+MAX_BATCH_BOOKINGS = 1000
+
+
+def admin_book_sessions(request):
+    bookings = request.body.get('bookings')
+    if not isinstance(bookings, list) or not bookings:
+        raise ApiError(400, "bookings must be a non-empty list.")
+    if len(bookings) > MAX_BATCH_BOOKINGS:
+        raise ApiError(413, f"At most {MAX_BATCH_BOOKINGS} bookings per request.")
+    # Malformed entries are rejected individually, like any other booking that cannot be made
+    requests = [(booking.get('member_id'), booking.get('trainer_id'), booking.get('start'), booking.get('duration'))
+                if isinstance(booking, dict) else None for booking in bookings]
+    results = book_private_sessions(requests)
+    booked = sum(result['reason'] is None for result in results)
+    return 200, {'booked': booked, 'rejected': len(results) - booked, 'results': results}
+
+
+def admin_payments(request):
+    params = page_params(request.query)
+    payments, has_previous, has_next = fetch_unprocessed_payments(
+        service=field(request.query, 'service', required=False), member_id=field(request.query, 'member_id', int, required=False),
+        **params)
+    return 200, {'payments': payments, 'has_previous': has_previous, 'has_next': has_next}
+
+
+def admin_process_payment(request, payment_id):
+    message = update_payment_status(payment_id, 'Processed')
+    if message == "Payment not found.":
+        raise ApiError(404, message)
+    return outcome(message, "Payment status updated successfully.")
+
+
+def admin_settle_payments(request):
+    body = request.body
+    summary = process_payments_batch(chunk_size=field(body, 'chunk_size', positive, required=False, default=1000),
+                                     service=field(body, 'service', required=False),
+                                     member_id=field(body, 'member_id', int, required=False))
+    return 200, summary
+
+
+def admin_maintenance(request):
+    records, has_previous, has_next = fetch_scheduled_maintenance(**page_params(request.query))
+    return 200, {'maintenance': records, 'has_previous': has_previous, 'has_next': has_next}
+
+
+def admin_schedule_maintenance(request):
+    message = schedule_equipment_maintenance(field(request.body, 'start', start_time), field(request.body, 'duration', positive))
+    return outcome(message, "Maintenance scheduled successfully.")
+
+
+def admin_maintenance_status(request, maintenance_id):
+    status = field(request.body, 'status', choices=('Scheduled', 'Completed'))
+    message = update_maintenance_status(maintenance_id, status)
+    if message == "Maintenance record not found.":
+        raise ApiError(404, message)
+    return outcome(message, f"Maintenance status updated to {status} successfully.")
+
+
+# Method, path, the role allowed to call it (None for anyone) and the endpoint. Numeric path
+# segments are passed to the endpoint as integers.
+ROUTES = [
+    ('POST', r'/members', None, register_member),
+    ('POST', r'/login', None, login),
+    ('POST', r'/logout', None, logout),
+    ('GET', r'/members/me/dashboard', 'member', member_dashboard),
+    ('POST', r'/members/me/sessions', 'member', member_book_session),
+    ('GET', r'/members/me/sessions/open', 'member', member_open_session_times),
+    ('POST', r'/members/me/classes', 'member', member_register_class),
+    ('DELETE', r'/members/me/classes/(\d+)', 'member', member_drop_class),
+    ('GET', r'/trainers/me/sessions', 'trainer', trainer_sessions),
+    ('GET', r'/trainers/me/members', 'trainer', trainer_member_search),
+    ('POST', r'/admin/classes', 'admin', admin_schedule_class),
+    ('POST', r'/admin/sessions/batch', 'admin', admin_book_sessions),
+    ('GET', r'/admin/payments', 'admin', admin_payments),
+    ('POST', r'/admin/payments/settle', 'admin', admin_settle_payments),
+    ('POST', r'/admin/payments/(\d+)/process', 'admin', admin_process_payment),
+    ('GET', r'/admin/maintenance', 'admin', admin_maintenance),
+    ('POST', r'/admin/maintenance', 'admin', admin_schedule_maintenance),
+    ('POST', r'/admin/maintenance/(\d+)/status', 'admin', admin_maintenance_status),
+]
+COMPILED_ROUTES = [(method, re.compile(path), role, endpoint) for method, path, role, endpoint in ROUTES]
+
+
+def match_route(method, path):
+    """
+    Returns (role, endpoint, path arguments), or raises 404 or 405.
+    """
+    path = path.rstrip('/') or '/'
+    path_found = False
+    for route_method, pattern, role, endpoint in COMPILED_ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return role, endpoint, [int(arg) for arg in match.groups()]
+            path_found = True
+    if path_found:
+        raise ApiError(405, f"{method} is not allowed on {path}.")
+    raise ApiError(404, f"No endpoint at {path}.")
+
+
+#################################################### HTTP Server Section ###################################################
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Amounts are sent as strings so no cents are lost to floating point
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests, so clients do not reconnect every time
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY the body waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+    max_body_size = 1 << 20
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def dispatch(self, method):
+        start = time.perf_counter()
+        endpoint_name = 'unmatched'
+        try:
+            body = self.read_body()
+            url = urlsplit(self.path)
+            role, endpoint, args = match_route(method, url.path)
+            endpoint_name = endpoint.__name__
+            request = ApiRequest({key: values[-1] for key, values in parse_qs(url.query).items()}, body, self.bearer_token())
+            if role is not None:
+                session = sessions.lookup(request.token) if request.token else None
+                if session is None:
+                    raise ApiError(401, "Log in first and send the token as 'Authorization: Bearer <token>'.")
+                if session[0] != role:
+                    raise ApiError(403, f"Only a logged in {role} can do this.")
+                request.role, request.user_id = session
+            status, payload = endpoint(request, *args)
+        except ApiError as e:
+            status, payload = e.status, {'error': e.message}
+        except Exception as e:
+            logging.error(f"{method} {self.path} failed: {e}")
+            status, payload = 500, {'error': "Internal server error."}
+        self.send_json(status, payload)
+        API_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint_name, str(status))
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # A negative length would block the worker reading until the client hangs up
+            self.close_connection = True
+            raise ApiError(400, "Invalid Content-Length header.")
+        if length > self.max_body_size:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            raise ApiError(413, "Request body is too large.")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "Request body is not valid JSON.")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Request body must be a JSON object.")
+        return body
+
+    def bearer_token(self):
+        header = self.headers.get('Authorization', '')
+        return header[7:].strip() if header.startswith('Bearer ') else None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def create_api_server(port=8080, host='127.0.0.1', pool_size=10):
+    """
+    Builds the API server without starting it; call serve_forever() on the result.
+
+    Every connection is handled on its own thread, and the database is switched to its connection
+    pool so those threads run queries side by side. Requests beyond pool_size wait for a connection.
+
+    Args:
+        port (int): The port to listen on, 0 for any free port.
+        host (str): The address to listen on. Defaults to localhost only.
+        pool_size (int): The most database connections used at once.
+
+    Returns:
+        ThreadingHTTPServer: The server, bound and listening.
+    """
+    if db.pool is None:
+        db.enable_pool(pool_size)
+    try:
+        schedule_index.load()
+    except Exception as e:
+        logging.warning(f"Schedule index not loaded: {e}")
+    server = ThreadingHTTPServer((host, port), ApiRequestHandler)
+    server.daemon_threads = True
+    logging.info(f"API listening on http://{host}:{server.server_port}")
+    return server
+
+
+#################################################### Client Section ###################################################
+
+class ApiClient:
+    """
+    Minimal JSON client for the API. Each client keeps one connection open, so give every thread its own.
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, body=None):
+        """
+        Sends one request and returns (status, decoded JSON body).
+        """
+        headers = {'Accept': 'application/json'}
+        data = None
+        if body is not None:
+            data = json.dumps(body, default=json_default).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, data, headers)
+                response = self.connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle kept-alive connection before reading the request; retry once
+                self.close()
+                if attempt:
+                    raise
+        if response.getheader('Content-Type', '').startswith('application/json'):
+            return response.status, json.loads(payload)
+        return response.status, payload.decode('utf-8', 'replace') or None
+
+    def login(self, role, password, email=None):
+        status, data = self.request('POST', '/login', {'role': role, 'email': email, 'password': password})
+        if status == 200:
+            self.token = data['token']
+        return status, data
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve the club operations as a JSON HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--pool-size", type=int, default=10, help="database connections shared by the request threads")
+    parser.add_argument("--metrics-port", type=int, default=9105, help="port for the Prometheus metrics endpoint, 0 to disable")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        try:
+            start_metrics_server(args.metrics_port)
+        except OSError as e:
+            logging.warning(f"Metrics endpoint not started: {e}")
+    server = create_api_server(args.port, args.host, args.pool_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close_pool()
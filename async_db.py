@@ -0,0 +1,207 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from Workflow.db_connection import HealthClubDatabase
+from utils import TRAINER_AVAILABILITY_QUERY, trainer_availability_params
+from dashboard_cache import dashboard_cache
+from member import ENROLL_QUERY, ENROLLMENT_FAILURE_KINDS, enrollment_failure_reason, load_member_dashboard
+from metrics import record_booking
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+# The transaction block the current task is inside, so its queries reuse the connection it holds
+current_transaction = contextvars.ContextVar('current_transaction', default=None)
+
+
+class AsyncHealthClubDatabase:
+    """
+    Asyncio counterpart of HealthClubDatabase.
+
+    psycopg2 only offers blocking calls, so every query runs on a worker thread with its own pooled
+    connection while the event loop keeps serving other members. Query text and %s parameters are the
+    same as for the blocking execute_query.
+
+    Statements inside a transaction block run on workers of their own. The general workers can all be
+    waiting for a free connection, and the transactions holding the connections must still be able to
+    finish and give them back.
+    """
+
+    def __init__(self, database, max_size=10, min_size=1, checkout_timeout=30.0):
+        self.database = database
+        self.max_size = max_size
+        self.min_size = min_size
+        self.checkout_timeout = checkout_timeout
+        self.executor = None
+        self.transaction_executor = None
+
+    def _ensure_pool(self):
+        # The pool is created on first use so importing this module does not open extra connections
+        if self.database.pool is None:
+            self.database.enable_pool(self.max_size, self.min_size, self.checkout_timeout)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix="async-db")
+        if self.transaction_executor is None:
+            # At most max_size transactions hold a connection at once, so none waits for a worker
+            self.transaction_executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix="async-db-tx")
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking function on the database worker threads and waits for its result.
+        """
+        self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def run_in_transaction(self, func, *args, **kwargs):
+        """
+        Runs a blocking function that uses a connection already checked out by a transaction block.
+        """
+        self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.transaction_executor, functools.partial(func, *args, **kwargs))
+
+    async def execute_query(self, query, params=None, fetch=False):
+        # Inside a transaction block the query joins the transaction instead of waiting for a second connection
+        transaction = current_transaction.get()
+        if transaction is not None and transaction.async_db is self:
+            return await transaction.execute_query(query, params, fetch)
+        return await self.run(self.database.execute_query, query, params, fetch)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Holds one pooled connection for the duration of the block and commits it on exit,
+        or rolls it back if the block raises. adb.execute_query calls awaited inside the block
+        run on the same connection.
+
+        Usage:
+            async with adb.transaction() as tx:
+                await tx.execute_query(...)
+        """
+        self._ensure_pool()
+        conn = await self.run(self.database._checkout)
+        conn.autocommit = False
+        transaction = AsyncTransaction(self, conn)
+        token = current_transaction.set(transaction)
+        try:
+            yield transaction
+            await self.run_in_transaction(conn.commit)
+        except BaseException:
+            await self.run_in_transaction(conn.rollback)
+            raise
+        finally:
+            current_transaction.reset(token)
+            conn.autocommit = True
+            self.database._checkin(conn)
+
+    async def close(self):
+        """
+        Stops the worker threads. The connection pool belongs to the shared database, which the
+        blocking code and the API keep using, so it stays open.
+        """
+        for executor in (self.executor, self.transaction_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self.executor = None
+        self.transaction_executor = None
+
+
+class AsyncTransaction:
+    """
+    Runs queries on the single connection owned by an AsyncHealthClubDatabase.transaction() block.
+    """
+
+    def __init__(self, async_db, conn):
+        self.async_db = async_db
+        self.conn = conn
+
+    def _execute(self, query, params, fetch):
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            if fetch:
+                return cur.fetchall()
+            else:
+                return cur.statusmessage
+
+    async def execute_query(self, query, params=None, fetch=False):
+        return await self.async_db.run_in_transaction(self._execute, query, params, fetch)
+
+
+# Async database instance
+adb = AsyncHealthClubDatabase(db)
+
+
+#################################################### Async Helper Section ###################################################
+
+async def is_trainer_available_async(trainer_id, start_datetime_str, duration, session_type):
+    """
+    Async version of utils.is_trainer_available.
+
+    Args:
+        trainer_id (int): The ID of the trainer.
+        start_datetime_str (str): The proposed start time for the session in 'MM/DD/YYYY HH:MM' format.
+        duration (int): The duration of the session in minutes.
+        session_type (str): Type of session ('Personal Training' or 'Group Class').
+
+    Returns:
+        bool: True if the trainer is available, False otherwise.
+    """
+    try:
+        params = trainer_availability_params(trainer_id, start_datetime_str, duration)
+        reason = (await adb.execute_query(TRAINER_AVAILABILITY_QUERY, params, fetch=True))[0][0]
+        if reason is not None:
+            logging.debug(f"Trainer {trainer_id} is not available: {reason}")
+        logging.info(f"Trainer {trainer_id} availability check for {session_type}: {reason is None}")
+        return reason is None
+    except Exception as e:
+        logging.error(f"Failed to check availability for trainer {trainer_id}: {e}")
+        return False
+
+
+async def register_for_class_async(member_id, class_id):
+    """
+    Async version of member.register_for_class.
+
+    Args:
+        member_id (int): The ID of the member registering.
+        class_id (int): The ID of the class to register for.
+
+    Returns:
+        str: Status message indicating the outcome of the registration attempt.
+    """
+    try:
+        result = await adb.execute_query(ENROLL_QUERY, {'member_id': member_id, 'class_id': class_id}, fetch=True)
+        # execute_query returns None when the statement fails, and no rows when no seat was taken
+        if result is None:
+            record_booking('class_registration', 'error')
+            return "Error registering for class."
+        if not result:
+            reason = await adb.run(enrollment_failure_reason, class_id)
+            record_booking('class_registration', ENROLLMENT_FAILURE_KINDS.get(reason, 'error'))
+            return reason
+        dashboard_cache.invalidate(member_id)
+        record_booking('class_registration')
+        return "Registered for class successfully."
+    except Exception as e:
+        logging.error(f"Failed to register for class: {e}")
+        record_booking('class_registration', 'error')
+        return "Error registering for class."
+
+
+async def display_member_dashboard_async(member_id):
+    """
+    Async version of member.display_member_dashboard.
+
+    Args:
+        member_id (int): The ID of the member whose dashboard is to be displayed.
+
+    Returns:
+        dict: A dictionary containing all relevant dashboard information.
+    """
+    dashboard = await adb.run(dashboard_cache.get, member_id, load_member_dashboard)
+    logging.info(f"Dashboard data retrieved for member ID {member_id}")
+    return dashboard
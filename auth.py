@@ -1,4 +1,5 @@
 from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index
 
 # Constants for specializations
 SPECIALIZATIONS = ['Weight Loss', 'Strength', 'Cardio', 'Yoga', 'Swimming', 'Rehab', 'Health']
@@ -6,6 +7,9 @@ SPECIALIZATIONS = ['Weight Loss', 'Strength', 'Cardio', 'Yoga', 'Swimming', 'Reh
 # Database instance
 db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
 
+MEMBER_LOGIN_QUERY = "SELECT MemberID, Password FROM Members WHERE Email = %s"
+MEMBER_NAME_LOGIN_QUERY = "SELECT MemberID, Password FROM Members WHERE FirstName = %s OR LastName = %s"
+
 def setup_admin():
     query = "SELECT Password FROM AdministrativeStaff WHERE AdminID = 1"
     admin_password = db.execute_query(query, fetch=True)
@@ -29,9 +33,15 @@ def admin_login():
         print("Login failed. Incorrect password.")
         return False
 
+def fetch_trainer_logins():
+    """
+    Returns (TrainerID, FirstName, LastName, Email, Password) for every trainer, for the login menu.
+    """
+    query = "SELECT TrainerID, FirstName, LastName, Email, Password FROM Trainers ORDER BY TrainerID"
+    return db.execute_query(query, fetch=True)
+
 def trainer_login():
-    query = "SELECT TrainerID, FirstName, LastName, Email, Password FROM Trainers"
-    trainers = db.execute_query(query, fetch=True)
+    trainers = fetch_trainer_logins()
     print("\nList of Trainers:")
     for i, trainer in enumerate(trainers, start=1):
         print(f"{i}. {trainer[1]} {trainer[2]} ({trainer[3]})")
@@ -82,8 +92,9 @@ def register_trainer():
     if 1 <= spec_choice <= len(SPECIALIZATIONS):
         specialization = SPECIALIZATIONS[spec_choice - 1]
         password = input("Set an initial password for the trainer: ")
-        insert_query = "INSERT INTO Trainers (FirstName, LastName, Email, Password, Specialization) VALUES (%s, %s, %s, %s, %s)"
-        db.execute_query(insert_query, (first_name, last_name, email, password, specialization))
+        insert_query = "INSERT INTO Trainers (FirstName, LastName, Email, Password, Specialization) VALUES (%s, %s, %s, %s, %s) RETURNING TrainerID"
+        trainer_id = db.execute_query(insert_query, (first_name, last_name, email, password, specialization), fetch=True)[0][0]
+        schedule_index.add_trainer(trainer_id, specialization)
         print(f"Successfully registered new Trainer '{first_name} {last_name}'")
         return True
     else:
@@ -101,7 +112,59 @@ def register_member():
     db.execute_query(payment_query, (member_id,))
     print(f"Successfully registered new Member '{first_name} {last_name}' and recorded initial unprocessed payment.")
     return True
+
+def register_members_bulk(members):
+    """
+    Registers many members at once, e.g. when onboarding a new club site, and records the
+    initial unprocessed membership payment for each of them.
+
+    Args:
+        members (list): Tuples of (first_name, last_name, email, password).
+
+    Returns:
+        list: The MemberIDs of the new members, in the same order as the input.
+    """
+    # One transaction, so a member is never left without the sign-up payment
+    with db.borrow_connection() as conn:
+        conn.autocommit = False
+        try:
+            member_ids = db.insert_many("Members", ["FirstName", "LastName", "Email", "Password"], members,
+                                        returning="MemberID", conn=conn)
+            payments = [(member_id, 50.00, 'Membership Fee', 'Unprocessed') for member_id in member_ids]
+            db.insert_many("Payments", ["MemberID", "Amount", "Service", "Status"], payments, conn=conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+    return member_ids
             
+def lookup_member_login(identifier, by_email=True):
+    """
+    Finds the members a login identifier refers to.
+    
+    Args:
+        identifier (str): The email address, or a first or last name.
+        by_email (bool): Whether the identifier is an email address.
+        
+    Returns:
+        list: (MemberID, Password) tuples for the matching members.
+    """
+    if by_email:
+        return db.execute_query(MEMBER_LOGIN_QUERY, (identifier,), fetch=True)
+    return db.execute_query(MEMBER_NAME_LOGIN_QUERY, (identifier, identifier), fetch=True)
+
+def lookup_trainer_login(email):
+    """
+    Finds the trainer with a login email.
+
+    Returns:
+        list: (TrainerID, Password) for the matching trainer. The password is empty until the first login sets it.
+    """
+    query = "SELECT TrainerID, Password FROM Trainers WHERE Email = %s"
+    return db.execute_query(query, (email,), fetch=True)
+
 def member_login():
     count_query = "SELECT COUNT(*) FROM Members"
     member_count = db.execute_query(count_query, fetch=True)[0][0]
@@ -120,12 +183,7 @@ def member_login():
             attempts = 0
             while attempts < 5:
                 identifier = input(f"Please enter your {option}: ")
-                if method == '1':
-                    query = "SELECT MemberID, Password FROM Members WHERE Email = %s"
-                else:
-                    query = "SELECT MemberID, Password FROM Members WHERE FirstName = %s OR LastName = %s"
-
-                member = db.execute_query(query, (identifier, identifier if method != '1' else None), fetch=True)
+                member = lookup_member_login(identifier, by_email=method == '1')
                 if member:
                     member_id, stored_password = member[0]
                     password = input("Please enter Password: ")
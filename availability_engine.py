@@ -0,0 +1,224 @@
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from Workflow.db_connection import HealthClubDatabase
+from utils import MAINTENANCE_EXEMPT_SPECIALIZATIONS
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+# Every booking in the club starts on the hour or half hour
+SLOT_MINUTES = 30
+
+
+class AvailabilityEngine:
+    """
+    Snapshot of the schedule as bitmaps of 30-minute slots over a horizon.
+
+    Each trainer and each room gets one row of busy flags and maintenance gets a single row, so
+    questions like "every free 90-minute window for every trainer this month" become a few
+    vectorized AND and running-sum operations instead of one query per candidate start time.
+
+    A trainer counts as busy while they have an appointment, are unavailable or are leading a class,
+    so the engine never offers a slot that the booking checks would refuse.
+    """
+
+    def __init__(self, horizon_start, days=92):
+        self.horizon_start = datetime(horizon_start.year, horizon_start.month, horizon_start.day)
+        self.horizon_end = self.horizon_start + timedelta(days=days)
+        self.slot_count = days * 24 * 60 // SLOT_MINUTES
+
+    def load(self, specializations=None, room_types=None, trainer_ids=None, room_ids=None):
+        """
+        Builds the bitmaps from the database. Only rows that touch the horizon are read.
+
+        Args:
+            specializations (list): Optional trainer specializations to load, defaults to every trainer.
+            room_types (list): Optional room types to load, defaults to every room.
+            trainer_ids (list): Optional trainers to load, defaults to every trainer.
+            room_ids (list): Optional rooms to load, defaults to every room.
+        """
+        trainers = db.execute_query("""
+        SELECT TrainerID, Specialization FROM Trainers
+        WHERE (%(specializations)s::text[] IS NULL OR Specialization = ANY(%(specializations)s))
+        AND (%(trainer_ids)s::integer[] IS NULL OR TrainerID = ANY(%(trainer_ids)s))
+        ORDER BY TrainerID;
+        """, {'specializations': specializations, 'trainer_ids': trainer_ids}, fetch=True)
+        rooms = db.execute_query("""
+        SELECT RoomID, RoomType FROM Rooms
+        WHERE (%(room_types)s::text[] IS NULL OR RoomType = ANY(%(room_types)s))
+        AND (%(room_ids)s::integer[] IS NULL OR RoomID = ANY(%(room_ids)s))
+        ORDER BY RoomID;
+        """, {'room_types': room_types, 'room_ids': room_ids}, fetch=True)
+        self.trainer_ids = np.array([res[0] for res in trainers], dtype=np.int64)
+        self.specializations = np.array([res[1] for res in trainers], dtype=object)
+        self.room_ids = np.array([res[0] for res in rooms], dtype=np.int64)
+        self.room_types = np.array([res[1] for res in rooms], dtype=object)
+        self.trainer_rows = {trainer_id: row for row, trainer_id in enumerate(self.trainer_ids.tolist())}
+        self.room_rows = {room_id: row for row, room_id in enumerate(self.room_ids.tolist())}
+
+        window = (self.horizon_end, self.horizon_start)
+        trainer_ids = self.trainer_ids.tolist()
+        room_ids = self.room_ids.tolist()
+        trainer_intervals = db.execute_query("""
+        SELECT TrainerID, StartTime, EndTime FROM MemberSchedule
+        WHERE Status != 'Cancelled' AND TrainerID = ANY(%s) AND StartTime < %s AND EndTime > %s
+        UNION ALL
+        SELECT TrainerID, StartTime, EndTime FROM TrainerUnavailability
+        WHERE TrainerID = ANY(%s) AND StartTime < %s AND EndTime > %s
+        UNION ALL
+        SELECT TrainerID, StartTime, EndTime FROM FitnessClasses
+        WHERE Status != 'Cancelled' AND TrainerID = ANY(%s) AND StartTime < %s AND EndTime > %s;
+        """, (trainer_ids,) + window + (trainer_ids,) + window + (trainer_ids,) + window, fetch=True)
+        room_intervals = db.execute_query("""
+        SELECT RoomID, StartTime, EndTime FROM FitnessClasses
+        WHERE Status != 'Cancelled' AND RoomID = ANY(%s) AND StartTime < %s AND EndTime > %s;
+        """, (room_ids,) + window, fetch=True)
+        maintenance_intervals = db.execute_query("""
+        SELECT 0, MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration FROM EquipmentMaintenance
+        WHERE Status = 'Scheduled' AND MaintenanceSchedule < %s
+        AND MaintenanceSchedule + INTERVAL '1 minute' * Duration > %s;
+        """, window, fetch=True)
+
+        self.trainer_busy = self._bitmap(trainer_intervals, self.trainer_rows, len(self.trainer_ids))
+        self.room_busy = self._bitmap(room_intervals, self.room_rows, len(self.room_ids))
+        self.maintenance = self._bitmap(maintenance_intervals, {0: 0}, 1)[0]
+        logging.info(f"Availability engine loaded {len(self.trainer_ids)} trainers and {len(self.room_ids)} rooms "
+                     f"over {self.slot_count} slots")
+        return self
+
+    def _bitmap(self, intervals, rows, row_count):
+        """
+        Marks every slot touched by an interval, using a difference array so all intervals are applied at once.
+        """
+        diff = np.zeros((row_count, self.slot_count + 1), dtype=np.int32)
+        intervals = [res for res in intervals if res[0] in rows]
+        if intervals:
+            row_idx = np.array([rows[res[0]] for res in intervals], dtype=np.int64)
+            first = self._slot_index([res[1] for res in intervals], np.floor_divide)
+            last = self._slot_index([res[2] for res in intervals], lambda a, b: -np.floor_divide(-a, b))
+            np.add.at(diff, (row_idx, first), 1)
+            np.add.at(diff, (row_idx, last), -1)
+        return np.cumsum(diff[:, :-1], axis=1) > 0
+
+    def _slot_index(self, times, rounding):
+        offsets = np.array(times, dtype='datetime64[m]') - np.datetime64(self.horizon_start, 'm')
+        return np.clip(rounding(offsets.astype(np.int64), SLOT_MINUTES), 0, self.slot_count)
+
+    def slot_time(self, slot):
+        return self.horizon_start + timedelta(minutes=SLOT_MINUTES * int(slot))
+
+    def slot_of(self, start_time):
+        return int((start_time - self.horizon_start) // timedelta(minutes=SLOT_MINUTES))
+
+    @staticmethod
+    def window_starts(free, duration):
+        """
+        Given free flags of shape (..., slots), returns flags marking every slot where a window of
+        the given duration in minutes can start. Equivalent to convolving with a run of ones.
+        """
+        length = -(-duration // SLOT_MINUTES)
+        counts = np.concatenate([np.zeros(free.shape[:-1] + (1,), dtype=np.int64), np.cumsum(free, axis=-1)], axis=-1)
+        starts = np.zeros(free.shape, dtype=bool)
+        if length <= free.shape[-1]:
+            starts[..., :free.shape[-1] - length + 1] = (counts[..., length:] - counts[..., :-length]) == length
+        return starts
+
+    def trainer_free(self, session_type='Personal Training'):
+        """
+        Returns the free flags for every trainer, shape (trainers, slots).
+        Group classes and trainers who need the equipment are blocked by maintenance.
+        """
+        if session_type == 'Group Class':
+            blocked = np.ones(len(self.trainer_ids), dtype=bool)
+        else:
+            blocked = ~np.isin(self.specializations, MAINTENANCE_EXEMPT_SPECIALIZATIONS)
+        return ~self.trainer_busy & ~(blocked[:, None] & self.maintenance[None, :])
+
+    def free_windows(self, duration, session_type='Personal Training', trainer_ids=None):
+        """
+        Finds every free window of the given length for each trainer.
+
+        Args:
+            duration (int): The session length in minutes.
+            session_type (str): 'Personal Training' or 'Group Class'.
+            trainer_ids (list): Optional trainers to include, defaults to all of them.
+
+        Returns:
+            dict: TrainerID mapped to the list of start datetimes where the trainer is free.
+        """
+        starts = self.window_starts(self.trainer_free(session_type), duration)
+        rows = range(len(self.trainer_ids)) if trainer_ids is None else \
+            [self.trainer_rows[trainer_id] for trainer_id in trainer_ids if trainer_id in self.trainer_rows]
+        return {int(self.trainer_ids[row]): [self.slot_time(slot) for slot in np.flatnonzero(starts[row])] for row in rows}
+
+    def class_window_starts(self, class_name, duration):
+        """
+        Returns (trainer ids, room ids, start flags) for a class type, where the start flags have shape
+        (trainers, rooms, slots) and are True when that trainer and room are both free for the whole class.
+        """
+        trainer_rows = np.flatnonzero(self.specializations == class_name)
+        room_rows = np.flatnonzero(self.room_types == class_name)
+        trainer_free = self.trainer_free('Group Class')[trainer_rows]
+        room_free = ~self.room_busy[room_rows] & ~self.maintenance[None, :]
+        starts = self.window_starts(trainer_free[:, None, :] & room_free[None, :, :], duration)
+        return self.trainer_ids[trainer_rows], self.room_ids[room_rows], starts
+
+    def class_windows(self, class_name, duration):
+        """
+        Lists every (trainer_id, room_id, start) combination where a class of this type can be scheduled.
+        """
+        trainer_ids, room_ids, starts = self.class_window_starts(class_name, duration)
+        return [(int(trainer_ids[t]), int(room_ids[r]), self.slot_time(slot)) for t, r, slot in zip(*np.nonzero(starts))]
+
+    def earliest(self, starts, limit, first_slot=0):
+        """
+        Returns up to limit (index, slot) pairs from start flags of shape (..., slots), ordered by slot,
+        without listing every match.
+        """
+        results = []
+        slot_has_start = starts.reshape(-1, self.slot_count).any(axis=0)
+        for slot in np.flatnonzero(slot_has_start[first_slot:]) + first_slot:
+            for index in np.argwhere(starts[..., slot]):
+                results.append((tuple(int(i) for i in index), int(slot)))
+                if len(results) == limit:
+                    return results
+        return results
+
+
+def find_next_available_slots(name, duration, window_start, window_end, limit=10, session_type='Group Class'):
+    """
+    Searches every trainer who can run a session for the earliest feasible start times.
+
+    Args:
+        name (str): The class type for a group class, or the trainer specialization for personal training.
+        duration (int): The session length in minutes, one of get_duration's choices.
+        window_start (datetime): The earliest allowed start.
+        window_end (datetime): The latest allowed end.
+        limit (int): The number of options to return.
+        session_type (str): 'Group Class' or 'Personal Training'.
+
+    Returns:
+        list: Up to limit (trainer_id, room_id, start) tuples ordered by start time. room_id is None
+        for personal training, which does not book a room.
+    """
+    days = (window_end.date() - window_start.date()).days + 1
+    engine = AvailabilityEngine(window_start, days=days)
+    first_slot = max(0, -(-(window_start - engine.horizon_start) // timedelta(minutes=SLOT_MINUTES)))
+    last_slot = engine.slot_of(window_end - timedelta(minutes=duration))
+    # A window shorter than the session has no starts, and a negative last_slot would index from the end
+    if last_slot < first_slot:
+        return []
+
+    if session_type == 'Group Class':
+        engine.load(specializations=[name], room_types=[name])
+        trainer_ids, room_ids, starts = engine.class_window_starts(name, duration)
+        starts[..., last_slot + 1:] = False
+        return [(int(trainer_ids[t]), int(room_ids[r]), engine.slot_time(slot))
+                for (t, r), slot in engine.earliest(starts, limit, first_slot)]
+    else:
+        engine.load(specializations=[name], room_types=[])
+        starts = engine.window_starts(engine.trainer_free(session_type), duration)
+        starts[..., last_slot + 1:] = False
+        return [(int(engine.trainer_ids[t]), None, engine.slot_time(slot))
+                for (t,), slot in engine.earliest(starts, limit, first_slot)]
@@ -0,0 +1,678 @@
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from Workflow.db_connection import HealthClubDatabase
+from utils import is_equipment_under_maintenance, is_trainer_available, check_trainer_availability
+from admin import check_room_availability, check_for_overlapping_bookings
+from schedule_index import schedule_index
+from availability_engine import AvailabilityEngine, find_next_available_slots
+from dashboard_cache import dashboard_cache
+from trainer import search_members
+from billing import run_billing_cycle, billing_period
+from api import ApiClient, create_api_server
+from member import book_private_session, book_private_sessions, register_for_class, display_member_dashboard, load_member_dashboard, load_member_dashboards, fetch_personal_info, fetch_member_schedule, fetch_member_fitness_goals, fetch_member_health_metrics
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+
+#################################################### Connection Pool Section ###################################################
+
+# A typical availability lookup, the kind of COUNT(*) check every booking runs
+POOL_QUERY = """
+SELECT COUNT(*) FROM MemberSchedule
+WHERE TrainerID = %s AND Status != 'Cancelled';
+"""
+
+
+def run_threads(thread_count, queries_per_thread):
+    """
+    Runs the same query from several threads at once.
+
+    Args:
+        thread_count (int): The number of worker threads.
+        queries_per_thread (int): How many queries each thread runs.
+
+    Returns:
+        float: Queries per second over the whole run.
+    """
+    def worker():
+        for i in range(queries_per_thread):
+            db.execute_query(POOL_QUERY, (i % 7 + 1,), fetch=True)
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return thread_count * queries_per_thread / elapsed
+
+
+def benchmark_pool_scaling(max_threads=16, queries_per_thread=200):
+    """
+    Prints throughput as threads are added, first on the shared connection and then on the pool.
+    """
+    thread_counts = [1, 2, 4, 8, 16, 32]
+    thread_counts = [count for count in thread_counts if count <= max_threads]
+
+    print("Single shared connection:")
+    db.close_pool()
+    # The shared connection is not safe to use from several threads, so only measure one
+    print(f"  1 thread: {run_threads(1, queries_per_thread):.0f} queries/sec")
+
+    db.enable_pool(max_size=max_threads, min_size=max_threads)
+    print(f"Connection pool (max={max_threads}):")
+    for count in thread_counts:
+        print(f"  {count} threads: {run_threads(count, queries_per_thread):.0f} queries/sec")
+    db.close_pool()
+
+
+#################################################### Latency Helper Section ###################################################
+
+def measure_latency(func, calls):
+    """
+    Calls func once per argument tuple and returns the per-call latencies in milliseconds.
+    """
+    latencies = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize_latency(latencies):
+    """
+    Returns mean, p50, p95 and p99 in milliseconds for a list of latencies.
+    """
+    ordered = sorted(latencies)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99)
+    }
+
+
+def print_latency(label, latencies):
+    summary = summarize_latency(latencies)
+    print(f"  {label}: mean {summary['mean']:.2f} ms, p50 {summary['p50']:.2f} ms, p95 {summary['p95']:.2f} ms, p99 {summary['p99']:.2f} ms")
+
+
+def random_slot_strings(count, seed=0):
+    """
+    Returns (trainer_id, start_datetime_str, duration) tuples spread over a month, for availability checks.
+    """
+    rng = random.Random(seed)
+    trainer_ids = [res[0] for res in db.execute_query("SELECT TrainerID FROM Trainers", fetch=True)]
+    base = datetime(2024, 5, 1)
+    calls = []
+    for _ in range(count):
+        start = base + timedelta(minutes=30 * rng.randrange(31 * 48))
+        calls.append((rng.choice(trainer_ids), start.strftime('%m/%d/%Y %H:%M'), rng.choice([30, 60, 90, 120])))
+    return calls
+
+
+#################################################### Trainer Availability Section ###################################################
+
+def is_trainer_available_sequential(trainer_id, start_datetime_str, duration, session_type):
+    """
+    Equivalent of the previous utils.is_trainer_available, kept here as the baseline.
+    It sends up to four queries one after another.
+    """
+    start_time = datetime.strptime(start_datetime_str, '%m/%d/%Y %H:%M')
+    end_time = start_time + timedelta(minutes=duration)
+    if is_equipment_under_maintenance(start_datetime_str, duration):
+        query = "SELECT Specialization FROM Trainers WHERE TrainerID = %s"
+        specialization_result = db.execute_query(query, (trainer_id,), fetch=True)
+        specialization = specialization_result[0][0] if specialization_result else None
+        if specialization not in ['Weight Loss', 'Strength', 'Cardio', 'Rehab', 'Health']:
+            return False
+    query_unavailability = """
+    SELECT COUNT(*) FROM TrainerUnavailability
+    WHERE TrainerID = %s AND StartTime < %s AND EndTime > %s;
+    """
+    if db.execute_query(query_unavailability, (trainer_id, end_time, start_time), fetch=True)[0][0] > 0:
+        return False
+    query_appointments = """
+    SELECT COUNT(*) FROM MemberSchedule
+    WHERE TrainerID = %s AND NOT (
+        StartTime >= %s OR EndTime <= %s
+    ) AND Status != 'Cancelled';
+    """
+    return db.execute_query(query_appointments, (trainer_id, end_time, start_time), fetch=True)[0][0] == 0
+
+
+def benchmark_trainer_availability(calls=1000):
+    """
+    Compares per-call latency of the sequential availability check with the single-query version.
+    """
+    slots = [slot + ("Personal Training",) for slot in random_slot_strings(calls)]
+    print(f"Trainer availability ({calls} calls):")
+    print_latency("sequential queries", measure_latency(is_trainer_available_sequential, slots))
+    print_latency("single query", measure_latency(is_trainer_available, slots))
+
+
+#################################################### Schedule Index Section ###################################################
+
+def run_conflict_checks(slots, room_ids):
+    """
+    Runs every conflict check once per slot and returns the answers in order.
+    """
+    answers = []
+    for idx, (trainer_id, start_datetime_str, duration) in enumerate(slots):
+        start_time = datetime.strptime(start_datetime_str, '%m/%d/%Y %H:%M')
+        end_time = start_time + timedelta(minutes=duration)
+        answers.append((
+            check_trainer_availability(trainer_id, start_datetime_str, duration),
+            check_room_availability(room_ids[idx % len(room_ids)], start_datetime_str, duration),
+            is_equipment_under_maintenance(start_datetime_str, duration),
+            check_for_overlapping_bookings(start_time, end_time)
+        ))
+    return answers
+
+
+def benchmark_schedule_index(calls=1000, seed=0):
+    """
+    Answers the same random conflict checks with SQL and with a freshly loaded schedule index,
+    reports the latency of both and counts any answer where they disagree. The write hooks that
+    keep the index current are covered by tests/test_schedule_index.py.
+    """
+    slots = random_slot_strings(calls, seed)
+    room_ids = [res[0] for res in db.execute_query("SELECT RoomID FROM Rooms", fetch=True)]
+
+    schedule_index.unload()
+    start = time.perf_counter()
+    sql_answers = run_conflict_checks(slots, room_ids)
+    sql_elapsed = time.perf_counter() - start
+
+    schedule_index.load()
+    start = time.perf_counter()
+    index_answers = run_conflict_checks(slots, room_ids)
+    index_elapsed = time.perf_counter() - start
+
+    mismatches = [(slot, sql, idx) for slot, sql, idx in zip(slots, sql_answers, index_answers) if sql != idx]
+    print(f"Schedule index ({calls} random slots):")
+    print(f"  SQL checks: {sql_elapsed / calls * 1000:.3f} ms per slot")
+    print(f"  index checks: {index_elapsed / calls * 1000:.3f} ms per slot")
+    print(f"  mismatches: {len(mismatches)}")
+    for slot, sql, idx in mismatches[:10]:
+        print(f"    {slot}: SQL {sql} vs index {idx}")
+    return len(mismatches) == 0
+
+
+#################################################### Availability Engine Section ###################################################
+
+def benchmark_availability_engine(days=31):
+    """
+    Times loading the slot bitmaps and finding every free 60, 90 and 120 minute window for every trainer.
+    """
+    start = time.perf_counter()
+    engine = AvailabilityEngine(datetime(2024, 5, 1), days=days).load()
+    load_elapsed = time.perf_counter() - start
+    print(f"Availability engine ({len(engine.trainer_ids)} trainers, {days} days):")
+    print(f"  load: {load_elapsed * 1000:.1f} ms")
+    for duration in [60, 90, 120]:
+        start = time.perf_counter()
+        starts = engine.window_starts(engine.trainer_free(), duration)
+        elapsed = time.perf_counter() - start
+        print(f"  {duration} minute windows: {int(starts.sum())} found in {elapsed * 1000:.2f} ms")
+
+
+def benchmark_slot_search(calls=20, days=90):
+    """
+    Times the next-available search for every class type and specialization over a window.
+    """
+    window_start = datetime(2024, 5, 1)
+    window_end = window_start + timedelta(days=days)
+    print(f"Next available slot search ({days} day window):")
+    searches = [(name, 'Group Class') for name in ['Swimming', 'Cardio', 'Yoga', 'Strength']] + \
+               [(name, 'Personal Training') for name in ['Weight Loss', 'Rehab', 'Health']]
+    for name, session_type in searches:
+        latencies = measure_latency(find_next_available_slots,
+                                    [(name, 60, window_start, window_end, 10, session_type)] * calls)
+        print_latency(f"{name} ({session_type})", latencies)
+
+
+#################################################### Class Enrollment Section ###################################################
+
+def benchmark_enrollment(thread_count=16, class_count=20, attempts_per_thread=50, seed=0):
+    """
+    Stress test for register_for_class. Many threads sign random members up for a few classes at
+    once, then every class is checked against its room capacity. Reports sign-up attempts per second.
+    The classes are created far in the future and removed afterwards.
+    """
+    member_ids = [res[0] for res in db.execute_query("SELECT MemberID FROM Members ORDER BY MemberID LIMIT 1000;", fetch=True)]
+    if not member_ids:
+        print("No members found; load some data first.")
+        return False
+    room_id, trainer_id = db.execute_query("SELECT r.RoomID, t.TrainerID FROM Rooms r, Trainers t LIMIT 1;", fetch=True)[0]
+    base = datetime(2099, 1, 1)
+    class_ids = db.insert_many(
+        "FitnessClasses", ["ClassName", "RoomID", "TrainerID", "StartTime", "EndTime", "Status"],
+        [('Yoga', room_id, trainer_id, base + timedelta(hours=2 * i), base + timedelta(hours=2 * i + 1), 'Scheduled')
+         for i in range(class_count)],
+        returning="ClassID")
+
+    db.enable_pool(max_size=thread_count, min_size=thread_count)
+    results = []
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        for _ in range(attempts_per_thread):
+            results.append(register_for_class(rng.choice(member_ids), rng.choice(class_ids)))
+
+    threads = [threading.Thread(target=worker, args=(seed + i,)) for i in range(thread_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    db.close_pool()
+
+    check = db.execute_query("""
+    SELECT fc.ClassID, fc.EnrolledCount, r.Capacity,
+           (SELECT COUNT(*) FROM MemberSchedule ms WHERE ms.ClassID = fc.ClassID AND ms.Status != 'Cancelled')
+    FROM FitnessClasses fc JOIN Rooms r ON r.RoomID = fc.RoomID
+    WHERE fc.ClassID = ANY(%s);
+    """, (class_ids,), fetch=True)
+    over_capacity = [res for res in check if res[3] > res[2] or res[1] != res[3]]
+
+    db.execute_query("DELETE FROM MemberSchedule WHERE ClassID = ANY(%s);", (class_ids,))
+    db.execute_query("DELETE FROM FitnessClasses WHERE ClassID = ANY(%s);", (class_ids,))
+
+    succeeded = results.count("Registered for class successfully.")
+    print(f"Class enrollment ({thread_count} threads, {class_count} classes, {len(results)} attempts):")
+    print(f"  {len(results) / elapsed:.0f} sign-up attempts/sec, {succeeded} seats taken")
+    print(f"  classes over capacity or with a wrong counter: {len(over_capacity)}")
+    for res in over_capacity:
+        print(f"    class {res[0]}: counter {res[1]}, capacity {res[2]}, registrations {res[3]}")
+    return not over_capacity
+
+
+#################################################### Member Dashboard Section ###################################################
+
+def display_member_dashboard_sequential(member_id):
+    """
+    The previous display_member_dashboard, kept here as the baseline. It makes four round trips.
+    """
+    return {
+        "personal_info": fetch_personal_info(member_id),
+        "scheduled_classes": fetch_member_schedule(member_id),
+        "fitness_goals": fetch_member_fitness_goals(member_id),
+        "health_metrics": fetch_member_health_metrics(member_id)
+    }
+
+
+def sample_member_ids(count, seed=0):
+    member_ids = [res[0] for res in db.execute_query("SELECT MemberID FROM Members ORDER BY MemberID LIMIT 100000;", fetch=True)]
+    rng = random.Random(seed)
+    return [rng.choice(member_ids) for _ in range(count)] if member_ids else []
+
+
+def benchmark_dashboard(calls=1000, batch_size=100):
+    """
+    Compares dashboard latency for the four-query assembly, the single-query loader and the batch loader.
+    """
+    member_ids = sample_member_ids(calls)
+    if not member_ids:
+        print("No members found; load some data first.")
+        return
+    calls = [(member_id,) for member_id in member_ids]
+    print(f"Member dashboard ({len(calls)} members):")
+    print_latency("four queries", measure_latency(display_member_dashboard_sequential, calls))
+    print_latency("single query", measure_latency(load_member_dashboard, calls))
+    batches = [(member_ids[i:i + batch_size],) for i in range(0, len(member_ids), batch_size)]
+    batch_latencies = measure_latency(load_member_dashboards, batches)
+    print_latency(f"batch of {batch_size}, per batch", batch_latencies)
+    print(f"  batch of {batch_size}, per member: {sum(batch_latencies) / len(member_ids):.3f} ms")
+
+
+def benchmark_dashboard_cache(calls=1000, seed=0):
+    """
+    Opens dashboards with a skewed access pattern, where a few members reopen theirs often,
+    and prints latency together with the cache counters.
+    """
+    member_ids = sample_member_ids(max(1, calls // 10), seed)
+    if not member_ids:
+        print("No members found; load some data first.")
+        return
+    rng = random.Random(seed)
+    calls = [(member_ids[min(len(member_ids) - 1, int(rng.expovariate(5.0 / len(member_ids))))],) for _ in range(calls)]
+    dashboard_cache.clear()
+    dashboard_cache.reset_stats()
+    print(f"Dashboard cache ({len(calls)} opens over {len(set(calls))} members):")
+    print_latency("display_member_dashboard", measure_latency(display_member_dashboard, calls))
+    for name, value in dashboard_cache.stats().items():
+        print(f"  {name}: {value:.2f}" if isinstance(value, float) else f"  {name}: {value}")
+
+
+#################################################### Member Search Section ###################################################
+
+def benchmark_member_search(calls=1000, seed=0):
+    """
+    Times search_members for exact names, name prefixes and short infixes taken from real member names.
+    """
+    names = [res for res in db.execute_query("SELECT FirstName, LastName FROM Members ORDER BY MemberID LIMIT 100000;", fetch=True)]
+    if not names:
+        print("No members found; load some data first.")
+        return
+    rng = random.Random(seed)
+    samples = [rng.choice(names) for _ in range(calls)]
+    total = db.execute_query("SELECT COUNT(*) FROM Members;", fetch=True)[0][0]
+    print(f"Member search ({len(samples)} lookups over {total} members):")
+    print_latency("last name", measure_latency(search_members, [(last_name,) for _, last_name in samples]))
+    print_latency("prefix", measure_latency(search_members, [(first_name[:3],) for first_name, _ in samples]))
+    print_latency("infix", measure_latency(search_members, [(last_name[1:4],) for _, last_name in samples]))
+
+
+#################################################### Recurring Billing Section ###################################################
+
+def benchmark_billing(year=2000, month=1):
+    """
+    Bills every member for a scratch period, bills it again to show the re-run writes nothing,
+    then deletes the scratch charges. Pick a period with no real charges.
+    """
+    period_start, _ = billing_period(year, month)
+    members = db.execute_query("SELECT COUNT(*) FROM Members;", fetch=True)[0][0]
+    existing = db.execute_query("SELECT COUNT(*) FROM Payments WHERE BillingPeriod = %s;", (period_start,), fetch=True)[0][0]
+    if existing:
+        print(f"Period {year}-{month:02d} already has {existing} charges; choose another scratch period.")
+        return
+    print(f"Billing cycle ({members} members, period {year}-{month:02d}):")
+    try:
+        for label in ("first run", "re-run"):
+            results = run_billing_cycle(year, month)
+            written = sum(created + updated for service, (created, updated, _) in results.items() if service != 'seconds')
+            rate = written / results['seconds'] if results['seconds'] > 0 else 0.0
+            print(f"  {label}: {written} charges in {results['seconds']:.2f}s ({rate:.0f} charges/sec)")
+    finally:
+        db.execute_query("DELETE FROM Payments WHERE BillingPeriod = %s;", (period_start,))
+
+
+#################################################### Batch Booking Section ###################################################
+
+# Scratch year for booking benchmarks; every personal training session in it is deleted afterwards
+SCRATCH_YEAR = 2099
+
+
+def delete_scratch_sessions():
+    db.execute_query("DELETE FROM MemberSchedule WHERE Type = 'Personal Training' AND StartTime >= %s AND StartTime < %s;",
+                     (datetime(SCRATCH_YEAR, 1, 1), datetime(SCRATCH_YEAR + 1, 1, 1)))
+    dashboard_cache.clear()
+    if schedule_index.loaded:
+        schedule_index.load()
+
+
+def benchmark_batch_booking(count=500, seed=0):
+    """
+    Books the same series of private sessions one call at a time and then as one batch, and checks
+    that both book the same sessions. Some requests deliberately overlap for the same trainer.
+    """
+    rng = random.Random(seed)
+    member_ids = sample_member_ids(count, seed)
+    trainer_ids = [res[0] for res in db.execute_query("SELECT TrainerID FROM Trainers;", fetch=True)]
+    if not (member_ids and trainer_ids):
+        print("No members or trainers found; load some data first.")
+        return
+    existing = db.execute_query("SELECT COUNT(*) FROM MemberSchedule WHERE Type = 'Personal Training' AND StartTime >= %s;",
+                                (datetime(SCRATCH_YEAR, 1, 1),), fetch=True)[0][0]
+    if existing:
+        print(f"{existing} sessions already booked in {SCRATCH_YEAR}; remove them before running this benchmark.")
+        return
+    # A few days per trainer keep the series dense enough to produce conflicts
+    days = max(1, count // (len(trainer_ids) * 4))
+    bookings = []
+    for member_id in member_ids:
+        start = datetime(SCRATCH_YEAR, 1, 1) + timedelta(days=rng.randrange(days), hours=rng.randrange(8, 20), minutes=rng.choice([0, 30]))
+        bookings.append((member_id, rng.choice(trainer_ids), start.strftime('%m/%d/%Y %H:%M'), rng.choice([30, 60, 90])))
+
+    print(f"Private session booking ({count} requests):")
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        start = time.perf_counter()
+        sequential = [book_private_session(*booking) for booking in bookings]
+        sequential_seconds = time.perf_counter() - start
+        sequential_booked = sum(message == "Private training session booked successfully." for message in sequential)
+        delete_scratch_sessions()
+
+        start = time.perf_counter()
+        batch = book_private_sessions(bookings)
+        batch_seconds = time.perf_counter() - start
+        batch_booked = sum(result['reason'] is None for result in batch)
+    finally:
+        logging.getLogger().setLevel(logging.INFO)
+        delete_scratch_sessions()
+    print(f"  one at a time: {sequential_booked} booked in {sequential_seconds:.2f}s ({count / sequential_seconds:.0f} requests/sec)")
+    print(f"  batch:         {batch_booked} booked in {batch_seconds:.2f}s ({count / batch_seconds:.0f} requests/sec)")
+    mismatched = sum((message == "Private training session booked successfully.") != (result['reason'] is None)
+                     for message, result in zip(sequential, batch))
+    if mismatched:
+        print(f"  WARNING: {mismatched} requests had a different outcome in the batch")
+
+
+#################################################### HTTP API Section ###################################################
+
+# Relative frequency of each request in the API load test. Registering for a class is always
+# followed by dropping it again, so the mix leaves enrollment counts as it found them.
+API_MIX = [('member_dashboard', 5), ('trainer_sessions', 2), ('trainer_member_search', 2), ('admin_payments', 1), ('class_round_trip', 1)]
+
+
+class ApiLoadContext:
+    """
+    Logins and IDs sampled from the database for the API load test.
+    """
+
+    def __init__(self, seed=0, sample_size=200):
+        rng = random.Random(seed)
+        members = db.execute_query("SELECT Email, Password, LastName FROM Members ORDER BY MemberID LIMIT 100000;", fetch=True)
+        self.members = rng.sample(members, min(sample_size, len(members)))
+        self.trainers = db.execute_query("SELECT Email, COALESCE(NULLIF(Password, ''), 'password') FROM Trainers;", fetch=True)
+        admin = db.execute_query("SELECT Password FROM AdministrativeStaff WHERE AdminID = 1;", fetch=True)
+        # An unset password is set by the first login, as in the console
+        self.admin_password = (admin[0][0] if admin else None) or 'admin'
+        self.class_ids = [res[0] for res in db.execute_query(
+            "SELECT ClassID FROM FitnessClasses WHERE Status = 'Scheduled' ORDER BY ClassID DESC LIMIT %s;", (sample_size,), fetch=True)]
+        if not (self.members and self.trainers and self.class_ids):
+            raise ValueError("The database needs members, trainers and scheduled classes; run data_generator.py first.")
+
+
+def api_load_worker(base_url, ctx, deadline, seed, results):
+    """
+    Logs in as a member, a trainer and the admin, then sends the API_MIX until the deadline.
+    Appends (request name, status, milliseconds) to results.
+    """
+    rng = random.Random(seed)
+    member_email, member_password, last_name = rng.choice(ctx.members)
+    clients = {role: ApiClient(base_url) for role in ('member', 'trainer', 'admin')}
+    clients['member'].login('member', member_password, member_email)
+    trainer_email, trainer_password = rng.choice(ctx.trainers)
+    clients['trainer'].login('trainer', trainer_password, trainer_email)
+    clients['admin'].login('admin', ctx.admin_password)
+    names, weights = zip(*API_MIX)
+
+    def timed(name, role, method, path, body=None):
+        start = time.perf_counter()
+        status, data = clients[role].request(method, path, body)
+        results.append((name, status, (time.perf_counter() - start) * 1000))
+        return status
+
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            if name == 'member_dashboard':
+                timed(name, 'member', 'GET', '/members/me/dashboard')
+            elif name == 'trainer_sessions':
+                timed(name, 'trainer', 'GET', '/trainers/me/sessions')
+            elif name == 'trainer_member_search':
+                timed(name, 'trainer', 'GET', f"/trainers/me/members?name={rng.choice(ctx.members)[2][:3]}&limit=20")
+            elif name == 'admin_payments':
+                timed(name, 'admin', 'GET', '/admin/payments?page_size=20')
+            else:
+                class_id = rng.choice(ctx.class_ids)
+                if timed('register_for_class', 'member', 'POST', '/members/me/classes', {'class_id': class_id}) == 200:
+                    timed('drop_class', 'member', 'DELETE', f"/members/me/classes/{class_id}")
+    finally:
+        for client in clients.values():
+            client.close()
+
+
+def benchmark_api(thread_count=16, seconds=10, url=None, seed=0):
+    """
+    Load-tests the HTTP API with thread_count clients for the given number of seconds and reports
+    requests per second and latency percentiles overall and per request. Without url an API server
+    is started in this process on a free port; pass the URL of a separately started api.py to keep
+    the clients and the server from sharing one interpreter.
+    """
+    ctx = ApiLoadContext(seed)
+    server = None
+    if url is None:
+        server = create_api_server(port=0, pool_size=thread_count)
+        threading.Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+    # Request logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=api_load_worker, args=(url, ctx, deadline, seed + i, results)) for i in range(thread_count)]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        logging.getLogger().setLevel(logging.INFO)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    elapsed = time.perf_counter() - start
+    if not results:
+        print("No requests completed.")
+        return
+
+    failures = Counter(status for _, status, _ in results if status >= 400)
+    print(f"API load test against {url} ({thread_count} clients, {elapsed:.1f}s):")
+    print(f"  {len(results)} requests, {len(results) / elapsed:.0f} requests/sec, "
+          f"{sum(failures.values())} refused or failed {dict(failures) if failures else ''}")
+    print_latency("all requests", [ms for _, _, ms in results])
+    by_name = {}
+    for name, _, ms in results:
+        by_name.setdefault(name, []).append(ms)
+    for name, latencies in sorted(by_name.items()):
+        print_latency(f"{name} ({len(latencies)})", latencies)
+
+
+#################################################### Startup Section ###################################################
+
+# Modules timed by the startup benchmark, in the order the console app needs them
+STARTUP_MODULES = ['auth', 'utils', 'trainer', 'member', 'admin', 'main']
+
+# Run in a fresh interpreter per measurement. The database instance is created first with the
+# host under test, so every module that imports it shares that instance.
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from Workflow.db_connection import HealthClubDatabase
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host={host!r})
+import {module}
+imported = time.perf_counter()
+connected = db.connection is not None or db.pool is not None
+boot_ms = None
+if {boot!r}:
+    {module}.boot(boot_delay=0)
+    boot_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'boot_ms': boot_ms, 'connected': connected}}))
+"""
+
+
+def measure_startup(module, host, boot=False):
+    """
+    Imports module in a new interpreter and returns its import time, the boot time for main,
+    the whole process time in milliseconds and whether importing opened a database connection.
+    """
+    script = STARTUP_SCRIPT.format(module=module, host=host, boot=boot)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, text=True)
+    process_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process_ms'] = process_ms
+    return result
+
+
+def benchmark_startup(runs=5, database_down=True):
+    """
+    Times importing each console module, and booting main, in fresh interpreters. With database_down
+    the instance points at a socket directory that does not exist, so any connection attempt fails at
+    once; importing must not try to connect at all.
+    """
+    host = '/nonexistent-hfc-database' if database_down else 'localhost'
+    baseline = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline.append((time.perf_counter() - start) * 1000)
+    baseline = statistics.median(baseline)
+    print(f"Startup ({runs} runs each, database {'down' if database_down else 'up'}, "
+          f"bare interpreter {baseline:.0f} ms):")
+    for module in STARTUP_MODULES:
+        results = [measure_startup(module, host, boot=module == 'main') for _ in range(runs)]
+        line = (f"  {module}: import {statistics.median(r['import_ms'] for r in results):.1f} ms, "
+                f"process {statistics.median(r['process_ms'] for r in results):.0f} ms")
+        if module == 'main':
+            line += f", boot {statistics.median(r['boot_ms'] for r in results):.1f} ms"
+        if any(r['connected'] for r in results):
+            line += ", CONNECTED AT IMPORT"
+        print(line)
+
+
+BENCHMARKS = {
+    "pool": lambda args: benchmark_pool_scaling(args.threads, args.queries),
+    "availability": lambda args: benchmark_trainer_availability(args.calls),
+    "index": lambda args: benchmark_schedule_index(args.calls),
+    "bitmap": lambda args: benchmark_availability_engine(),
+    "search": lambda args: benchmark_slot_search(),
+    "enroll": lambda args: benchmark_enrollment(args.threads),
+    "dashboard": lambda args: benchmark_dashboard(args.calls),
+    "cache": lambda args: benchmark_dashboard_cache(args.calls),
+    "members": lambda args: benchmark_member_search(args.calls),
+    "billing": lambda args: benchmark_billing(),
+    "startup": lambda args: benchmark_startup(args.runs, not args.database_up),
+    "api": lambda args: benchmark_api(args.threads, args.seconds, args.url),
+    "batch": lambda args: benchmark_batch_booking(args.calls),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Health and Fitness Club performance benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="which benchmark to run")
+    parser.add_argument("--threads", type=int, default=16, help="largest number of threads to test")
+    parser.add_argument("--queries", type=int, default=200, help="queries run by each thread")
+    parser.add_argument("--calls", type=int, default=1000, help="calls made by latency benchmarks")
+    parser.add_argument("--query-stats", action="store_true", help="print the most expensive queries afterwards")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters started per module by the startup benchmark")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of the API load test")
+    parser.add_argument("--url", help="load-test an API server already running at this URL, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--database-up", action="store_true", help="time startup against the real database instead of an unreachable one")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    db.query_stats.reset()
+    BENCHMARKS[args.benchmark](args)
+    if args.query_stats:
+        print(db.query_stats.report())
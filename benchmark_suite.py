@@ -0,0 +1,245 @@
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+from Workflow.db_connection import HealthClubDatabase
+from utils import is_equipment_under_maintenance, is_trainer_available
+from admin import check_room_availability, schedule_fitness_class
+from member import book_private_session, register_for_class, display_member_dashboard
+from trainer import search_member_by_name, search_members
+from auth import lookup_member_login, fetch_trainer_logins
+from dashboard_cache import dashboard_cache
+from data_generator import SCALES, generate_club
+from benchmark import summarize_latency
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(BENCHMARK_DIR, 'benchmark_history.json')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'benchmark_baseline.json')
+
+
+#################################################### Sample Data Section ###################################################
+
+class SuiteContext:
+    """
+    IDs, names and times sampled from the loaded data, so every case calls the hot path with realistic arguments.
+    """
+
+    def __init__(self, seed=0, sample_size=1000):
+        self.rng = random.Random(seed)
+        max_member_id = db.execute_query("SELECT COALESCE(MAX(MemberID), 0) FROM Members;", fetch=True)[0][0]
+        member_ids = [self.rng.randrange(1, max_member_id + 1) for _ in range(sample_size)] if max_member_id else []
+        self.members = db.execute_query("SELECT MemberID, FirstName, LastName, Email FROM Members WHERE MemberID = ANY(%s);",
+                                        (member_ids,), fetch=True)
+        self.trainers = db.execute_query("SELECT TrainerID, Specialization FROM Trainers;", fetch=True)
+        self.rooms = db.execute_query("SELECT RoomID, RoomType FROM Rooms;", fetch=True)
+        self.class_ids = [res[0] for res in db.execute_query(
+            "SELECT ClassID FROM FitnessClasses WHERE Status = 'Scheduled' ORDER BY ClassID DESC LIMIT %s;", (sample_size,), fetch=True)]
+        if not (self.members and self.trainers and self.rooms and self.class_ids):
+            raise ValueError("The database needs members, trainers, rooms and scheduled classes; run data_generator.py first.")
+        self.trainers_by_type = {}
+        for trainer_id, specialization in self.trainers:
+            self.trainers_by_type.setdefault(specialization, []).append(trainer_id)
+        self.rooms = [(room_id, room_type) for room_id, room_type in self.rooms if room_type in self.trainers_by_type]
+        # Times are drawn from the last month of the schedule, where bookings are densest
+        last_start = db.execute_query("SELECT MAX(StartTime) FROM FitnessClasses;", fetch=True)[0][0]
+        self.window_start = datetime(last_start.year, last_start.month, last_start.day) - timedelta(days=30)
+
+    def start_time(self):
+        start = self.window_start + timedelta(days=self.rng.randrange(30), minutes=30 * self.rng.randrange(12, 42))
+        return start.strftime('%m/%d/%Y %H:%M')
+
+    def duration(self):
+        return self.rng.choice([60, 90, 120])
+
+    def member(self):
+        return self.rng.choice(self.members)
+
+    def trainer_id(self):
+        return self.rng.choice(self.trainers)[0]
+
+    def room(self):
+        return self.rng.choice(self.rooms)
+
+
+#################################################### Benchmark Cases Section ###################################################
+
+def search_member_by_name_all(trainer_id, name):
+    # The search streams its results, so read them all as the trainer menu would
+    return sum(1 for _ in search_member_by_name(trainer_id, name))
+
+
+def schedule_fitness_class_case(ctx):
+    room_id, room_type = ctx.room()
+    return (room_type, room_id, ctx.rng.choice(ctx.trainers_by_type[room_type]), ctx.start_time(), ctx.duration())
+
+
+# Each case maps to the function it times and a builder that draws one call's arguments from the context
+SUITE_CASES = {
+    'is_trainer_available': (is_trainer_available, lambda ctx: (ctx.trainer_id(), ctx.start_time(), ctx.duration(),
+                                                                ctx.rng.choice(['Personal Training', 'Group Class']))),
+    'is_equipment_under_maintenance': (is_equipment_under_maintenance, lambda ctx: (ctx.start_time(), ctx.duration())),
+    'check_room_availability': (check_room_availability, lambda ctx: (ctx.room()[0], ctx.start_time(), ctx.duration())),
+    'schedule_fitness_class': (schedule_fitness_class, schedule_fitness_class_case),
+    'book_private_session': (book_private_session, lambda ctx: (ctx.member()[0], ctx.trainer_id(), ctx.start_time(), ctx.duration())),
+    'register_for_class': (register_for_class, lambda ctx: (ctx.member()[0], ctx.rng.choice(ctx.class_ids))),
+    'display_member_dashboard': (display_member_dashboard, lambda ctx: (ctx.member()[0],)),
+    'search_member_by_name': (search_member_by_name_all, lambda ctx: (ctx.trainer_id(), ctx.member()[2])),
+    'search_members': (search_members, lambda ctx: (ctx.member()[2][:3],)),
+    'member_login_by_email': (lookup_member_login, lambda ctx: (ctx.member()[3], True)),
+    'member_login_by_name': (lookup_member_login, lambda ctx: (ctx.member()[1], False)),
+    'trainer_login': (fetch_trainer_logins, lambda ctx: ()),
+}
+
+
+def run_case(func, build_args, ctx, calls, warmup=10):
+    """
+    Times calls calls of func and returns latency percentiles in milliseconds and calls per second.
+    """
+    for _ in range(warmup):
+        func(*build_args(ctx))
+    arguments = [build_args(ctx) for _ in range(calls)]
+    latencies = []
+    start = time.perf_counter()
+    for args in arguments:
+        call_start = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+    summary = summarize_latency(latencies)
+    summary['throughput'] = calls / elapsed if elapsed > 0 else 0.0
+    return summary
+
+
+#################################################### Suite Runner Section ###################################################
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scales, calls=200, seed=0, cases=None, print_query_stats=False):
+    """
+    Loads a synthetic club at each scale and times every hot path against it.
+
+    The generated tables are emptied and reloaded for every scale, so only run this against a
+    benchmark database.
+
+    Args:
+        scales (list): Names from data_generator.SCALES.
+        calls (int): Timed calls per case.
+        seed (int): Seed for the data and the call arguments.
+        cases (list): Optional case names, defaults to all of SUITE_CASES.
+        print_query_stats (bool): Print the most expensive queries after each scale.
+
+    Returns:
+        dict: A history record with the commit, the time and the results per scale and case.
+    """
+    cases = cases or list(SUITE_CASES)
+    record = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': current_commit(),
+              'seed': seed, 'calls': calls, 'results': {}}
+    # The functions under test log every call, which would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        for scale in scales:
+            print(f"Loading {scale} data set...")
+            loaded = generate_club(scale, seed, reset=True)
+            print(f"Loaded {sum(count for table, count in loaded.items() if table != 'seconds')} rows in {loaded['seconds']:.1f}s")
+            ctx = SuiteContext(seed)
+            dashboard_cache.clear()
+            db.query_stats.reset()
+            results = record['results'][scale] = {}
+            for name in cases:
+                func, build_args = SUITE_CASES[name]
+                results[name] = run_case(func, build_args, ctx, calls)
+                print_result(name, results[name])
+            if print_query_stats:
+                print(db.query_stats.report())
+    finally:
+        logging.getLogger().setLevel(logging.INFO)
+    return record
+
+
+def print_result(name, result):
+    print(f"  {name}: mean {result['mean']:.2f} ms, p50 {result['p50']:.2f} ms, p95 {result['p95']:.2f} ms, "
+          f"p99 {result['p99']:.2f} ms, {result['throughput']:.0f} calls/sec")
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def save_json(path, data):
+    with open(path, 'w') as json_file:
+        json.dump(data, json_file, indent=2)
+
+
+def append_history(record, path=HISTORY_PATH):
+    history = load_json(path, [])
+    history.append(record)
+    save_json(path, history)
+
+
+def find_regressions(record, baseline, threshold=0.2):
+    """
+    Compares a run with the baseline. A case regresses when its p95 latency grows, or its throughput
+    drops, by more than threshold (0.2 = 20%).
+
+    Returns:
+        list: (scale, case, metric, baseline value, current value) for every regression.
+    """
+    regressions = []
+    for scale, results in record['results'].items():
+        for name, result in results.items():
+            expected = baseline.get(scale, {}).get(name)
+            if expected is None:
+                continue
+            if result['p95'] > expected['p95'] * (1 + threshold):
+                regressions.append((scale, name, 'p95', expected['p95'], result['p95']))
+            if result['throughput'] < expected['throughput'] * (1 - threshold):
+                regressions.append((scale, name, 'throughput', expected['throughput'], result['throughput']))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling, booking, dashboard, search and login hot paths")
+    parser.add_argument("--scales", nargs='+', choices=sorted(SCALES), default=['tiny', 'small'], help="data sets to run against")
+    parser.add_argument("--calls", type=int, default=200, help="timed calls per case")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the data and the call arguments")
+    parser.add_argument("--cases", nargs='+', choices=sorted(SUITE_CASES), help="only run these cases")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline, 0.2 = 20%%")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON file the run is appended to")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file with the baseline results")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--query-stats", action="store_true", help="print the most expensive queries for each scale")
+    parser.add_argument("--yes", action="store_true", help="confirm that the database may be emptied and reloaded")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.yes:
+        raise SystemExit("The suite empties and reloads the club tables for every scale; pass --yes to confirm.")
+
+    record = run_suite(args.scales, args.calls, args.seed, args.cases, args.query_stats)
+    append_history(record, args.history)
+    baseline = load_json(args.baseline, {})
+    regressions = find_regressions(record, baseline, args.threshold)
+    if args.save_baseline:
+        baseline.update(record['results'])
+        save_json(args.baseline, baseline)
+        print(f"Baseline saved to {args.baseline}")
+    for scale, name, metric, expected, actual in regressions:
+        print(f"REGRESSION {scale} {name}: {metric} {actual:.2f} vs baseline {expected:.2f}")
+    if regressions and not args.save_baseline:
+        raise SystemExit(1)
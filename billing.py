@@ -0,0 +1,236 @@
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from Workflow.db_connection import HealthClubDatabase
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+
+#################################################### Recurring Billing Section ###################################################
+
+# Amount charged per billing period for the membership, and per session attended
+BILLING_RATES = {
+    'Membership Fee': 50.00,
+    'Personal Training': 40.00,
+    'Group Class': 15.00
+}
+
+# One statement bills the whole period. The unique index on (MemberID, Service, BillingPeriod) turns a
+# charge that already exists into an update: an unprocessed charge takes the new amount when more sessions
+# were booked or cancelled since, and a processed one is left as it was. xmax is 0 only on inserted rows.
+BILLING_CYCLE_QUERY = """
+WITH charges AS (
+    SELECT MemberID, %(membership_fee)s::DECIMAL(10, 2) AS Amount, 'Membership Fee' AS Service
+    FROM Members
+    UNION ALL
+    SELECT MemberID, COUNT(*) * %(personal_training_rate)s::DECIMAL(10, 2), 'Personal Training'
+    FROM MemberSchedule
+    WHERE Type = 'Personal Training' AND Status != 'Cancelled' AND MemberID IS NOT NULL
+    AND StartTime >= %(period_start)s AND StartTime < %(period_end)s
+    GROUP BY MemberID
+    UNION ALL
+    SELECT ms.MemberID, COUNT(*) * %(group_class_rate)s::DECIMAL(10, 2), 'Group Class'
+    FROM MemberSchedule ms
+    JOIN FitnessClasses fc ON fc.ClassID = ms.ClassID
+    WHERE ms.Type = 'Group Fitness Class' AND ms.Status != 'Cancelled' AND fc.Status != 'Cancelled' AND ms.MemberID IS NOT NULL
+    AND fc.StartTime >= %(period_start)s AND fc.StartTime < %(period_end)s
+    GROUP BY ms.MemberID
+), billed AS (
+    INSERT INTO Payments (MemberID, Amount, PaymentDate, Service, Status, BillingPeriod)
+    SELECT MemberID, Amount, %(billed_at)s, Service, 'Unprocessed', %(period_start)s::DATE
+    FROM charges
+    ON CONFLICT (MemberID, Service, BillingPeriod) WHERE BillingPeriod IS NOT NULL
+    DO UPDATE SET Amount = EXCLUDED.Amount
+    WHERE Payments.Status = 'Unprocessed' AND Payments.Amount IS DISTINCT FROM EXCLUDED.Amount
+    RETURNING Service, Amount, xmax = 0 AS created
+)
+SELECT Service, COUNT(*) FILTER (WHERE created), COUNT(*) FILTER (WHERE NOT created), COALESCE(SUM(Amount), 0)
+FROM billed GROUP BY Service;
+"""
+
+
+def billing_period(year, month):
+    """
+    Returns the first day of the given month and of the month after it.
+    """
+    period_start = datetime(year, month, 1)
+    period_end = datetime(year + month // 12, month % 12 + 1, 1)
+    return period_start, period_end
+
+
+def run_billing_cycle(year, month, rates=None):
+    """
+    Generates the charges for one monthly billing period: a membership fee for every member, plus
+    personal training and group class charges for the sessions each member had in that month.
+
+    The whole cycle is a single set-based INSERT ... SELECT. Running it again for the same period adds
+    the charges that are missing, such as the membership fee of a member who joined since, and
+    re-prices the unprocessed usage charges of members who booked or cancelled sessions since. A
+    charge that was already processed is final, so later usage in that period is not billed again.
+
+    Args:
+        year (int): The year of the billing period.
+        month (int): The month of the billing period.
+        rates (dict): Optional amounts overriding BILLING_RATES.
+
+    Returns:
+        dict: Service mapped to (charges created, charges updated, total amount of those charges),
+        plus 'seconds' for the run time.
+    """
+    rates = dict(BILLING_RATES, **(rates or {}))
+    period_start, period_end = billing_period(year, month)
+    params = {
+        'membership_fee': rates['Membership Fee'],
+        'personal_training_rate': rates['Personal Training'],
+        'group_class_rate': rates['Group Class'],
+        'period_start': period_start,
+        'period_end': period_end,
+        'billed_at': datetime.now()
+    }
+    start = time.perf_counter()
+    with db.borrow_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(BILLING_CYCLE_QUERY, params)
+            results = {service: (0, 0, 0) for service in BILLING_RATES}
+            results.update({service: (created, updated, amount) for service, created, updated, amount in cur.fetchall()})
+    results['seconds'] = time.perf_counter() - start
+    created = sum(results[service][0] for service in BILLING_RATES)
+    updated = sum(results[service][1] for service in BILLING_RATES)
+    logging.info(f"Billing cycle {period_start:%Y-%m}: created {created} and updated {updated} charges "
+                 f"in {results['seconds']:.2f}s")
+    return results
+
+
+def print_billing_summary(year, month, results):
+    print(f"Billing cycle {year}-{month:02d}:")
+    for service in BILLING_RATES:
+        created, updated, amount = results[service]
+        print(f"  {service}: {created} charges created, {updated} updated, ${amount}")
+    print(f"  Time: {results['seconds']:.2f}s")
+
+
+#################################################### Batch Payment Processing Section ###################################################
+
+def count_unprocessed_payments(service=None, member_id=None, start_date=None, end_date=None):
+    # admin imports this module, so its filter is imported here rather than at the top
+    from admin import unprocessed_payments_filter
+    _, conditions, params = unprocessed_payments_filter(service, member_id, start_date, end_date)
+    with db.borrow_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*), COALESCE(SUM(Amount), 0) FROM Payments WHERE {' AND '.join(conditions)};", params)
+            return cur.fetchone()
+
+
+def process_payments_batch(chunk_size=1000, service=None, member_id=None, start_date=None, end_date=None, report_every=1):
+    """
+    Marks every unprocessed payment matching the filters as processed, one chunk per transaction.
+
+    Each chunk is a single UPDATE ... RETURNING over the next chunk_size unprocessed payments in PaymentID
+    order. A chunk is either fully committed or not applied at all, so an interrupted run can simply be
+    started again: it carries on with the payments that are still unprocessed. Rows locked by another
+    run are skipped, so two runs can share the work without processing a payment twice.
+
+    Args:
+        chunk_size (int): The number of payments settled per transaction.
+        service (str): Only payments for this service.
+        member_id (int): Only payments made by this member.
+        start_date (datetime): Only payments made on or after this date.
+        end_date (datetime): Only payments made before this date.
+        report_every (int): Log progress after this many chunks.
+
+    Returns:
+        dict: Summary with the number of payments processed, their total amount, the chunk count,
+        the elapsed seconds, the payments per second and whether the run completed.
+    """
+    from admin import unprocessed_payments_filter
+    _, conditions, params = unprocessed_payments_filter(service, member_id, start_date, end_date)
+    params['chunk_size'] = chunk_size
+    query = f"""
+    WITH batch AS (
+        SELECT PaymentID FROM Payments
+        WHERE {' AND '.join(conditions)}
+        ORDER BY PaymentID
+        LIMIT %(chunk_size)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE Payments p SET Status = 'Processed'
+    FROM batch
+    WHERE p.PaymentID = batch.PaymentID
+    RETURNING p.PaymentID, p.Amount;
+    """
+    remaining, _ = count_unprocessed_payments(service, member_id, start_date, end_date)
+    logging.info(f"Processing {remaining} unprocessed payments in chunks of {chunk_size}")
+
+    processed, total_amount, chunks, last_payment_id = 0, 0, 0, None
+    completed = False
+    start = time.perf_counter()
+    try:
+        with db.borrow_connection() as conn:
+            with conn.cursor() as cur:
+                while True:
+                    # The shared connection is in autocommit mode, so each chunk commits on its own
+                    cur.execute(query, params)
+                    rows = cur.fetchall()
+                    if not rows:
+                        completed = True
+                        break
+                    chunks += 1
+                    processed += len(rows)
+                    total_amount += sum(amount for _, amount in rows)
+                    last_payment_id = max(payment_id for payment_id, _ in rows)
+                    if chunks % report_every == 0:
+                        elapsed = time.perf_counter() - start
+                        logging.info(f"Processed {processed}/{max(remaining, processed)} payments "
+                                     f"(up to PaymentID {last_payment_id}, {processed / elapsed:.0f} payments/sec)")
+    except KeyboardInterrupt:
+        logging.warning(f"Payment processing interrupted after {processed} payments; run it again to resume.")
+    except Exception as e:
+        logging.error(f"Payment processing stopped after {processed} payments: {e}")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'processed': processed,
+        'amount': total_amount,
+        'chunks': chunks,
+        'last_payment_id': last_payment_id,
+        'seconds': elapsed,
+        'payments_per_second': processed / elapsed if elapsed > 0 else 0.0,
+        'completed': completed
+    }
+    logging.info(f"Processed {processed} payments totalling ${total_amount} in {chunks} chunks, "
+                 f"{elapsed:.2f}s ({summary['payments_per_second']:.0f} payments/sec)")
+    return summary
+
+
+def print_payment_summary(summary):
+    print(f"Payments processed: {summary['processed']}")
+    print(f"Total amount: ${summary['amount']}")
+    print(f"Chunks: {summary['chunks']}")
+    print(f"Time: {summary['seconds']:.2f}s ({summary['payments_per_second']:.0f} payments/sec)")
+    if not summary['completed']:
+        print("The run did not finish; run it again to process the remaining payments.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run a billing cycle or settle unprocessed payments in batches")
+    parser.add_argument("--cycle", type=lambda value: datetime.strptime(value, '%Y-%m'), help="bill this month, YYYY-MM, instead of settling payments")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="payments settled per transaction")
+    parser.add_argument("--service", choices=['Membership Fee', 'Personal Training', 'Group Class'], help="only this service")
+    parser.add_argument("--member", type=int, help="only payments made by this member")
+    parser.add_argument("--from-date", type=lambda value: datetime.strptime(value, '%Y-%m-%d'), help="first payment date, YYYY-MM-DD")
+    parser.add_argument("--to-date", type=lambda value: datetime.strptime(value, '%Y-%m-%d'), help="last payment date, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    if args.cycle:
+        results = run_billing_cycle(args.cycle.year, args.cycle.month)
+        print_billing_summary(args.cycle.year, args.cycle.month, results)
+        raise SystemExit(0)
+
+    end_date = args.to_date + timedelta(days=1) if args.to_date else None
+    summary = process_payments_batch(args.chunk_size, args.service, args.member, args.from_date, end_date)
+    print_payment_summary(summary)
+    if not summary['completed']:
+        raise SystemExit(1)
@@ -0,0 +1,318 @@
+import argparse
+import csv
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index
+from dashboard_cache import dashboard_cache
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+
+#################################################### Column Rules Section ###################################################
+
+class InvalidRow(ValueError):
+    """
+    Raised when a CSV row breaks one of the table's column rules.
+    """
+
+
+def text(max_length=255, required=False, choices=None):
+    def parse(value):
+        if value == '':
+            if required:
+                raise InvalidRow("is required")
+            return None
+        if len(value) > max_length:
+            raise InvalidRow(f"is longer than {max_length} characters")
+        if choices is not None and value not in choices:
+            raise InvalidRow(f"must be one of {', '.join(choices)}")
+        return value
+    return parse
+
+
+def integer(required=False):
+    def parse(value):
+        if value == '':
+            if required:
+                raise InvalidRow("is required")
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise InvalidRow("is not a whole number")
+    return parse
+
+
+def decimal(digits=10, places=2, required=False):
+    def parse(value):
+        if value == '':
+            if required:
+                raise InvalidRow("is required")
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise InvalidRow("is not a number")
+        if not number.is_finite() or abs(number) >= Decimal(10) ** (digits - places):
+            raise InvalidRow(f"does not fit DECIMAL({digits}, {places})")
+        return number
+    return parse
+
+
+def timestamp(required=False, date_only=False):
+    def parse(value):
+        if value == '':
+            if required:
+                raise InvalidRow("is required")
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise InvalidRow("is not a date and time in YYYY-MM-DD HH:MM:SS format")
+        return parsed.date() if date_only else parsed
+    return parse
+
+
+# The rules below mirror the NOT NULL, length and CHECK constraints in DDL.sql and the migrations.
+# The key column is optional in an import; when it is left out the database assigns new IDs.
+TABLES = {
+    'Members': ('MemberID', {
+        'MemberID': integer(),
+        'FirstName': text(required=True),
+        'LastName': text(required=True),
+        'Email': text(required=True),
+        'Password': text(required=True),
+    }),
+    'Trainers': ('TrainerID', {
+        'TrainerID': integer(),
+        'FirstName': text(required=True),
+        'LastName': text(required=True),
+        'Email': text(required=True),
+        'Password': text(),
+        'Specialization': text(choices=['Weight Loss', 'Strength', 'Cardio', 'Yoga', 'Swimming', 'Rehab', 'Health']),
+        'UnavailableTimes': text(),
+    }),
+    'MemberSchedule': ('ScheduleID', {
+        'ScheduleID': integer(),
+        'MemberID': integer(),
+        'TrainerID': integer(),
+        'ClassID': integer(),
+        'StartTime': timestamp(),
+        'EndTime': timestamp(),
+        'Status': text(choices=['Scheduled', 'Completed', 'Cancelled']),
+        'Type': text(choices=['Personal Training', 'Group Fitness Class']),
+    }),
+    'HealthMetrics': ('HealthMetricID', {
+        'HealthMetricID': integer(),
+        'MemberID': integer(),
+        'MetricType': text(choices=['Weight', 'Height', 'BMI', 'Allergies', 'BFP', 'Conditions']),
+        'MetricValue': text(),
+        'DateRecorded': timestamp(),
+    }),
+    'Payments': ('PaymentID', {
+        'PaymentID': integer(),
+        'MemberID': integer(),
+        'Amount': decimal(),
+        'PaymentDate': timestamp(),
+        'Service': text(choices=['Membership Fee', 'Personal Training', 'Group Class']),
+        'Status': text(),
+        'BillingPeriod': timestamp(date_only=True),
+    }),
+}
+
+
+# Same recount as migration 004, limited to the classes an import added registrations to
+RECOUNT_ENROLLMENT_QUERY = """
+UPDATE FitnessClasses fc
+SET EnrolledCount = (
+    SELECT COUNT(*) FROM MemberSchedule ms
+    WHERE ms.ClassID = fc.ClassID AND ms.Status != 'Cancelled'
+)
+WHERE fc.ClassID = ANY(%s);
+"""
+
+
+def check_row(rules, row):
+    """
+    Cross-column rules that CHECK constraints cannot express per column.
+    """
+    if 'StartTime' in rules and row.get('StartTime') and row.get('EndTime') and row['EndTime'] <= row['StartTime']:
+        raise InvalidRow("EndTime must be after StartTime")
+
+
+#################################################### Import Section ###################################################
+
+def resolve_table(table):
+    for name in TABLES:
+        if name.lower() == table.lower():
+            return name
+    raise ValueError(f"Unsupported table {table}; choose one of {', '.join(TABLES)}.")
+
+
+def validated_rows(table, reader, columns, rejects=None, stats=None):
+    """
+    Parses and validates CSV rows one at a time, yielding tuples ready for COPY.
+
+    Args:
+        table (str): The table the rows belong to.
+        reader (csv.reader): Reader positioned after the header row.
+        columns (list): The table columns, in the order of the CSV header.
+        rejects (csv.writer): Optional writer for invalid rows. Without it the first invalid row raises InvalidRow.
+        stats (dict): Counters updated as rows are read.
+    """
+    _, rules = TABLES[table]
+    parsers = [rules[column] for column in columns]
+    for line_number, values in enumerate(reader, start=2):
+        try:
+            if len(values) != len(columns):
+                raise InvalidRow(f"has {len(values)} fields, expected {len(columns)}")
+            row = {}
+            for column, parse, value in zip(columns, parsers, values):
+                try:
+                    row[column] = parse(value)
+                except InvalidRow as e:
+                    raise InvalidRow(f"{column} {e}")
+            check_row(rules, row)
+        except InvalidRow as e:
+            if rejects is None:
+                raise InvalidRow(f"{table} line {line_number}: {e}")
+            rejects.writerow(values + [f"line {line_number}: {e}"])
+            stats['rejected'] += 1
+            continue
+        stats['loaded'] += 1
+        yield tuple(row[column] for column in columns)
+
+
+def import_csv(table, path, rejects_path=None):
+    """
+    Loads a CSV file with a header row into a table using COPY.
+
+    Every row is checked against the table's column rules before it is sent, and the file is read as
+    COPY consumes it, so memory use stays the same for any file size. The load is one COPY statement:
+    either every valid row is loaded or, if the database rejects one (a duplicate email, an unknown
+    MemberID), none are. Class registrations in a MemberSchedule import are added to the classes'
+    EnrolledCount in the same transaction.
+
+    Args:
+        table (str): One of Members, Trainers, MemberSchedule, HealthMetrics or Payments.
+        path (str): The CSV file to load.
+        rejects_path (str): Optional CSV file for invalid rows, which are then skipped. Without it the
+            first invalid row stops the import before anything is loaded.
+
+    Returns:
+        dict: The number of rows loaded and rejected, the elapsed seconds and the rows per second.
+    """
+    table = resolve_table(table)
+    key_column, rules = TABLES[table]
+    stats = {'loaded': 0, 'rejected': 0}
+    start = time.perf_counter()
+    with open(path, newline='') as in_file:
+        reader = csv.reader(in_file)
+        header = next(reader, None)
+        if not header:
+            raise InvalidRow(f"{path} is empty; the first line must name the columns.")
+        columns = [resolve_column(rules, column) for column in header]
+        rejects_file = open(rejects_path, 'w', newline='') if rejects_path else None
+        try:
+            rejects = None
+            if rejects_file is not None:
+                rejects = csv.writer(rejects_file)
+                rejects.writerow(header + ['Error'])
+            rows = validated_rows(table, reader, columns, rejects, stats)
+            class_ids = set()
+            if table == 'MemberSchedule' and 'ClassID' in columns:
+                rows = collect_class_ids(rows, columns.index('ClassID'), class_ids)
+            with db.borrow_connection() as conn:
+                conn.autocommit = False
+                try:
+                    db.copy_rows(table, columns, rows, conn=conn)
+                    if class_ids:
+                        with conn.cursor() as cur:
+                            cur.execute(RECOUNT_ENROLLMENT_QUERY, (sorted(class_ids),))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+    if key_column in columns:
+        # Rows were loaded with their own IDs, so move the sequence past them
+        db.execute_query(f"SELECT setval(pg_get_serial_sequence('{table.lower()}', '{key_column.lower()}'), "
+                         f"COALESCE((SELECT MAX({key_column}) FROM {table}), 1));")
+    if table in ('MemberSchedule', 'HealthMetrics', 'Members'):
+        dashboard_cache.clear()
+    if table in ('MemberSchedule', 'Trainers') and schedule_index.loaded:
+        schedule_index.load()
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['loaded'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    logging.info(f"Imported {stats['loaded']} rows into {table} ({stats['rejected']} rejected) "
+                 f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/sec)")
+    return stats
+
+
+def collect_class_ids(rows, class_column, class_ids):
+    """
+    Passes rows through unchanged, adding every ClassID seen to class_ids.
+    """
+    for row in rows:
+        if row[class_column] is not None:
+            class_ids.add(row[class_column])
+        yield row
+
+
+def resolve_column(rules, column):
+    for name in rules:
+        if name.lower() == column.strip().lower():
+            return name
+    raise InvalidRow(f"Unknown column {column}; expected some of {', '.join(rules)}.")
+
+
+#################################################### Export Section ###################################################
+
+def export_csv(table, path, columns=None):
+    """
+    Writes a table to a CSV file with a header row using COPY, in key order.
+
+    Args:
+        table (str): One of Members, Trainers, MemberSchedule, HealthMetrics or Payments.
+        path (str): The CSV file to write.
+        columns (list): Optional columns to export, defaults to all of them.
+
+    Returns:
+        dict: The number of rows exported, the elapsed seconds and the rows per second.
+    """
+    table = resolve_table(table)
+    key_column, rules = TABLES[table]
+    columns = [resolve_column(rules, column) for column in columns] if columns else list(rules)
+    start = time.perf_counter()
+    with open(path, 'w', newline='') as out_file:
+        count = db.copy_to_file(table, columns, out_file, order_by=key_column)
+    elapsed = time.perf_counter() - start
+    return {'exported': count, 'seconds': elapsed, 'rows_per_second': count / elapsed if elapsed > 0 else 0.0}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Import or export club data as CSV using COPY")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("table", help=", ".join(TABLES))
+    parser.add_argument("path", help="the CSV file to read or write")
+    parser.add_argument("--rejects", help="on import, write invalid rows here and load the rest")
+    parser.add_argument("--columns", help="on export, comma-separated columns to include")
+    args = parser.parse_args()
+
+    if args.action == "import":
+        stats = import_csv(args.table, args.path, args.rejects)
+        print(f"Loaded {stats['loaded']} rows, rejected {stats['rejected']}, {stats['rows_per_second']:.0f} rows/sec")
+    else:
+        stats = export_csv(args.table, args.path, args.columns.split(',') if args.columns else None)
+        print(f"Exported {stats['exported']} rows, {stats['rows_per_second']:.0f} rows/sec")
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DashboardCache:
+    """
+    Per-member read-through cache for member dashboards.
+
+    Entries are kept in least-recently-used order up to max_size and expire after ttl seconds.
+    The member write functions call invalidate() for the member they changed, so a cached
+    dashboard is never older than the last write made through this process.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Loads in flight as member_id -> [loads, generation]. invalidate() bumps the generation so a
+        # load that started before it is not stored afterwards. A member is dropped once its last load
+        # finishes, so this only ever holds the members being loaded right now.
+        self.loads = {}
+        self.epoch = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, member_id, loader):
+        """
+        Returns the cached dashboard for the member, calling loader(member_id) on a miss.
+        The returned dictionary is shared with the cache and must not be modified.
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(member_id)
+            if entry is not None:
+                dashboard, expires_at = entry
+                if expires_at > now:
+                    self.entries.move_to_end(member_id)
+                    self.hits += 1
+                    return dashboard
+                del self.entries[member_id]
+                self.expirations += 1
+            self.misses += 1
+            load = self.loads.setdefault(member_id, [0, 0])
+            load[0] += 1
+            generation = (self.epoch, load[1])
+
+        try:
+            dashboard = loader(member_id)
+        except BaseException:
+            with self.lock:
+                self._finish_load(member_id)
+            raise
+
+        with self.lock:
+            if self._finish_load(member_id) == generation:
+                self.entries[member_id] = (dashboard, time.monotonic() + self.ttl)
+                self.entries.move_to_end(member_id)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return dashboard
+
+    def _finish_load(self, member_id):
+        """
+        Records that one load of the member is done and returns the generation it finished in.
+        """
+        load = self.loads[member_id]
+        load[0] -= 1
+        if not load[0]:
+            del self.loads[member_id]
+        return self.epoch, load[1]
+
+    def invalidate(self, *member_ids):
+        """
+        Drops the cached dashboards of the given members.
+        """
+        with self.lock:
+            for member_id in member_ids:
+                self.entries.pop(member_id, None)
+                if member_id in self.loads:
+                    self.loads[member_id][1] += 1
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache counters, for sizing max_size and ttl.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+# Shared dashboard cache
+dashboard_cache = DashboardCache()
@@ -0,0 +1,274 @@
+import argparse
+import builtins
+import io
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Workflow.db_connection import HealthClubDatabase
+import main
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+# Lines of this form split a script file into sessions
+SESSION_SEPARATOR = '---'
+
+# Placeholders filled per session from a randomly chosen member or trainer, e.g. {member_email}
+PLACEHOLDER_PATTERN = re.compile(r'\{((?:member|trainer|admin)_\w+)\}')
+
+# Per-thread script state, so every session in a parallel replay has its own input and output
+session_state = threading.local()
+
+
+class ScriptExhausted(EOFError):
+    """
+    Raised by input() when a session's script has no lines left, like input() at the end of stdin.
+    """
+
+
+#################################################### Scripted Console Section ###################################################
+
+original_input = builtins.input
+original_stdout = sys.stdout
+
+
+def scripted_input(prompt=''):
+    """
+    Replacement for input(). Inside a scripted session it answers with the next script line,
+    anywhere else it falls back to the real console.
+    """
+    lines = getattr(session_state, 'lines', None)
+    if lines is None:
+        return original_input(prompt)
+    line = next(lines, None)
+    if line is None:
+        raise ScriptExhausted("The session script ended before the session did.")
+    session_state.inputs += 1
+    sys.stdout.write(f"{prompt}{line}\n")
+    return line
+
+
+class SessionStdout(io.TextIOBase):
+    """
+    Replacement for sys.stdout that sends each scripted session's output to its own buffer,
+    so parallel sessions do not interleave on the console.
+    """
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        output = getattr(session_state, 'output', None)
+        return (output or original_stdout).write(text)
+
+    def flush(self):
+        original_stdout.flush()
+
+
+def install_scripted_console():
+    builtins.input = scripted_input
+    if not isinstance(sys.stdout, SessionStdout):
+        sys.stdout = SessionStdout()
+
+
+def uninstall_scripted_console():
+    builtins.input = original_input
+    sys.stdout = original_stdout
+
+
+def run_session(name, lines, keep_output=False):
+    """
+    Runs the main menu with one session's script as its input.
+
+    Args:
+        name (str): A label for the session in the results.
+        lines (list): The lines the user would type, in order.
+        keep_output (bool): Whether to return everything the session printed.
+
+    Returns:
+        dict: The session name, how it ended ('completed', 'exhausted' or 'error'), the seconds it took,
+        the number of inputs read and, if requested, its output.
+    """
+    session_state.lines = iter(lines)
+    session_state.inputs = 0
+    session_state.output = io.StringIO()
+    start = time.perf_counter()
+    error = None
+    try:
+        main.run_menu()
+        status = 'completed'
+    except ScriptExhausted:
+        status = 'exhausted'
+    except Exception as e:
+        status = 'error'
+        error = f"{type(e).__name__}: {e}"
+    result = {'name': name, 'status': status, 'seconds': time.perf_counter() - start, 'inputs': session_state.inputs}
+    if error:
+        result['error'] = error
+    if keep_output:
+        result['output'] = session_state.output.getvalue()
+    session_state.lines = None
+    session_state.output = None
+    return result
+
+
+#################################################### Script Files Section ###################################################
+
+def parse_sessions(path):
+    """
+    Reads a script file. Each line is one input; lines starting with # are comments and a line
+    containing only --- starts the next session. Blank lines are inputs (pressing Enter), except
+    at the start and end of a session.
+
+    Returns:
+        list: One list of input lines per session.
+    """
+    sessions, current = [], []
+    with open(path) as script_file:
+        for raw_line in script_file:
+            line = raw_line.rstrip('\r\n')
+            if line.strip() == SESSION_SEPARATOR:
+                sessions.append(current)
+                current = []
+            elif not line.lstrip().startswith('#'):
+                current.append(line)
+    sessions.append(current)
+    for session in sessions:
+        while session and not session[-1].strip():
+            session.pop()
+        while session and not session[0].strip():
+            session.pop(0)
+    return [session for session in sessions if session]
+
+
+def sample_placeholder_values(count, seed=0):
+    """
+    Picks a random member and trainer for each of count sessions, to fill the script placeholders.
+    Accounts without a password yet get a default, which the first-login prompt then stores.
+    """
+    rng = random.Random(seed)
+    max_member_id = db.execute_query("SELECT COALESCE(MAX(MemberID), 0) FROM Members;", fetch=True)[0][0]
+    member_ids = [rng.randrange(1, max_member_id + 1) for _ in range(count)] if max_member_id else []
+    members = db.execute_query("SELECT MemberID, FirstName, LastName, Email, Password FROM Members WHERE MemberID = ANY(%s);",
+                               (member_ids,), fetch=True)
+    # Trainers log in by their position in this list, as printed by the login menu
+    trainers = db.execute_query("SELECT TrainerID, Password FROM Trainers ORDER BY TrainerID;", fetch=True)
+    admin = db.execute_query("SELECT Password FROM AdministrativeStaff WHERE AdminID = 1;", fetch=True)
+    values = []
+    for _ in range(count):
+        member = rng.choice(members) if members else (0, '', '', '', '')
+        trainer_number = rng.randrange(len(trainers)) if trainers else 0
+        values.append({
+            'member_id': str(member[0]),
+            'member_first_name': member[1],
+            'member_last_name': member[2],
+            'member_email': member[3],
+            'member_password': member[4],
+            'trainer_number': str(trainer_number + 1),
+            'trainer_password': (trainers[trainer_number][1] if trainers else None) or 'password',
+            'admin_password': (admin[0][0] if admin else None) or 'admin'
+        })
+    return values
+
+
+def fill_placeholders(lines, values):
+    return [PLACEHOLDER_PATTERN.sub(lambda match: values.get(match.group(1), match.group(0)), line) for line in lines]
+
+
+#################################################### Replay Section ###################################################
+
+def replay(sessions, workers=8, repeat=1, seed=0, keep_output=False):
+    """
+    Replays scripted sessions against the menus, several at a time, and measures throughput.
+
+    Args:
+        sessions (list): Session scripts, as returned by parse_sessions.
+        workers (int): Sessions run in parallel. Above 1 the database switches to its connection pool.
+        repeat (int): How many times each session is replayed.
+        seed (int): Seed for the members and trainers used to fill placeholders.
+        keep_output (bool): Keep each session's output in its result.
+
+    Returns:
+        dict: Session counts by status, inputs read, elapsed seconds, sessions and inputs per second,
+        and the individual session results.
+    """
+    runs = [(f"session {index + 1}.{round_number + 1}", lines)
+            for round_number in range(repeat) for index, lines in enumerate(sessions)]
+    values = sample_placeholder_values(len(runs), seed)
+    runs = [(name, fill_placeholders(lines, session_values)) for (name, lines), session_values in zip(runs, values)]
+
+    if workers > 1 and db.pool is None:
+        db.enable_pool(max_size=workers, min_size=workers)
+    install_scripted_console()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session") as executor:
+            results = list(executor.map(lambda run: run_session(run[0], run[1], keep_output), runs))
+    finally:
+        uninstall_scripted_console()
+    elapsed = time.perf_counter() - start
+
+    summary = {status: sum(1 for result in results if result['status'] == status) for status in ('completed', 'exhausted', 'error')}
+    summary['sessions'] = len(results)
+    summary['inputs'] = sum(result['inputs'] for result in results)
+    summary['seconds'] = elapsed
+    summary['sessions_per_second'] = len(results) / elapsed if elapsed > 0 else 0.0
+    summary['inputs_per_second'] = summary['inputs'] / elapsed if elapsed > 0 else 0.0
+    latencies = sorted(result['seconds'] * 1000 for result in results)
+    summary['p50_ms'] = latencies[len(latencies) // 2] if latencies else 0.0
+    summary['p95_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+    summary['results'] = results
+    return summary
+
+
+def record_session(path, boot_delay=1):
+    """
+    Runs the menus interactively and appends every line typed to a script file, to replay later.
+    """
+    with open(path, 'a') as script_file:
+        def recording_input(prompt=''):
+            line = original_input(prompt)
+            script_file.write(line + '\n')
+            script_file.flush()
+            return line
+        builtins.input = recording_input
+        try:
+            main.main_menu(boot_delay)
+        finally:
+            builtins.input = original_input
+            script_file.write(SESSION_SEPARATOR + '\n')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Drive the club menus from scripts instead of the keyboard")
+    parser.add_argument("script", help="session script file to replay, or to append to with --record")
+    parser.add_argument("--record", action="store_true", help="run interactively and record the session to the script file")
+    parser.add_argument("--workers", type=int, default=8, help="sessions run in parallel")
+    parser.add_argument("--repeat", type=int, default=1, help="times each session is replayed")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the placeholder values")
+    parser.add_argument("--show-output", action="store_true", help="print each session's output")
+    args = parser.parse_args()
+
+    if args.record:
+        record_session(args.script)
+        raise SystemExit(0)
+
+    # No fake boot delay when replaying
+    main.boot(boot_delay=0)
+    summary = replay(parse_sessions(args.script), args.workers, args.repeat, args.seed, args.show_output)
+    for result in summary['results']:
+        if result['status'] == 'error':
+            print(f"{result['name']} failed: {result['error']}")
+        if args.show_output:
+            print(f"===== {result['name']} ({result['status']}) =====\n{result['output']}")
+    print(f"Sessions: {summary['sessions']} ({summary['completed']} completed, {summary['exhausted']} ran out of input, "
+          f"{summary['error']} failed)")
+    print(f"Inputs: {summary['inputs']}")
+    print(f"Time: {summary['seconds']:.2f}s, {summary['sessions_per_second']:.1f} sessions/sec, "
+          f"{summary['inputs_per_second']:.0f} inputs/sec")
+    print(f"Session latency: p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms")
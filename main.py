@@ -1,18 +1,36 @@
 import time
+import logging
 from Workflow.auth import setup_admin, admin_login, trainer_login, register_trainer, member_login, register_member
 from Operations.admin import manage_classes, manage_maintenance, manage_payments
 from Operations.member import view_dashboard, manage_appointments, update_profile
 from Operations.trainer import view_schedule, manage_availability, view_member_profiles
+from schedule_index import schedule_index
+from metrics import WORKFLOW_SECONDS, start_metrics_server
 
-def main_menu():
+def boot(boot_delay=1):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     print("""
 Welcome to the Health and Fitness Club Management Simulation!
 Please wait while the simulation boots up!
 """)
     for percent in [0, 25, 75, 100]:
         print(f"{percent}%")
-        time.sleep(1)  # Simulate loading
+        time.sleep(boot_delay)  # Simulate loading
+    try:
+        schedule_index.load()
+    except Exception as e:
+        # Conflict checks fall back to querying the database while the index is not loaded
+        logging.warning(f"Schedule index not loaded: {e}")
+    try:
+        start_metrics_server()
+    except OSError as e:
+        logging.warning(f"Metrics endpoint not started: {e}")
 
+def main_menu(boot_delay=1):
+    boot(boot_delay)
+    run_menu()
+
+def run_menu():
     while True:
         print("""
 What would you like to continue as:
@@ -87,11 +105,14 @@ Select an option:
 4. Logout""")
         choice = input("Enter your choice: ")
         if choice == '1':
-            manage_classes()
+            with WORKFLOW_SECONDS.time('admin', 'manage_classes'):
+                manage_classes()
         elif choice == '2':
-            manage_maintenance()
+            with WORKFLOW_SECONDS.time('admin', 'manage_maintenance'):
+                manage_maintenance()
         elif choice == '3':
-            manage_payments()
+            with WORKFLOW_SECONDS.time('admin', 'manage_payments'):
+                manage_payments()
         elif choice == '4':
             print("Logging out...")
             break
@@ -108,11 +129,14 @@ Select an option:
 4. Logout""")
         choice = input("Enter your choice: ")
         if choice == '1':
-            view_schedule()
+            with WORKFLOW_SECONDS.time('trainer', 'view_schedule'):
+                view_schedule()
         elif choice == '2':
-            manage_availability()
+            with WORKFLOW_SECONDS.time('trainer', 'manage_availability'):
+                manage_availability()
         elif choice == '3':
-            view_member_profiles()
+            with WORKFLOW_SECONDS.time('trainer', 'view_member_profiles'):
+                view_member_profiles()
         elif choice == '4':
             print("Logging out...")
             break
@@ -130,11 +154,14 @@ Select an option:
 4. Logout""")
         choice = input("Enter your choice: ")
         if choice == '1':
-            view_dashboard()
+            with WORKFLOW_SECONDS.time('member', 'view_dashboard'):
+                view_dashboard()
         elif choice == '2':
-            update_profile()
+            with WORKFLOW_SECONDS.time('member', 'update_profile'):
+                update_profile()
         elif choice == '3':
-            manage_appointments()
+            with WORKFLOW_SECONDS.time('member', 'manage_appointments'):
+                manage_appointments()
         elif choice == '4':
             print("Logging out...")
             break
@@ -1,13 +1,13 @@
 import logging
 from datetime import datetime, timedelta
-from utils import format_datetime_for_postgres, is_trainer_available
+from utils import format_datetime_for_postgres, check_trainer_availability, AVAILABILITY_REASONS, MAINTENANCE_EXEMPT_SPECIALIZATIONS
 from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index, IntervalSet
+from dashboard_cache import dashboard_cache
+from metrics import record_booking
 
 db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
 
-# Setup basic configuration for logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 #################################################### Profile Management Section ################################################### 
 def update_member_profile(member_id, first_name=None, last_name=None, email=None, password=None):
     """
@@ -45,6 +45,7 @@ def update_member_profile(member_id, first_name=None, last_name=None, email=None
     params.append(member_id)
     try:
         db.execute_query(query, tuple(params))
+        dashboard_cache.invalidate(member_id)
         return "Profile updated successfully."
     except Exception as e:
         logging.error(f"Error updating member profile: {e}")
@@ -72,6 +73,7 @@ def add_fitness_goal(member_id, goal_type, target_value):
     query = "INSERT INTO FitnessGoals (MemberID, GoalType, TargetValue) VALUES (%s, %s, %s);"
     try:
         db.execute_query(query, (member_id, goal_type, target_value))
+        dashboard_cache.invalidate(member_id)
         return "Fitness goal added successfully."
     except Exception as e:
         logging.error(f"Failed to add fitness goal: {e}")
@@ -89,9 +91,10 @@ def update_fitness_goal(fitness_goal_id, new_target_value):
     Returns:
         str: Status message about the update of the fitness goal.
     """
-    query = "UPDATE FitnessGoals SET TargetValue = %s WHERE FitnessGoalID = %s;"
+    query = "UPDATE FitnessGoals SET TargetValue = %s WHERE FitnessGoalID = %s RETURNING MemberID;"
     try:
-        db.execute_query(query, (new_target_value, fitness_goal_id))
+        result = db.execute_query(query, (new_target_value, fitness_goal_id), fetch=True)
+        dashboard_cache.invalidate(*[res[0] for res in result])
         return "Fitness goal updated successfully."
     except Exception as e:
         logging.error(f"Failed to update fitness goal: {e}")
@@ -113,12 +116,28 @@ def add_health_metric(member_id, metric_type, metric_value):
     query = "INSERT INTO HealthMetrics (MemberID, MetricType, MetricValue) VALUES (%s, %s, %s);"
     try:
         db.execute_query(query, (member_id, metric_type, metric_value))
+        dashboard_cache.invalidate(member_id)
         return "Health metric added successfully."
     except Exception as e:
         logging.error(f"Failed to add health metric: {e}")
         return f"Error adding health metric: {e}"
 
 
+def add_health_metrics_bulk(metrics):
+    """
+    Adds many health metric readings at once, loading them with COPY.
+
+    Args:
+        metrics (iterable): Tuples of (member_id, metric_type, metric_value, date_recorded).
+
+    Returns:
+        int: The number of readings added.
+    """
+    count = db.copy_rows("HealthMetrics", ["MemberID", "MetricType", "MetricValue", "DateRecorded"], metrics)
+    dashboard_cache.clear()
+    return count
+
+
 def update_health_metric(health_metric_id, new_metric_value):
     """
     Updates an existing health metric with a new value.
@@ -130,9 +149,10 @@ def update_health_metric(health_metric_id, new_metric_value):
     Returns:
         str: Status message about the update of the health metric.
     """
-    query = "UPDATE HealthMetrics SET MetricValue = %s WHERE HealthMetricID = %s;"
+    query = "UPDATE HealthMetrics SET MetricValue = %s WHERE HealthMetricID = %s RETURNING MemberID;"
     try:
-        db.execute_query(query, (new_metric_value, health_metric_id))
+        result = db.execute_query(query, (new_metric_value, health_metric_id), fetch=True)
+        dashboard_cache.invalidate(*[res[0] for res in result])
         return "Health metric updated successfully."
     except Exception as e:
         logging.error(f"Failed to update health metric: {e}")
@@ -154,6 +174,7 @@ def update_email(member_id, new_email):
         query = "UPDATE Members SET Email = %s WHERE MemberID = %s;"
         try:
             db.execute_query(query, (new_email, member_id))
+            dashboard_cache.invalidate(member_id)
             return "Email updated successfully."
         except Exception as e:
             logging.error(f"Error updating email: {e}")
@@ -198,16 +219,76 @@ def display_member_dashboard(member_id):
     Returns:
         dict: A dictionary containing all relevant dashboard information.
     """
-    dashboard = {
-        "personal_info": fetch_personal_info(member_id),
-        "scheduled_classes": fetch_member_schedule(member_id),
-        "fitness_goals": fetch_member_fitness_goals(member_id),
-        "health_metrics": fetch_member_health_metrics(member_id)
-    }
+    dashboard = dashboard_cache.get(member_id, load_member_dashboard)
     logging.info(f"Dashboard data retrieved for member ID {member_id}")
     return dashboard
 
 
+# Builds each member's whole dashboard as one JSON document on the server, with dates already
+# formatted, so a dashboard costs one round trip however many rows it contains.
+DASHBOARD_QUERY = """
+SELECT m.MemberID, json_build_object(
+    'personal_info', json_build_object('FirstName', m.FirstName, 'LastName', m.LastName, 'Email', m.Email),
+    'scheduled_classes', COALESCE((
+        SELECT json_agg(json_build_object(
+            'ScheduleID', ms.ScheduleID,
+            'ClassName', COALESCE(fc.ClassName, ms.Type),
+            'StartTime', to_char(COALESCE(ms.StartTime, fc.StartTime), 'YYYY-MM-DD HH24:MI:SS'),
+            'EndTime', to_char(COALESCE(ms.EndTime, fc.EndTime), 'YYYY-MM-DD HH24:MI:SS'),
+            'Status', ms.Status
+        ) ORDER BY COALESCE(ms.StartTime, fc.StartTime))
+        FROM MemberSchedule ms
+        LEFT JOIN FitnessClasses fc ON ms.ClassID = fc.ClassID
+        WHERE ms.MemberID = m.MemberID AND ms.Status != 'Cancelled'
+    ), '[]'::json),
+    'fitness_goals', COALESCE((
+        SELECT json_agg(json_build_object('GoalType', fg.GoalType, 'TargetValue', fg.TargetValue) ORDER BY fg.FitnessGoalID)
+        FROM FitnessGoals fg
+        WHERE fg.MemberID = m.MemberID
+    ), '[]'::json),
+    'health_metrics', COALESCE((
+        SELECT json_agg(json_build_object(
+            'MetricType', hm.MetricType,
+            'MetricValue', hm.MetricValue,
+            'DateRecorded', to_char(hm.DateRecorded, 'YYYY-MM-DD')
+        ) ORDER BY hm.DateRecorded)
+        FROM HealthMetrics hm
+        WHERE hm.MemberID = m.MemberID
+    ), '[]'::json)
+)
+FROM Members m
+WHERE m.MemberID = ANY(%s);
+"""
+
+
+def empty_dashboard():
+    return {"personal_info": {}, "scheduled_classes": [], "fitness_goals": [], "health_metrics": []}
+
+
+def load_member_dashboards(member_ids):
+    """
+    Loads the dashboards for many members with a single query.
+
+    Args:
+        member_ids (list): The IDs of the members.
+
+    Returns:
+        dict: MemberID mapped to its dashboard. Unknown members get an empty dashboard.
+    """
+    results = db.execute_query(DASHBOARD_QUERY, (list(member_ids),), fetch=True)
+    dashboards = {member_id: empty_dashboard() for member_id in member_ids}
+    dashboards.update({res[0]: res[1] for res in results})
+    return dashboards
+
+
+def load_member_dashboard(member_id):
+    """
+    Loads one member's dashboard with a single query.
+    Personal training sessions, which have no class, are listed under their session type.
+    """
+    return load_member_dashboards([member_id])[member_id]
+
+
 def fetch_personal_info(member_id):
     """
     Fetches personal information for a member.
@@ -271,7 +352,13 @@ def book_private_session(member_id, trainer_id, start_datetime_str, duration):
     Returns:
         str: Status message indicating the outcome of the booking attempt.
     """
-    if not is_trainer_available(trainer_id, start_datetime_str, duration, "Personal Training"):
+    try:
+        available, reason = check_trainer_availability(trainer_id, start_datetime_str, duration)
+    except Exception as e:
+        logging.error(f"Failed to check availability for trainer {trainer_id}: {e}")
+        available, reason = False, None
+    if not available:
+        record_booking('private_session', AVAILABILITY_REASON_KINDS.get(reason, 'error'))
         return "Failed to book session due to trainer unavailability."
 
     start_time = datetime.strptime(format_datetime_for_postgres(start_datetime_str), '%Y-%m-%d %H:%M:%S')
@@ -279,18 +366,257 @@ def book_private_session(member_id, trainer_id, start_datetime_str, duration):
 
     query = """
     INSERT INTO MemberSchedule (MemberID, TrainerID, StartTime, EndTime, Type, Status)
-    VALUES (%s, %s, %s, %s, 'Personal Training', 'Scheduled');
+    VALUES (%s, %s, %s, %s, 'Personal Training', 'Scheduled') RETURNING ScheduleID;
     """
     try:
-        db.execute_query(query, (member_id, trainer_id, start_time, end_time))
+        schedule_id = db.execute_query(query, (member_id, trainer_id, start_time, end_time), fetch=True)[0][0]
+        schedule_index.add_session(schedule_id, trainer_id, None, start_time, end_time, 'Personal Training')
+        dashboard_cache.invalidate(member_id)
+        record_booking('private_session')
         return "Private training session booked successfully."
     except Exception as e:
         logging.error(f"Failed to book private session: {e}")
+        record_booking('private_session', 'error')
         return "Error booking session."
 
+# The availability rules of utils.TRAINER_AVAILABILITY_QUERY, applied to a whole batch of requests
+# at once, plus checks that the member and trainer exist.
+BATCH_AVAILABILITY_QUERY = """
+SELECT r.RequestIndex, CASE
+    WHEN NOT EXISTS (SELECT 1 FROM Members m WHERE m.MemberID = r.MemberID)
+        THEN 'Member not found.'
+    WHEN t.TrainerID IS NULL
+        THEN 'Trainer not found.'
+    WHEN EXISTS (
+        SELECT 1 FROM EquipmentMaintenance
+        WHERE (MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration)
+        OVERLAPS (r.StartTime, r.EndTime)
+        AND Status = 'Scheduled'
+    ) AND COALESCE(t.Specialization <> ALL(%(exempt)s), TRUE)
+        THEN 'Equipment maintenance is scheduled during this time.'
+    WHEN EXISTS (
+        SELECT 1 FROM TrainerUnavailability tu
+        WHERE tu.TrainerID = r.TrainerID AND tu.StartTime < r.EndTime AND tu.EndTime > r.StartTime
+    )
+        THEN 'Trainer is unavailable during this time.'
+    WHEN EXISTS (
+        SELECT 1 FROM MemberSchedule ms
+        WHERE ms.TrainerID = r.TrainerID AND NOT (
+            ms.StartTime >= r.EndTime OR ms.EndTime <= r.StartTime
+        ) AND ms.Status != 'Cancelled'
+    )
+        THEN 'Trainer already has an appointment during this time.'
+END
+FROM unnest(%(indexes)s::int[], %(member_ids)s::int[], %(trainer_ids)s::int[], %(start_times)s::timestamp[], %(end_times)s::timestamp[])
+    AS r (RequestIndex, MemberID, TrainerID, StartTime, EndTime)
+LEFT JOIN Trainers t ON t.TrainerID = r.TrainerID;
+"""
+
+# Inserts every accepted booking in one statement. A session that a concurrent booking took in the
+# meantime is skipped by the trainer exclusion constraint instead of failing the whole batch.
+BATCH_BOOKING_QUERY = """
+INSERT INTO MemberSchedule (MemberID, TrainerID, StartTime, EndTime, Type, Status)
+SELECT MemberID, TrainerID, StartTime, EndTime, 'Personal Training', 'Scheduled'
+FROM unnest(%(member_ids)s::int[], %(trainer_ids)s::int[], %(start_times)s::timestamp[], %(end_times)s::timestamp[])
+    AS r (MemberID, TrainerID, StartTime, EndTime)
+ON CONFLICT DO NOTHING
+RETURNING ScheduleID, TrainerID, StartTime;
+"""
+
+INVALID_BOOKING_REASON = "Invalid booking request."
+BATCH_OVERLAP_REASON = "Overlaps an earlier session for this trainer in the same batch."
+
+# Short reason labels for the booking metrics, beyond the availability reasons
+BATCH_REASON_KINDS = {
+    INVALID_BOOKING_REASON: 'invalid',
+    BATCH_OVERLAP_REASON: 'batch_overlap',
+    "Member not found.": 'not_found',
+    "Trainer not found.": 'not_found'
+}
+
+
+def parse_booking_request(booking):
+    member_id, trainer_id, start_datetime_str, duration = booking
+    start_time = datetime.strptime(start_datetime_str, '%m/%d/%Y %H:%M')
+    if int(duration) <= 0:
+        raise ValueError(duration)
+    return int(member_id), int(trainer_id), start_time, start_time + timedelta(minutes=int(duration))
+
+
+def book_private_sessions(bookings):
+    """
+    Books many private training sessions at once, e.g. a corporate client's whole series.
+
+    Every request is checked against existing bookings, trainer unavailability and equipment
+    maintenance with one query, exactly as book_private_session checks a single one. Requests for
+    the same trainer that overlap each other are decided in the order given: the first one wins.
+    All accepted sessions are then inserted in a single transaction.
+
+    Args:
+        bookings (list): Tuples of (member_id, trainer_id, start_datetime_str, duration), with the
+            start in 'MM/DD/YYYY HH:MM' format and the duration in minutes.
+
+    Returns:
+        list: One dictionary per request, in the same order, with the new 'schedule_id' and a
+        'reason' that explains a rejection. Exactly one of the two is None.
+    """
+    results = [{'schedule_id': None, 'reason': None} for _ in bookings]
+    parsed = {}
+    for index, booking in enumerate(bookings):
+        try:
+            parsed[index] = parse_booking_request(booking)
+        except (TypeError, ValueError):
+            results[index]['reason'] = INVALID_BOOKING_REASON
+
+    if parsed:
+        try:
+            booked = insert_private_sessions(parsed, results)
+        except Exception as e:
+            logging.error(f"Failed to book private sessions: {e}")
+            booked = {}
+            for index in parsed:
+                results[index]['reason'] = "Error booking session."
+        for index, schedule_id in booked.items():
+            member_id, trainer_id, start_time, end_time = parsed[index]
+            results[index]['schedule_id'] = schedule_id
+            schedule_index.add_session(schedule_id, trainer_id, None, start_time, end_time, 'Personal Training')
+            dashboard_cache.invalidate(member_id)
+
+    for result in results:
+        reason = result['reason']
+        record_booking('private_session', None if reason is None else
+                       BATCH_REASON_KINDS.get(reason) or AVAILABILITY_REASON_KINDS.get(reason, 'error'))
+    logging.info(f"Batch booking: {sum(result['reason'] is None for result in results)} of {len(results)} sessions booked")
+    return results
+
+
+def insert_private_sessions(parsed, results):
+    """
+    Checks and inserts the parsed requests in one transaction. Sets the reason of every rejected
+    request in results and returns request index mapped to ScheduleID for the booked ones.
+    """
+    indexes = sorted(parsed)
+    params = {
+        'indexes': indexes,
+        'member_ids': [parsed[index][0] for index in indexes],
+        'trainer_ids': [parsed[index][1] for index in indexes],
+        'start_times': [parsed[index][2] for index in indexes],
+        'end_times': [parsed[index][3] for index in indexes],
+        'exempt': MAINTENANCE_EXEMPT_SPECIALIZATIONS
+    }
+    with db.borrow_connection() as conn:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(BATCH_AVAILABILITY_QUERY, params)
+                reasons = dict(cur.fetchall())
+
+                # Conflicts inside the batch, among the requests that passed the database checks
+                accepted, trainer_sessions = [], {}
+                for index in indexes:
+                    member_id, trainer_id, start_time, end_time = parsed[index]
+                    reason = reasons.get(index)
+                    if reason is None:
+                        sessions = trainer_sessions.setdefault(trainer_id, IntervalSet())
+                        if sessions.overlaps(start_time, end_time):
+                            reason = BATCH_OVERLAP_REASON
+                        else:
+                            sessions.add(start_time, end_time, index)
+                            accepted.append(index)
+                    results[index]['reason'] = reason
+
+                booked = {}
+                if accepted:
+                    cur.execute(BATCH_BOOKING_QUERY, {
+                        'member_ids': [parsed[index][0] for index in accepted],
+                        'trainer_ids': [parsed[index][1] for index in accepted],
+                        'start_times': [parsed[index][2] for index in accepted],
+                        'end_times': [parsed[index][3] for index in accepted]
+                    })
+                    # Accepted sessions of one trainer never overlap, so trainer and start identify each one
+                    by_slot = {(parsed[index][1], parsed[index][2]): index for index in accepted}
+                    for schedule_id, trainer_id, start_time in cur.fetchall():
+                        booked[by_slot[(trainer_id, start_time)]] = schedule_id
+                    for index in accepted:
+                        if index not in booked:
+                            results[index]['reason'] = AVAILABILITY_REASONS['booked']
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+    return booked
+
+
+def find_private_session_times(trainer_id, duration, day, limit=None):
+    """
+    Lists the start times on a given day when a private session with the trainer can be booked.
+
+    Args:
+        trainer_id (int): The ID of the trainer.
+        duration (int): The duration of the session in minutes.
+        day (datetime): The day to search.
+        limit (int): Optional maximum number of start times to return.
+
+    Returns:
+        list: Start times in 'MM/DD/YYYY HH:MM' format, ready for book_private_session.
+    """
+    # Imported here so that importing member does not load numpy
+    from availability_engine import AvailabilityEngine
+    try:
+        engine = AvailabilityEngine(day, days=1).load(trainer_ids=[trainer_id], room_ids=[])
+        start_times = engine.free_windows(duration, "Personal Training", [trainer_id]).get(trainer_id, [])
+    except Exception as e:
+        logging.error(f"Failed to find open session times for trainer {trainer_id}: {e}")
+        return []
+    return [start.strftime('%m/%d/%Y %H:%M') for start in start_times[:limit]]
+
+
+# Takes a seat and records the registration in one statement. The UPDATE locks the class row, so
+# concurrent sign-ups queue up and each one re-checks the count against the room capacity.
+ENROLL_QUERY = """
+WITH seat AS (
+    UPDATE FitnessClasses fc
+    SET EnrolledCount = fc.EnrolledCount + 1
+    FROM Rooms r
+    WHERE fc.ClassID = %(class_id)s AND r.RoomID = fc.RoomID
+    AND fc.Status = 'Scheduled' AND fc.EnrolledCount < r.Capacity
+    RETURNING fc.ClassID
+)
+INSERT INTO MemberSchedule (MemberID, ClassID, Type, Status)
+SELECT %(member_id)s, ClassID, 'Group Fitness Class', 'Scheduled' FROM seat
+RETURNING ScheduleID;
+"""
+
+
+# Short reason labels for the booking metrics
+AVAILABILITY_REASON_KINDS = {message: kind for kind, message in AVAILABILITY_REASONS.items()}
+ENROLLMENT_FAILURE_KINDS = {
+    "Class not found.": 'not_found',
+    "Class is not open for registration.": 'closed',
+    "Class is already full.": 'full'
+}
+
+
+def enrollment_failure_reason(class_id):
+    """
+    Explains why ENROLL_QUERY took no seat. Only runs after a failed attempt.
+    """
+    query = """
+    SELECT fc.Status FROM FitnessClasses fc WHERE fc.ClassID = %s;
+    """
+    result = db.execute_query(query, (class_id,), fetch=True)
+    if not result:
+        return "Class not found."
+    if result[0][0] != 'Scheduled':
+        return "Class is not open for registration."
+    return "Class is already full."
+
+
 def register_for_class(member_id, class_id):
     """
-    Registers a member for a fitness class if there's an available spot.
+    Registers a member for a fitness class if there's an available spot in the class's room.
     
     Args:
         member_id (int): The ID of the member registering.
@@ -299,23 +625,22 @@ def register_for_class(member_id, class_id):
     Returns:
         str: Status message indicating the outcome of the registration attempt.
     """
-    query = """
-    SELECT COUNT(*) FROM MemberSchedule
-    WHERE ClassID = %s AND Status != 'Cancelled';
-    """
-    result = db.execute_query(query, (class_id,), fetch=True)
-    if result[0][0] >= 5:  # Assuming class capacity is 5
-        return "Class is already full."
-
-    query = """
-    INSERT INTO MemberSchedule (MemberID, ClassID, Type, Status)
-    VALUES (%s, %s, 'Group Fitness Class', 'Scheduled');
-    """
     try:
-        db.execute_query(query, (member_id, class_id))
+        result = db.execute_query(ENROLL_QUERY, {'member_id': member_id, 'class_id': class_id}, fetch=True)
+        # execute_query returns None when the statement fails, and no rows when no seat was taken
+        if result is None:
+            record_booking('class_registration', 'error')
+            return "Error registering for class."
+        if not result:
+            reason = enrollment_failure_reason(class_id)
+            record_booking('class_registration', ENROLLMENT_FAILURE_KINDS.get(reason, 'error'))
+            return reason
+        dashboard_cache.invalidate(member_id)
+        record_booking('class_registration')
         return "Registered for class successfully."
     except Exception as e:
         logging.error(f"Failed to register for class: {e}")
+        record_booking('class_registration', 'error')
         return "Error registering for class."
 
 def drop_class_by_member(member_id, class_id):
@@ -338,11 +663,21 @@ def drop_class_by_member(member_id, class_id):
         return "Member is not registered for this class."
 
     query = """
-    DELETE FROM MemberSchedule
-    WHERE MemberID = %s AND ClassID = %s;
+    WITH dropped AS (
+        DELETE FROM MemberSchedule
+        WHERE MemberID = %(member_id)s AND ClassID = %(class_id)s
+        RETURNING ScheduleID, Status
+    ), seats AS (
+        UPDATE FitnessClasses
+        SET EnrolledCount = EnrolledCount - (SELECT COUNT(*) FROM dropped WHERE Status != 'Cancelled')
+        WHERE ClassID = %(class_id)s
+    )
+    SELECT ScheduleID FROM dropped;
     """
     try:
-        db.execute_query(query, (member_id, class_id))
+        for res in db.execute_query(query, {'member_id': member_id, 'class_id': class_id}, fetch=True):
+            schedule_index.remove_session(res[0])
+        dashboard_cache.invalidate(member_id)
         return "Successfully dropped from the class."
     except Exception as e:
         logging.error(f"Failed for member to drop class: {e}")
@@ -360,21 +695,21 @@ def cancel_personal_training_by_member(member_id, session_id):
     Returns:
         str: Status message indicating the outcome of the cancellation.
     """
-    query = """
-    SELECT COUNT(*) FROM MemberSchedule
-    WHERE MemberID = %s AND ScheduleID = %s AND Type = 'Personal Training' AND Status = 'Scheduled';
-    """
-    result = db.execute_query(query, (member_id, session_id), fetch=True)
-    if result[0][0] == 0:
-        return "No such session found or already cancelled."
-
     query = """
     UPDATE MemberSchedule
     SET Status = 'Cancelled'
-    WHERE MemberID = %s AND ScheduleID = %s;
+    WHERE MemberID = %s AND ScheduleID = %s AND Type = 'Personal Training' AND Status = 'Scheduled'
+    RETURNING ScheduleID;
     """
     try:
-        db.execute_query(query, (member_id, session_id))
+        # execute_query returns None when the update fails, so the index only follows a row that really changed
+        result = db.execute_query(query, (member_id, session_id), fetch=True)
+        if result is None:
+            return "Error cancelling session."
+        if not result:
+            return "No such session found or already cancelled."
+        schedule_index.remove_session(session_id)
+        dashboard_cache.invalidate(member_id)
         return "Personal training session cancelled successfully."
     except Exception as e:
         logging.error(f"Failed to cancel personal training session: {e}")
@@ -0,0 +1,173 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast indexed lookup up to an interactive menu action
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """
+    A monotonically increasing count per label combination.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = sorted(self.values.items())
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Observations counted into fixed buckets per label combination, plus their sum and count.
+    Recording is one binary search and three additions under a lock.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labelvalues)
+            if series is None:
+                # Bucket counts, with a final slot for observations above the largest bucket
+                series = self.values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            values = sorted((labelvalues, (list(counts), total, count)) for labelvalues, (counts, total, count) in self.values.items())
+        for labelvalues, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labelnames, labelvalues, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics exposed by the process, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry and the metrics recorded by the club system
+registry = Registry()
+
+QUERY_SECONDS = registry.histogram(
+    "hfc_db_query_seconds", "Time spent running a statement through execute_query or stream_query.", ["statement"])
+QUERY_ERRORS = registry.counter(
+    "hfc_db_query_errors_total", "Statements that raised an error.", ["statement"])
+CHECKOUT_WAIT_SECONDS = registry.histogram(
+    "hfc_db_connection_checkout_seconds", "Time spent waiting for a pooled connection.")
+WORKFLOW_SECONDS = registry.histogram(
+    "hfc_workflow_seconds", "Time spent in a menu action dispatched from main.py, including user input.", ["workflow", "action"])
+API_REQUEST_SECONDS = registry.histogram(
+    "hfc_api_request_seconds", "Time spent handling an HTTP API request, by endpoint and response status.", ["endpoint", "status"])
+BOOKINGS = registry.counter(
+    "hfc_bookings_total", "Booking attempts by operation, outcome and reason.", ["operation", "outcome", "reason"])
+
+
+def record_booking(operation, reason=None):
+    """
+    Counts one booking attempt. A reason of None means the booking succeeded.
+    """
+    BOOKINGS.inc(operation, 'success' if reason is None else 'failure', reason or '')
+
+
+#################################################### HTTP Exposition Section ###################################################
+
+def start_metrics_server(port=9105, host='127.0.0.1'):
+    """
+    Serves GET /metrics on a background thread and returns the server. Listens on localhost only by default.
+    """
+    # Imported here because http.server takes longer to import than the rest of the application
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes arrive every few seconds; keep them out of the application log
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logging.info(f"Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,236 @@
+import argparse
+import logging
+import os
+import re
+from Workflow.db_connection import HealthClubDatabase
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Migration files are named like 002_add_hot_query_indexes.sql
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Arbitrary advisory lock key so two processes never apply the same migration at the same time
+MIGRATION_LOCK_ID = 3005
+
+
+#################################################### Migration Runner Section ###################################################
+
+def list_migrations():
+    """
+    Lists the migration files in version order.
+
+    Returns:
+        list: Tuples of (version, name, path).
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Two migration files share the same version number.")
+    return migrations
+
+
+def fetch_applied_versions(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS SchemaMigrations (
+        Version INTEGER PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    cur.execute("SELECT Version FROM SchemaMigrations;")
+    return {res[0] for res in cur.fetchall()}
+
+
+def apply_migrations(target_version=None):
+    """
+    Applies every migration that has not been applied yet, in order. Each migration runs in its own
+    transaction and is recorded in SchemaMigrations, so running this again only applies new files.
+
+    Args:
+        target_version (int): Optional last version to apply.
+
+    Returns:
+        list: The versions applied by this run.
+    """
+    applied_now = []
+    with db.borrow_connection() as conn:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                applied = fetch_applied_versions(cur)
+                conn.commit()
+                for version, name, path in list_migrations():
+                    if version in applied or (target_version is not None and version > target_version):
+                        continue
+                    with open(path) as migration_file:
+                        migration_sql = migration_file.read()
+                    try:
+                        # Another runner may have applied it while we waited for the lock
+                        cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+                        cur.execute("SELECT 1 FROM SchemaMigrations WHERE Version = %s;", (version,))
+                        if cur.fetchone():
+                            conn.rollback()
+                            continue
+                        cur.execute(migration_sql)
+                        cur.execute("INSERT INTO SchemaMigrations (Version, Name) VALUES (%s, %s);", (version, name))
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        logging.error(f"Migration {version:03d}_{name} failed and was rolled back: {e}")
+                        raise
+                    logging.info(f"Applied migration {version:03d}_{name}")
+                    applied_now.append(version)
+        finally:
+            conn.autocommit = True
+    if not applied_now:
+        logging.info("Schema is up to date.")
+    return applied_now
+
+
+def migration_status():
+    """
+    Returns (version, name, applied) for every migration file.
+    """
+    with db.borrow_connection() as conn:
+        with conn.cursor() as cur:
+            applied = fetch_applied_versions(cur)
+    return [(version, name, version in applied) for version, name, _ in list_migrations()]
+
+
+#################################################### Query Plan Check Section ###################################################
+
+def hot_queries():
+    """
+    Returns (description, query, params, expected indexes) for the hot queries, taken from the modules
+    that run them so the check follows any change to the shipped SQL. The expected indexes map each
+    table to the index names that may serve it; any one of them is enough.
+    """
+    # Imported here so that running migrations does not load the whole application
+    from utils import TRAINER_AVAILABILITY_QUERY, trainer_availability_params
+    from member import DASHBOARD_QUERY, ENROLL_QUERY
+    from admin import (ROOM_AVAILABILITY_QUERY, keyset_page_query, unprocessed_payments_filter, scheduled_classes_filter,
+                       scheduled_maintenance_filter)
+    from auth import MEMBER_NAME_LOGIN_QUERY
+    from trainer import MEMBER_SEARCH_QUERY, member_search_params
+
+    def first_page(list_filter, key_column, **filters):
+        return keyset_page_query(*list_filter(**filters), key_column, after_id=0)
+
+    return [
+        ("trainer availability", TRAINER_AVAILABILITY_QUERY, trainer_availability_params(1, '05/01/2024 09:00', 60), {
+            'equipmentmaintenance': {'equipmentmaintenance_scheduled_idx', 'equipmentmaintenance_scheduled_id_idx'},
+            'trainerunavailability': {'trainerunavailability_trainer_start_idx'},
+            'memberschedule': {'memberschedule_trainer_start_idx', 'memberschedule_no_trainer_overlap'}
+        }),
+        ("room availability", ROOM_AVAILABILITY_QUERY, (1, '2024-05-01 09:00', '2024-05-01 10:00'), {
+            'fitnessclasses': {'fitnessclasses_room_start_idx', 'fitnessclasses_no_room_overlap'}
+        }),
+        ("class enrollment", ENROLL_QUERY, {'class_id': 1, 'member_id': 1}, {
+            'fitnessclasses': {'fitnessclasses_pkey'},
+            'rooms': {'rooms_pkey'}
+        }),
+        ("member dashboard", DASHBOARD_QUERY, ([1],), {
+            'memberschedule': {'memberschedule_member_idx'},
+            'fitnessgoals': {'fitnessgoals_member_idx'},
+            'healthmetrics': {'healthmetrics_member_idx'}
+        }),
+        ("member login by name", MEMBER_NAME_LOGIN_QUERY, ('Sam', 'Sam'), {
+            'members': {'members_first_name_idx', 'members_last_name_idx'}
+        }),
+        ("member name search", MEMBER_SEARCH_QUERY, member_search_params('mit', 21), {
+            'members': {'members_full_name_trgm_idx'}
+        }),
+        ("unprocessed payments page", *first_page(unprocessed_payments_filter, "PaymentID"), {
+            'payments': {'payments_status_idx'}
+        }),
+        ("member payments page", *first_page(unprocessed_payments_filter, "PaymentID", member_id=1), {
+            'payments': {'payments_member_status_idx'}
+        }),
+        ("scheduled classes page", *first_page(scheduled_classes_filter, "ClassID"), {
+            'fitnessclasses': {'fitnessclasses_scheduled_idx'}
+        }),
+        ("scheduled maintenance page", *first_page(scheduled_maintenance_filter, "MaintenanceID"), {
+            'equipmentmaintenance': {'equipmentmaintenance_scheduled_id_idx'}
+        }),
+    ]
+
+
+def plan_scans(plan, relation=None):
+    """
+    Yields (node type, relation name, index name) for every scan in an EXPLAIN (FORMAT JSON) plan.
+    A bitmap index scan is reported under the table of the bitmap heap scan above it.
+    """
+    relation = plan.get('Relation Name', relation)
+    if 'Scan' in plan['Node Type'] and relation is not None:
+        yield plan['Node Type'], relation, plan.get('Index Name')
+    for child in plan.get('Plans', []):
+        yield from plan_scans(child, relation if plan['Node Type'].startswith('Bitmap') else None)
+
+
+def check_plan(scans, expected):
+    """
+    Passes when every expected table is read through one of its expected indexes and never scanned sequentially.
+    """
+    for table, index_names in expected.items():
+        table_scans = [(node, index) for node, relation, index in scans if relation == table]
+        if not any(index in index_names for _, index in table_scans):
+            return False
+        if any(node == 'Seq Scan' for node, _ in table_scans):
+            return False
+    return True
+
+
+def check_query_plans():
+    """
+    Runs EXPLAIN on every hot query and checks that each table it reads is served by the index
+    meant for it. Sequential scans are disabled for the check, because on a small table the planner
+    rightly prefers them even when a usable index exists.
+
+    Returns:
+        list: Tuples of (description, passed, scans found) where each scan is (node type, table, index name).
+    """
+    results = []
+    with db.borrow_connection() as conn:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL enable_seqscan = off;")
+                for description, query, params, expected in hot_queries():
+                    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+                    plan = cur.fetchone()[0][0]['Plan']
+                    scans = [scan for scan in plan_scans(plan) if scan[1] in expected]
+                    results.append((description, check_plan(scans, expected), scans))
+            conn.rollback()
+        finally:
+            conn.autocommit = True
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    parser.add_argument("--target", type=int, help="last migration version to apply")
+    parser.add_argument("--check-plans", action="store_true", help="check that the hot queries use index scans")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, applied in migration_status():
+            print(f"{version:03d}_{name}: {'applied' if applied else 'pending'}")
+    elif args.check_plans:
+        results = check_query_plans()
+        for description, passed, scans in results:
+            found = ', '.join(f"{node} on {table}" + (f" using {index}" if index else '') for node, table, index in scans)
+            print(f"{'PASS' if passed else 'FAIL'} {description}: {found or 'no scan found'}")
+        if not all(passed for _, passed, _ in results):
+            raise SystemExit(1)
+    else:
+        apply_migrations(args.target)
@@ -0,0 +1,19 @@
+-- Bring the base schema in line with what the application code reads and writes
+
+-- Maintenance windows have a length; every check uses MaintenanceSchedule + Duration minutes
+ALTER TABLE EquipmentMaintenance ADD COLUMN IF NOT EXISTS Duration INTEGER NOT NULL DEFAULT 120;
+
+-- Unavailability periods are specific date ranges, not times of day
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'trainerunavailability' AND column_name = 'starttime') = 'time without time zone' THEN
+        ALTER TABLE TrainerUnavailability
+            ALTER COLUMN StartTime TYPE TIMESTAMP USING CURRENT_DATE + StartTime,
+            ALTER COLUMN EndTime TYPE TIMESTAMP USING CURRENT_DATE + EndTime;
+    END IF;
+END $$;
+
+-- Personal training sessions have no class and group class registrations have no trainer
+ALTER TABLE MemberSchedule ALTER COLUMN ClassID DROP NOT NULL;
+ALTER TABLE MemberSchedule ALTER COLUMN TrainerID DROP NOT NULL;
@@ -0,0 +1,29 @@
+-- Indexes for the availability, enrollment, dashboard, payment and login queries
+
+-- Trainer availability and trainer schedules
+CREATE INDEX IF NOT EXISTS memberschedule_trainer_start_idx ON MemberSchedule (TrainerID, StartTime);
+CREATE INDEX IF NOT EXISTS trainerunavailability_trainer_start_idx ON TrainerUnavailability (TrainerID, StartTime);
+CREATE INDEX IF NOT EXISTS fitnessclasses_trainer_start_idx ON FitnessClasses (TrainerID, StartTime);
+
+-- Class enrollment counts and member schedules
+CREATE INDEX IF NOT EXISTS memberschedule_class_idx ON MemberSchedule (ClassID);
+CREATE INDEX IF NOT EXISTS memberschedule_member_idx ON MemberSchedule (MemberID);
+
+-- Room availability
+CREATE INDEX IF NOT EXISTS fitnessclasses_room_start_idx ON FitnessClasses (RoomID, StartTime);
+
+-- Maintenance overlap checks only look at scheduled windows
+CREATE INDEX IF NOT EXISTS equipmentmaintenance_scheduled_idx ON EquipmentMaintenance (MaintenanceSchedule)
+    WHERE Status = 'Scheduled';
+
+-- Payment processing lists payments by status in PaymentID order
+CREATE INDEX IF NOT EXISTS payments_status_idx ON Payments (Status, PaymentID);
+CREATE INDEX IF NOT EXISTS payments_member_idx ON Payments (MemberID);
+
+-- Member dashboard
+CREATE INDEX IF NOT EXISTS healthmetrics_member_idx ON HealthMetrics (MemberID);
+CREATE INDEX IF NOT EXISTS fitnessgoals_member_idx ON FitnessGoals (MemberID);
+
+-- Member login by name
+CREATE INDEX IF NOT EXISTS members_first_name_idx ON Members (FirstName);
+CREATE INDEX IF NOT EXISTS members_last_name_idx ON Members (LastName);
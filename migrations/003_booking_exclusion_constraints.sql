@@ -0,0 +1,27 @@
+-- Let the database itself reject overlapping room and trainer bookings
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+DO $$
+BEGIN
+    -- A room can only hold one active class at a time
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fitnessclasses_no_room_overlap') THEN
+        ALTER TABLE FitnessClasses ADD CONSTRAINT fitnessclasses_no_room_overlap
+            EXCLUDE USING gist (RoomID WITH =, tsrange(StartTime, EndTime) WITH &&)
+            WHERE (Status <> 'Cancelled');
+    END IF;
+
+    -- A trainer can only lead one active class at a time
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fitnessclasses_no_trainer_overlap') THEN
+        ALTER TABLE FitnessClasses ADD CONSTRAINT fitnessclasses_no_trainer_overlap
+            EXCLUDE USING gist (TrainerID WITH =, tsrange(StartTime, EndTime) WITH &&)
+            WHERE (Status <> 'Cancelled');
+    END IF;
+
+    -- A trainer can only have one active appointment at a time
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'memberschedule_no_trainer_overlap') THEN
+        ALTER TABLE MemberSchedule ADD CONSTRAINT memberschedule_no_trainer_overlap
+            EXCLUDE USING gist (TrainerID WITH =, tsrange(StartTime, EndTime) WITH &&)
+            WHERE (Status <> 'Cancelled');
+    END IF;
+END $$;
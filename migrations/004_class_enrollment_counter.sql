@@ -0,0 +1,17 @@
+-- Keep a running count of active registrations on each class so enrollment can check
+-- capacity and take a seat in one statement instead of counting MemberSchedule rows
+
+ALTER TABLE FitnessClasses ADD COLUMN IF NOT EXISTS EnrolledCount INTEGER NOT NULL DEFAULT 0;
+
+UPDATE FitnessClasses fc
+SET EnrolledCount = (
+    SELECT COUNT(*) FROM MemberSchedule ms
+    WHERE ms.ClassID = fc.ClassID AND ms.Status != 'Cancelled'
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fitnessclasses_enrolled_count_check') THEN
+        ALTER TABLE FitnessClasses ADD CONSTRAINT fitnessclasses_enrolled_count_check CHECK (EnrolledCount >= 0);
+    END IF;
+END $$;
@@ -0,0 +1,6 @@
+-- Trigram index so case-insensitive prefix and infix member name searches avoid a full scan
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS members_full_name_trgm_idx
+    ON Members USING gin (lower(FirstName || ' ' || LastName) gin_trgm_ops);
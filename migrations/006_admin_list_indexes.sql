@@ -0,0 +1,10 @@
+-- Partial indexes for the paginated admin list screens, which walk scheduled rows in key order
+
+CREATE INDEX IF NOT EXISTS fitnessclasses_scheduled_idx ON FitnessClasses (ClassID)
+    WHERE Status = 'Scheduled';
+
+CREATE INDEX IF NOT EXISTS equipmentmaintenance_scheduled_id_idx ON EquipmentMaintenance (MaintenanceID)
+    WHERE Status = 'Scheduled';
+
+-- Payment list filtered by member
+CREATE INDEX IF NOT EXISTS payments_member_status_idx ON Payments (MemberID, Status, PaymentID);
@@ -0,0 +1,11 @@
+-- Recurring billing: each charge records the billing period it belongs to, and a member is charged
+-- at most once per service per period, so a billing cycle can be re-run safely
+
+ALTER TABLE Payments ADD COLUMN IF NOT EXISTS BillingPeriod DATE;
+
+CREATE UNIQUE INDEX IF NOT EXISTS payments_member_service_period_key ON Payments (MemberID, Service, BillingPeriod)
+    WHERE BillingPeriod IS NOT NULL;
+
+-- Usage charges read a period's personal training sessions and group classes by start time
+CREATE INDEX IF NOT EXISTS memberschedule_type_start_idx ON MemberSchedule (Type, StartTime);
+CREATE INDEX IF NOT EXISTS fitnessclasses_start_idx ON FitnessClasses (StartTime);
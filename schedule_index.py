@@ -0,0 +1,275 @@
+import bisect
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+from Workflow.db_connection import HealthClubDatabase
+
+# Database instance
+db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+
+
+class IntervalSet:
+    """
+    Sorted list of (start, end, key) intervals that answers "does anything overlap [start, end)?".
+
+    Intervals are kept sorted by start time. Any interval that overlaps the query must start before
+    the query ends and no earlier than query start minus the longest interval stored, so a lookup is
+    two binary searches plus a scan of that short range. The stored lengths are counted so the
+    longest one shrinks again when a long interval, such as a multi-week absence, is removed.
+    """
+
+    def __init__(self):
+        self.intervals = []
+        self.by_key = {}
+        self.length_counts = Counter()
+        self.max_length = timedelta(0)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, start, end, key):
+        if key in self.by_key:
+            self.remove(key)
+        bisect.insort(self.intervals, (start, end, key))
+        self.by_key[key] = (start, end)
+        self.length_counts[end - start] += 1
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, key):
+        if key not in self.by_key:
+            return
+        start, end = self.by_key.pop(key)
+        idx = bisect.bisect_left(self.intervals, (start, end, key))
+        if idx < len(self.intervals) and self.intervals[idx] == (start, end, key):
+            del self.intervals[idx]
+        self.length_counts[end - start] -= 1
+        if not self.length_counts[end - start]:
+            del self.length_counts[end - start]
+            if end - start == self.max_length:
+                # Bookings come in a handful of lengths, so this scans very few entries
+                self.max_length = max(self.length_counts, default=timedelta(0))
+
+    def find_overlap(self, start, end):
+        """
+        Returns the key of an interval overlapping [start, end), or None if there is none.
+        """
+        lo = bisect.bisect_left(self.intervals, (start - self.max_length,))
+        hi = bisect.bisect_left(self.intervals, (end,))
+        for idx in range(lo, hi):
+            interval_start, interval_end, key = self.intervals[idx]
+            if interval_end > start:
+                return key
+        return None
+
+    def overlaps(self, start, end):
+        return self.find_overlap(start, end) is not None
+
+
+class ScheduleIndex:
+    """
+    In-process index of trainer bookings, trainer unavailability, room bookings and maintenance windows.
+
+    It is loaded once from the database and then kept current by the scheduling write functions, so
+    conflict checks do not need a query. It only sees writes made by this process; when several
+    processes write to the same database, call load() again or leave the index unloaded.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        self.trainer_bookings = {}
+        self.trainer_unavailability = {}
+        self.room_bookings = {}
+        self.maintenance = IntervalSet()
+        # Every class and personal training session, for checks that ignore who is involved
+        self.all_sessions = IntervalSet()
+        self.specializations = {}
+        self.session_classes = {}
+        self.class_details = {}
+
+    def load(self):
+        """
+        Loads every active booking, unavailability period and scheduled maintenance window.
+        """
+        with self.lock:
+            self.clear()
+            for trainer_id, specialization in db.execute_query("SELECT TrainerID, Specialization FROM Trainers;", fetch=True):
+                self.specializations[trainer_id] = specialization
+
+            query = """
+            SELECT ScheduleID, TrainerID, ClassID, StartTime, EndTime, Type FROM MemberSchedule
+            WHERE Status != 'Cancelled' AND StartTime IS NOT NULL AND EndTime IS NOT NULL;
+            """
+            for schedule_id, trainer_id, class_id, start_time, end_time, session_type in db.stream_query(query):
+                self._add_session(schedule_id, trainer_id, class_id, start_time, end_time, session_type)
+
+            query = """
+            SELECT ClassID, RoomID, TrainerID, ClassName, StartTime, EndTime FROM FitnessClasses
+            WHERE Status != 'Cancelled' AND StartTime IS NOT NULL AND EndTime IS NOT NULL;
+            """
+            for class_id, room_id, trainer_id, class_name, start_time, end_time in db.stream_query(query):
+                self._add_class(class_id, room_id, trainer_id, class_name, start_time, end_time)
+
+            query = """
+            SELECT MaintenanceID, MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration
+            FROM EquipmentMaintenance WHERE Status = 'Scheduled';
+            """
+            for maintenance_id, start_time, end_time in db.stream_query(query):
+                if start_time is not None and end_time is not None:
+                    self.maintenance.add(start_time, end_time, maintenance_id)
+
+            query = "SELECT UnavailabilityID, TrainerID, StartTime, EndTime FROM TrainerUnavailability;"
+            for unavailability_id, trainer_id, start_time, end_time in db.stream_query(query):
+                self._interval_set(self.trainer_unavailability, trainer_id).add(start_time, end_time, unavailability_id)
+
+            self.loaded = True
+            logging.info(f"Schedule index loaded: {len(self.all_sessions)} sessions, {len(self.maintenance)} maintenance windows")
+
+    def unload(self):
+        """
+        Empties the index, so the conflict checks go back to querying the database.
+        """
+        with self.lock:
+            self.loaded = False
+            self.clear()
+
+    @staticmethod
+    def _interval_set(groups, group_id):
+        if group_id not in groups:
+            groups[group_id] = IntervalSet()
+        return groups[group_id]
+
+    def _add_session(self, schedule_id, trainer_id, class_id, start_time, end_time, session_type):
+        if trainer_id is not None:
+            self._interval_set(self.trainer_bookings, trainer_id).add(start_time, end_time, schedule_id)
+        if session_type == 'Personal Training':
+            self.all_sessions.add(start_time, end_time, ('session', schedule_id))
+        self.session_classes[schedule_id] = (trainer_id, class_id)
+
+    def _add_class(self, class_id, room_id, trainer_id, class_name, start_time, end_time):
+        self._interval_set(self.room_bookings, room_id).add(start_time, end_time, class_id)
+        if class_name is not None:
+            self.all_sessions.add(start_time, end_time, ('class', class_id))
+        self.class_details[class_id] = (room_id, trainer_id, class_name)
+
+    #################################################### Write Hooks ###################################################
+
+    def add_session(self, schedule_id, trainer_id, class_id, start_time, end_time, session_type):
+        with self.lock:
+            if self.loaded and start_time is not None and end_time is not None:
+                self._add_session(schedule_id, trainer_id, class_id, start_time, end_time, session_type)
+
+    def remove_session(self, schedule_id):
+        with self.lock:
+            if schedule_id not in self.session_classes:
+                return
+            trainer_id, class_id = self.session_classes.pop(schedule_id)
+            if trainer_id in self.trainer_bookings:
+                self.trainer_bookings[trainer_id].remove(schedule_id)
+            self.all_sessions.remove(('session', schedule_id))
+
+    def remove_class_sessions(self, class_id):
+        with self.lock:
+            for schedule_id in [sid for sid, (_, cid) in self.session_classes.items() if cid == class_id]:
+                self.remove_session(schedule_id)
+
+    def add_class(self, class_id, room_id, trainer_id, class_name, start_time, end_time):
+        with self.lock:
+            if self.loaded:
+                self._add_class(class_id, room_id, trainer_id, class_name, start_time, end_time)
+
+    def move_class(self, class_id, start_time, end_time):
+        with self.lock:
+            if class_id in self.class_details:
+                room_id, trainer_id, class_name = self.class_details[class_id]
+                self._add_class(class_id, room_id, trainer_id, class_name, start_time, end_time)
+
+    def remove_class(self, class_id):
+        with self.lock:
+            if class_id not in self.class_details:
+                return
+            room_id, trainer_id, class_name = self.class_details.pop(class_id)
+            self.room_bookings[room_id].remove(class_id)
+            self.all_sessions.remove(('class', class_id))
+
+    def add_trainer(self, trainer_id, specialization):
+        with self.lock:
+            if self.loaded:
+                self.specializations[trainer_id] = specialization
+
+    def add_maintenance(self, maintenance_id, start_time, end_time):
+        with self.lock:
+            if self.loaded:
+                self.maintenance.add(start_time, end_time, maintenance_id)
+
+    def remove_maintenance(self, maintenance_id):
+        with self.lock:
+            self.maintenance.remove(maintenance_id)
+
+    def set_unavailability(self, unavailability_id, trainer_id, start_time, end_time):
+        with self.lock:
+            if self.loaded:
+                self._interval_set(self.trainer_unavailability, trainer_id).add(start_time, end_time, unavailability_id)
+
+    def move_unavailability(self, unavailability_id, start_time, end_time):
+        with self.lock:
+            for intervals in self.trainer_unavailability.values():
+                if unavailability_id in intervals.by_key:
+                    intervals.add(start_time, end_time, unavailability_id)
+                    return
+
+    #################################################### Conflict Checks ###################################################
+
+    def trainer_specialization(self, trainer_id):
+        """
+        Returns the trainer's specialization, looking up trainers added since load() by another
+        process and remembering the answer. None for a trainer that does not exist.
+        """
+        with self.lock:
+            if trainer_id in self.specializations:
+                return self.specializations[trainer_id]
+        rows = db.execute_query("SELECT Specialization FROM Trainers WHERE TrainerID = %s;", (trainer_id,), fetch=True)
+        if not rows:
+            return None
+        with self.lock:
+            self.specializations[trainer_id] = rows[0][0]
+        return rows[0][0]
+
+    def trainer_conflict(self, trainer_id, start_time, end_time, exempt_specializations):
+        """
+        Mirrors utils.TRAINER_AVAILABILITY_QUERY.
+
+        Returns:
+            str: 'maintenance', 'unavailable' or 'booked' for the first conflict found, or None if the trainer is free.
+        """
+        if self.maintenance_scheduled(start_time, end_time) and \
+           self.trainer_specialization(trainer_id) not in exempt_specializations:
+            return 'maintenance'
+        with self.lock:
+            if trainer_id in self.trainer_unavailability and \
+               self.trainer_unavailability[trainer_id].overlaps(start_time, end_time):
+                return 'unavailable'
+            if trainer_id in self.trainer_bookings and \
+               self.trainer_bookings[trainer_id].overlaps(start_time, end_time):
+                return 'booked'
+            return None
+
+    def room_booked(self, room_id, start_time, end_time):
+        with self.lock:
+            return room_id in self.room_bookings and self.room_bookings[room_id].overlaps(start_time, end_time)
+
+    def maintenance_scheduled(self, start_time, end_time):
+        with self.lock:
+            return self.maintenance.overlaps(start_time, end_time)
+
+    def sessions_overlap(self, start_time, end_time):
+        with self.lock:
+            return self.all_sessions.overlaps(start_time, end_time)
+
+
+# Shared schedule index, loaded by main.py at startup
+schedule_index = ScheduleIndex()
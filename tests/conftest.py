@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The modules import each other by file name and the database layer as Workflow.db_connection,
+# so both this folder and the folder that contains it have to be importable.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(ROOT)]
+
+
+@pytest.fixture(scope='session')
+def club_database():
+    """
+    The HealthClubDatabase the application uses, for tests that need PostgreSQL. They are skipped when
+    the database cannot be reached.
+    """
+    import psycopg2
+    from Workflow.db_connection import HealthClubDatabase
+    database = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
+    try:
+        psycopg2.connect(connect_timeout=2, **database.connection_params).close()
+    except psycopg2.Error as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    return database
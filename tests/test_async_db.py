@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import pytest
+from async_db import AsyncHealthClubDatabase
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.autocommit = True
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return [(self.name,)]
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class PooledDatabase:
+    """
+    A pool of size connections that, like HealthClubDatabase, makes checkout wait for a free slot.
+    """
+
+    def __init__(self, size):
+        self.pool = ()
+        self.slots = threading.BoundedSemaphore(size)
+        self.connections = []
+        self.pool_closed = False
+
+    def _checkout(self):
+        if not self.slots.acquire(timeout=2):
+            raise TimeoutError("No database connection available.")
+        self.connections.append(FakeConnection(f"connection {len(self.connections) + 1}"))
+        return self.connections[-1]
+
+    def _checkin(self, conn):
+        self.slots.release()
+
+    def execute_query(self, query, params=None, fetch=False):
+        conn = self._checkout()
+        try:
+            return [('pooled',)]
+        finally:
+            self._checkin(conn)
+
+    def close_pool(self):
+        self.pool_closed = True
+
+
+@pytest.fixture
+def database():
+    return PooledDatabase(size=2)
+
+
+def test_queries_inside_a_full_pool_of_transactions_join_their_transaction(database):
+    adb = AsyncHealthClubDatabase(database, max_size=2)
+    opened = []
+
+    async def transfer(all_open):
+        async with adb.transaction() as tx:
+            opened.append(tx)
+            if len(opened) == 2:
+                all_open.set()
+            await all_open.wait()
+            # Every connection is held by a transaction; this must not wait for another one
+            inner = await adb.execute_query("SELECT 1", fetch=True)
+            own = await tx.execute_query("SELECT 1", fetch=True)
+            return inner == own
+
+    async def main():
+        all_open = asyncio.Event()
+        try:
+            return await asyncio.gather(transfer(all_open), transfer(all_open))
+        finally:
+            await adb.close()
+
+    assert asyncio.run(main()) == [True, True]
+    assert all(conn.committed and conn.autocommit for conn in database.connections)
+
+
+def test_queries_outside_a_transaction_use_the_pool(database):
+    adb = AsyncHealthClubDatabase(database, max_size=2)
+
+    async def main():
+        try:
+            async with adb.transaction():
+                pass
+            return await adb.execute_query("SELECT 1", fetch=True)
+        finally:
+            await adb.close()
+
+    assert asyncio.run(main()) == [('pooled',)]
+
+
+def test_failed_block_rolls_back_and_returns_the_connection(database):
+    adb = AsyncHealthClubDatabase(database, max_size=1)
+
+    async def main():
+        try:
+            with pytest.raises(ValueError):
+                async with adb.transaction():
+                    raise ValueError
+            async with adb.transaction():
+                pass
+        finally:
+            await adb.close()
+
+    asyncio.run(main())
+    first, second = database.connections
+    assert first.rolled_back and not first.committed
+    assert second.committed
+
+
+def test_close_keeps_the_shared_pool_open(database):
+    adb = AsyncHealthClubDatabase(database)
+
+    async def main():
+        await adb.execute_query("SELECT 1")
+        await adb.close()
+
+    asyncio.run(main())
+    assert not database.pool_closed
+    assert adb.executor is None and adb.transaction_executor is None
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+import availability_engine
+from availability_engine import AvailabilityEngine, find_next_available_slots
+
+DAY = datetime(2024, 5, 1)
+
+
+def at(hours):
+    return DAY + timedelta(hours=hours)
+
+
+class ClubRows:
+    """
+    Trainers, rooms and busy intervals for the engine to load, filtered the way load's SQL filters them.
+    """
+
+    def __init__(self, trainers=(), rooms=(), trainer_busy=(), room_busy=(), maintenance=()):
+        self.trainers = list(trainers)
+        self.rooms = list(rooms)
+        self.trainer_busy = list(trainer_busy)
+        self.room_busy = list(room_busy)
+        self.maintenance = list(maintenance)
+        self.queries = 0
+
+    def execute_query(self, query, params=None, fetch=False):
+        self.queries += 1
+        if 'FROM Trainers' in query:
+            return [(trainer_id, specialization) for trainer_id, specialization in self.trainers
+                    if (params['specializations'] is None or specialization in params['specializations'])
+                    and (params['trainer_ids'] is None or trainer_id in params['trainer_ids'])]
+        if 'FROM Rooms' in query:
+            return [(room_id, room_type) for room_id, room_type in self.rooms
+                    if (params['room_types'] is None or room_type in params['room_types'])
+                    and (params['room_ids'] is None or room_id in params['room_ids'])]
+        if 'FROM MemberSchedule' in query:
+            return self.trainer_busy
+        if 'FROM EquipmentMaintenance' in query:
+            return [(0, start, end) for start, end in self.maintenance]
+        return self.room_busy
+
+
+@pytest.fixture
+def club(monkeypatch):
+    rows = ClubRows()
+    monkeypatch.setattr(availability_engine, 'db', rows)
+    return rows
+
+
+def test_window_starts_needs_the_whole_run_free():
+    free = np.array([True, True, False, True, True, True])
+    assert AvailabilityEngine.window_starts(free, 60).tolist() == [True, False, False, True, True, False]
+    assert AvailabilityEngine.window_starts(free, 45).tolist() == [True, False, False, True, True, False]
+    assert not AvailabilityEngine.window_starts(free, 240).any()
+
+
+def test_busy_intervals_cover_every_slot_they_touch(club):
+    club.trainers = [(1, 'Yoga')]
+    club.trainer_busy = [(1, at(9) + timedelta(minutes=10), at(10))]
+    engine = AvailabilityEngine(DAY, days=1).load()
+    busy = np.flatnonzero(engine.trainer_busy[0])
+    assert [engine.slot_time(slot) for slot in busy] == [at(9), at(9.5)]
+
+
+def test_maintenance_blocks_only_trainers_who_need_equipment(club):
+    club.trainers = [(1, 'Yoga'), (2, 'Strength')]
+    club.maintenance = [(at(9), at(10))]
+    engine = AvailabilityEngine(DAY, days=1).load()
+    windows = engine.free_windows(60)
+    assert at(9) not in windows[1]
+    assert at(9) in windows[2]
+    # Group classes always need the equipment
+    assert at(9) not in engine.free_windows(60, 'Group Class')[2]
+
+
+def test_class_windows_need_a_free_trainer_and_room(club):
+    club.trainers = [(1, 'Yoga'), (2, 'Cardio')]
+    club.rooms = [(10, 'Yoga'), (11, 'Yoga')]
+    club.trainer_busy = [(1, at(0), at(9))]
+    club.room_busy = [(10, at(0), at(12))]
+    engine = AvailabilityEngine(DAY, days=1).load()
+    first = min(engine.class_windows('Yoga', 60), key=lambda window: window[2])
+    assert first == (1, 11, at(9))
+
+
+def test_next_slots_are_ordered_and_inside_the_window(club):
+    club.trainers = [(1, 'Yoga'), (2, 'Yoga')]
+    club.trainer_busy = [(1, at(9), at(10))]
+    slots = find_next_available_slots('Yoga', 60, at(9), at(11), limit=10, session_type='Personal Training')
+    assert slots == [(2, None, at(9)), (2, None, at(9.5)), (1, None, at(10)), (2, None, at(10))]
+
+
+def test_window_shorter_than_the_session_has_no_slots(club):
+    club.trainers = [(1, 'Yoga')]
+    assert find_next_available_slots('Yoga', 120, at(9), at(10), session_type='Personal Training') == []
+    assert club.queries == 0
+
+
+def test_load_reads_only_the_requested_trainers_and_rooms(club):
+    club.trainers = [(1, 'Yoga'), (2, 'Yoga')]
+    club.rooms = [(10, 'Yoga'), (11, 'Yoga')]
+    engine = AvailabilityEngine(DAY, days=1).load(trainer_ids=[2], room_ids=[10])
+    assert engine.trainer_ids.tolist() == [2]
+    assert engine.room_ids.tolist() == [10]
+
+
+def test_private_session_times_skip_the_trainers_busy_slots(club):
+    from member import find_private_session_times
+    club.trainers = [(1, 'Yoga'), (2, 'Yoga')]
+    club.trainer_busy = [(1, at(0), at(9)), (1, at(10), at(24))]
+    assert find_private_session_times(1, 60, at(12)) == ['05/01/2024 09:00']
+    assert len(find_private_session_times(2, 30, DAY, limit=5)) == 5
@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import threading
+from datetime import datetime
+import pytest
+import async_db
+import member
+import migrate
+from dashboard_cache import dashboard_cache
+from metrics import BOOKINGS
+
+
+class ClassTables:
+    """
+    Answers ENROLL_QUERY and the follow-up status lookup the way PostgreSQL would for a few classes,
+    as {ClassID: [Status, EnrolledCount, Capacity]}. fail makes every statement fail like execute_query does.
+    """
+
+    # Not None, so AsyncHealthClubDatabase uses these tables instead of opening a pool
+    pool = ()
+
+    def __init__(self, classes, fail=False):
+        self.classes = classes
+        self.fail = fail
+        self.schedule_ids = itertools.count(1)
+
+    def execute_query(self, query, params=None, fetch=False):
+        if self.fail:
+            return None
+        if query == member.ENROLL_QUERY:
+            row = self.classes.get(params['class_id'])
+            if row is None or row[0] != 'Scheduled' or row[1] >= row[2]:
+                return []
+            row[1] += 1
+            return [(next(self.schedule_ids),)]
+        row = self.classes.get(params[0])
+        return [(row[0],)] if row else []
+
+
+@pytest.fixture
+def bookings():
+    def count(outcome, reason=''):
+        return BOOKINGS.values.get(('class_registration', outcome, reason), 0)
+    return count
+
+
+def test_registration_takes_a_seat_and_refreshes_the_dashboard(monkeypatch, bookings):
+    tables = ClassTables({1: ['Scheduled', 0, 2]})
+    monkeypatch.setattr(member, 'db', tables)
+    dashboard_cache.get(7, lambda member_id: {'member_id': member_id})
+    before = bookings('success')
+    assert member.register_for_class(7, 1) == "Registered for class successfully."
+    assert tables.classes[1][1] == 1
+    assert 7 not in dashboard_cache.entries
+    assert bookings('success') == before + 1
+
+
+def test_registration_stops_at_capacity(monkeypatch, bookings):
+    tables = ClassTables({1: ['Scheduled', 0, 2]})
+    monkeypatch.setattr(member, 'db', tables)
+    before = bookings('failure', 'full')
+    results = [member.register_for_class(member_id, 1) for member_id in range(3)]
+    assert results[-1] == "Class is already full."
+    assert tables.classes[1][1] == 2
+    assert bookings('failure', 'full') == before + 1
+
+
+@pytest.mark.parametrize('classes, message', [
+    ({}, "Class not found."),
+    ({1: ['Cancelled', 0, 10]}, "Class is not open for registration."),
+])
+def test_registration_explains_why_no_seat_was_taken(monkeypatch, classes, message):
+    monkeypatch.setattr(member, 'db', ClassTables(classes))
+    assert member.register_for_class(7, 1) == message
+
+
+def test_failed_statement_is_an_error(monkeypatch, bookings):
+    monkeypatch.setattr(member, 'db', ClassTables({1: ['Scheduled', 0, 2]}, fail=True))
+    before = bookings('failure', 'error')
+    assert member.register_for_class(7, 1) == "Error registering for class."
+    assert bookings('failure', 'error') == before + 1
+
+
+@pytest.fixture
+def async_tables(monkeypatch):
+    """
+    Points both the blocking and the async registration paths at the same ClassTables.
+    """
+    def install(classes, fail=False):
+        tables = ClassTables(classes, fail)
+        monkeypatch.setattr(member, 'db', tables)
+        monkeypatch.setattr(async_db, 'adb', async_db.AsyncHealthClubDatabase(tables, max_size=2))
+        return tables
+    yield install
+    asyncio.run(async_db.adb.close())
+
+
+def test_async_registration_takes_a_seat(async_tables):
+    tables = async_tables({1: ['Scheduled', 1, 2]})
+    assert asyncio.run(async_db.register_for_class_async(7, 1)) == "Registered for class successfully."
+    assert asyncio.run(async_db.register_for_class_async(8, 1)) == "Class is already full."
+    assert tables.classes[1][1] == 2
+
+
+def test_async_failed_statement_is_an_error(async_tables, bookings):
+    async_tables({1: ['Scheduled', 0, 2]}, fail=True)
+    errors, full = bookings('failure', 'error'), bookings('failure', 'full')
+    assert asyncio.run(async_db.register_for_class_async(7, 1)) == "Error registering for class."
+    assert bookings('failure', 'error') == errors + 1
+    assert bookings('failure', 'full') == full
+
+
+CONTENDERS = 8
+
+
+@pytest.fixture
+def class_at_capacity(club_database):
+    """
+    A scratch class in a room with fewer seats than there are members trying to register, and one
+    autocommit connection per member. Everything is deleted afterwards.
+    """
+    import psycopg2
+    if not all(applied for _, _, applied in migrate.migration_status()):
+        pytest.skip("Migrations are pending; run migrate.py first.")
+    capacity = 3
+    connections = [psycopg2.connect(**club_database.connection_params) for _ in range(CONTENDERS)]
+    for conn in connections:
+        conn.autocommit = True
+    room_id = class_id = None
+    member_ids = []
+    try:
+        with connections[0].cursor() as cur:
+            cur.execute("INSERT INTO Rooms (RoomName, RoomType, Capacity) VALUES ('Enrollment test', 'Yoga', %s) "
+                        "RETURNING RoomID;", (capacity,))
+            room_id = cur.fetchone()[0]
+            cur.execute("INSERT INTO FitnessClasses (ClassName, RoomID, StartTime, EndTime, Status) "
+                        "VALUES ('Yoga', %s, %s, %s, 'Scheduled') RETURNING ClassID;",
+                        (room_id, datetime(2099, 1, 1, 9), datetime(2099, 1, 1, 10)))
+            class_id = cur.fetchone()[0]
+            cur.execute("INSERT INTO Members (FirstName, LastName, Email, Password) "
+                        "SELECT 'Enrollment', 'Test', 'enrollment-test-' || n || '@example.invalid', 'pw' "
+                        "FROM generate_series(1, %s) n RETURNING MemberID;", (CONTENDERS,))
+            member_ids = [row[0] for row in cur.fetchall()]
+        yield connections, class_id, member_ids, capacity
+    finally:
+        with connections[0].cursor() as cur:
+            cur.execute("DELETE FROM MemberSchedule WHERE ClassID = %s;", (class_id,))
+            cur.execute("DELETE FROM FitnessClasses WHERE ClassID = %s;", (class_id,))
+            cur.execute("DELETE FROM Rooms WHERE RoomID = %s;", (room_id,))
+            cur.execute("DELETE FROM Members WHERE MemberID = ANY(%s);", (member_ids,))
+        for conn in connections:
+            conn.close()
+
+
+def test_concurrent_registrations_never_overbook(class_at_capacity):
+    connections, class_id, member_ids, capacity = class_at_capacity
+    start = threading.Barrier(len(connections))
+    seats = []
+
+    def register(conn, member_id):
+        start.wait()
+        with conn.cursor() as cur:
+            cur.execute(member.ENROLL_QUERY, {'class_id': class_id, 'member_id': member_id})
+            seats.extend(cur.fetchall())
+
+    threads = [threading.Thread(target=register, args=pair) for pair in zip(connections, member_ids)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with connections[0].cursor() as cur:
+        cur.execute("SELECT EnrolledCount FROM FitnessClasses WHERE ClassID = %s;", (class_id,))
+        enrolled = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM MemberSchedule WHERE ClassID = %s AND Status != 'Cancelled';", (class_id,))
+        registrations = cur.fetchone()[0]
+    assert len(seats) == enrolled == registrations == capacity
@@ -0,0 +1,184 @@
+import csv
+import io
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+import csv_transfer
+from csv_transfer import (InvalidRow, check_row, collect_class_ids, decimal, integer, resolve_column, resolve_table,
+                          text, timestamp, validated_rows, TABLES)
+
+
+def test_text_rules():
+    assert text()('') is None
+    assert text()('Yoga') == 'Yoga'
+    with pytest.raises(InvalidRow, match="is required"):
+        text(required=True)('')
+    with pytest.raises(InvalidRow, match="longer than 3"):
+        text(max_length=3)('abcd')
+    with pytest.raises(InvalidRow, match="must be one of"):
+        text(choices=['Yoga'])('Pilates')
+
+
+def test_integer_rules():
+    assert integer()('') is None
+    assert integer()('42') == 42
+    with pytest.raises(InvalidRow, match="whole number"):
+        integer()('4.2')
+    with pytest.raises(InvalidRow, match="is required"):
+        integer(required=True)('')
+
+
+def test_decimal_rules():
+    assert decimal()('19.99') == Decimal('19.99')
+    assert decimal()('-99999999.99') == Decimal('-99999999.99')
+    with pytest.raises(InvalidRow, match="is not a number"):
+        decimal()('ten')
+    with pytest.raises(InvalidRow, match="DECIMAL"):
+        decimal()('100000000')
+    with pytest.raises(InvalidRow, match="DECIMAL"):
+        decimal()('NaN')
+
+
+def test_timestamp_rules():
+    assert timestamp()('2024-05-01 09:30:00') == datetime(2024, 5, 1, 9, 30)
+    assert timestamp(date_only=True)('2024-05-01') == date(2024, 5, 1)
+    with pytest.raises(InvalidRow, match="YYYY-MM-DD"):
+        timestamp()('05/01/2024')
+
+
+def test_end_time_must_follow_start_time():
+    _, rules = TABLES['MemberSchedule']
+    check_row(rules, {'StartTime': datetime(2024, 5, 1, 9), 'EndTime': None})
+    with pytest.raises(InvalidRow, match="EndTime must be after StartTime"):
+        check_row(rules, {'StartTime': datetime(2024, 5, 1, 9), 'EndTime': datetime(2024, 5, 1, 9)})
+
+
+def test_names_are_matched_ignoring_case():
+    assert resolve_table('memberschedule') == 'MemberSchedule'
+    assert resolve_column(TABLES['Members'][1], ' email ') == 'Email'
+    with pytest.raises(ValueError, match="Unsupported table"):
+        resolve_table('Rooms')
+    with pytest.raises(InvalidRow, match="Unknown column"):
+        resolve_column(TABLES['Members'][1], 'Phone')
+
+
+def test_valid_rows_are_parsed_in_header_order():
+    reader = csv.reader(io.StringIO("12.50,3,Membership Fee\n"))
+    stats = {'loaded': 0, 'rejected': 0}
+    rows = list(validated_rows('Payments', reader, ['Amount', 'MemberID', 'Service'], stats=stats))
+    assert rows == [(Decimal('12.50'), 3, 'Membership Fee')]
+    assert stats == {'loaded': 1, 'rejected': 0}
+
+
+def test_invalid_row_stops_the_import_without_a_rejects_file():
+    reader = csv.reader(io.StringIO("Ann,Lee,ann@club.com,pw\n,Lee,bob@club.com,pw\n"))
+    stats = {'loaded': 0, 'rejected': 0}
+    with pytest.raises(InvalidRow, match="Members line 3: FirstName is required"):
+        list(validated_rows('Members', reader, ['FirstName', 'LastName', 'Email', 'Password'], stats=stats))
+
+
+def test_invalid_rows_go_to_the_rejects_file():
+    reader = csv.reader(io.StringIO("1,Weight,80,2024-05-01\n2,Mood,ok,2024-05-01\n3,Weight\n"))
+    rejects_file = io.StringIO()
+    stats = {'loaded': 0, 'rejected': 0}
+    rows = list(validated_rows('HealthMetrics', reader, ['MemberID', 'MetricType', 'MetricValue', 'DateRecorded'],
+                               csv.writer(rejects_file), stats))
+    assert rows == [(1, 'Weight', '80', datetime(2024, 5, 1))]
+    assert stats == {'loaded': 1, 'rejected': 2}
+    rejected = list(csv.reader(io.StringIO(rejects_file.getvalue())))
+    assert rejected[0][:2] == ['2', 'Mood'] and rejected[0][-1].startswith("line 3: MetricType must be one of")
+    assert rejected[1] == ['3', 'Weight', "line 4: has 2 fields, expected 4"]
+
+
+def test_collect_class_ids_passes_rows_through():
+    class_ids = set()
+    rows = [(1, 10), (2, None), (3, 10), (4, 11)]
+    assert list(collect_class_ids(iter(rows), 1, class_ids)) == rows
+    assert class_ids == {10, 11}
+
+
+class FakeConnection:
+    def __init__(self, statements):
+        self.statements = statements
+        self.autocommit = True
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        self.statements.append((' '.join(query.split()), params))
+
+    def commit(self):
+        self.statements.append(('COMMIT', None))
+
+    def rollback(self):
+        self.statements.append(('ROLLBACK', None))
+
+
+class FakeDatabase:
+    """
+    Records what an import sends. COPY consumes the rows the way psycopg2 reads them, and raises
+    when fail_copy is set, as it does when the database rejects a row.
+    """
+
+    def __init__(self, fail_copy=False):
+        self.fail_copy = fail_copy
+        self.statements = []
+        self.copied = []
+
+    @contextmanager
+    def borrow_connection(self):
+        yield FakeConnection(self.statements)
+
+    def copy_rows(self, table, columns, rows, conn=None):
+        assert conn is not None and not conn.autocommit
+        self.copied = list(rows)
+        if self.fail_copy:
+            raise RuntimeError("duplicate key value violates unique constraint")
+        return len(self.copied)
+
+    def execute_query(self, query, params=None, fetch=False):
+        self.statements.append((' '.join(query.split()), params))
+
+
+def write_csv(tmp_path, content):
+    path = tmp_path / "import.csv"
+    path.write_text(content)
+    return str(path)
+
+
+def test_class_registrations_are_recounted_in_the_import_transaction(tmp_path, monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(csv_transfer, 'db', database)
+    path = write_csv(tmp_path, "MemberID,ClassID,Type,Status\n1,5,Group Fitness Class,Scheduled\n2,4,Group Fitness Class,Scheduled\n"
+                               "3,5,Group Fitness Class,Scheduled\n")
+    stats = csv_transfer.import_csv('MemberSchedule', path)
+    assert stats['loaded'] == 3
+    assert len(database.copied) == 3
+    recount, commit = database.statements
+    assert recount == (' '.join(csv_transfer.RECOUNT_ENROLLMENT_QUERY.split()), ([4, 5],))
+    assert commit == ('COMMIT', None)
+
+
+def test_failed_copy_rolls_back_and_skips_the_recount(tmp_path, monkeypatch):
+    database = FakeDatabase(fail_copy=True)
+    monkeypatch.setattr(csv_transfer, 'db', database)
+    path = write_csv(tmp_path, "MemberID,ClassID\n1,5\n")
+    with pytest.raises(RuntimeError):
+        csv_transfer.import_csv('MemberSchedule', path)
+    assert database.statements == [('ROLLBACK', None)]
+
+
+def test_imported_keys_move_the_sequence(tmp_path, monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(csv_transfer, 'db', database)
+    path = write_csv(tmp_path, "MemberID,FirstName,LastName,Email,Password\n7,Ann,Lee,ann@club.com,pw\n")
+    csv_transfer.import_csv('Members', path)
+    assert database.statements[-1][0].startswith("SELECT setval(pg_get_serial_sequence('members', 'memberid')")
@@ -0,0 +1,109 @@
+import threading
+import pytest
+from dashboard_cache import DashboardCache
+
+
+def loader(member_id):
+    return {'member_id': member_id}
+
+
+def test_second_get_is_a_hit():
+    cache = DashboardCache()
+    calls = []
+    first = cache.get(1, lambda member_id: calls.append(member_id) or loader(member_id))
+    second = cache.get(1, lambda member_id: calls.append(member_id) or loader(member_id))
+    assert first is second
+    assert calls == [1]
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_expired_entries_are_loaded_again():
+    cache = DashboardCache(ttl=0)
+    cache.get(1, loader)
+    cache.get(1, loader)
+    stats = cache.stats()
+    assert stats['misses'] == 2
+    assert stats['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DashboardCache(max_size=2)
+    cache.get(1, loader)
+    cache.get(2, loader)
+    cache.get(1, loader)
+    cache.get(3, loader)
+    assert list(cache.entries) == [1, 3]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_drops_the_entry():
+    cache = DashboardCache()
+    cache.get(1, loader)
+    cache.invalidate(1, 2)
+    assert 1 not in cache.entries
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_load_that_raced_an_invalidation_is_not_stored():
+    cache = DashboardCache()
+
+    def stale_loader(member_id):
+        # A write lands while the dashboard is being read
+        cache.invalidate(member_id)
+        return loader(member_id)
+
+    assert cache.get(1, stale_loader) == {'member_id': 1}
+    assert 1 not in cache.entries
+    cache.get(1, loader)
+    assert 1 in cache.entries
+
+
+def test_load_that_raced_a_clear_is_not_stored():
+    cache = DashboardCache()
+
+    def stale_loader(member_id):
+        cache.clear()
+        return loader(member_id)
+
+    cache.get(1, stale_loader)
+    assert 1 not in cache.entries
+
+
+def test_overlapping_loads_keep_the_one_started_after_the_invalidation():
+    cache = DashboardCache()
+    first_started, invalidated, second_done = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_loader(member_id):
+        first_started.set()
+        second_done.wait(5)
+        return {'version': 'old'}
+
+    thread = threading.Thread(target=cache.get, args=(1, slow_loader))
+    thread.start()
+    first_started.wait(5)
+    cache.invalidate(1)
+    cache.get(1, lambda member_id: {'version': 'new'})
+    second_done.set()
+    thread.join(5)
+    assert cache.entries[1][0] == {'version': 'new'}
+
+
+def test_load_bookkeeping_does_not_grow_with_members():
+    cache = DashboardCache(max_size=10)
+    for member_id in range(1000):
+        cache.get(member_id, loader)
+        cache.invalidate(member_id)
+    assert cache.loads == {}
+    assert len(cache.entries) == 0
+
+
+def test_failed_load_is_not_cached_and_leaves_no_bookkeeping():
+    cache = DashboardCache()
+
+    def failing_loader(member_id):
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        cache.get(1, failing_loader)
+    assert cache.loads == {}
+    assert 1 not in cache.entries
@@ -0,0 +1,110 @@
+import threading
+import psycopg2
+import psycopg2.pool
+import pytest
+from db_connection import HealthClubDatabase
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = 0
+        self.autocommit = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool:
+    """
+    Hands out the idle connections first and then new ones, like psycopg2's pool. broken_new makes
+    the new connections broken too, as when the server is down.
+    """
+
+    def __init__(self, idle=(), maxconn=3, broken_new=False):
+        self.idle = list(idle)
+        self.maxconn = maxconn
+        self.broken_new = broken_new
+        self.opened = 0
+        self.discarded = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop(0)
+        self.opened += 1
+        return FakeConnection(self.broken_new)
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+            self.discarded.append(conn)
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle = []
+
+
+def pooled_database(pool, size=3):
+    # A bare instance, so the tests neither touch nor replace the shared singleton
+    database = object.__new__(HealthClubDatabase)
+    database.pool = pool
+    database.pool_slots = threading.BoundedSemaphore(size)
+    database.checkout_timeout = 0.1
+    database.health_check = True
+    return database
+
+
+def slots_free(database, size=3):
+    acquired = [database.pool_slots.acquire(blocking=False) for _ in range(size)]
+    for ok in acquired:
+        if ok:
+            database.pool_slots.release()
+    return sum(acquired)
+
+
+def test_every_broken_idle_connection_is_discarded():
+    broken = [FakeConnection(broken=True), FakeConnection(broken=True)]
+    pool = FakePool(idle=broken)
+    database = pooled_database(pool)
+    conn = database._checkout()
+    assert not conn.broken and conn.autocommit
+    assert pool.discarded == broken
+    database._checkin(conn)
+    assert slots_free(database) == 3
+
+
+def test_checkout_fails_when_no_connection_answers():
+    pool = FakePool(idle=[FakeConnection(broken=True)], broken_new=True)
+    database = pooled_database(pool)
+    with pytest.raises(psycopg2.OperationalError):
+        database._checkout()
+    assert pool.opened == pool.maxconn
+    assert all(conn.closed for conn in pool.discarded)
+    assert slots_free(database) == 3
+
+
+def test_connection_returned_after_the_pool_closed_is_closed():
+    database = pooled_database(FakePool())
+    conn = database._checkout()
+    database.close_pool()
+    database._checkin(conn)
+    assert conn.closed
+    assert slots_free(database) == 3
+    with pytest.raises(psycopg2.pool.PoolError):
+        database._checkout()
@@ -0,0 +1,80 @@
+import os
+import headless
+from headless import fill_placeholders, parse_sessions, run_session, ScriptExhausted
+
+SESSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sessions')
+
+
+def write_script(tmp_path, content):
+    path = tmp_path / "script.txt"
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+
+def test_sessions_are_split_on_separator_lines(tmp_path):
+    path = write_script(tmp_path, "1\n2\n---\n3\n  ---  \n4\n")
+    assert parse_sessions(path) == [['1', '2'], ['3'], ['4']]
+
+
+def test_comments_are_skipped_and_inner_blank_lines_kept(tmp_path):
+    path = write_script(tmp_path, "# header\n\n1\n  # indented comment\n\n2\n\n---\n")
+    assert parse_sessions(path) == [['1', '', '2']]
+
+
+def test_empty_sessions_are_dropped(tmp_path):
+    path = write_script(tmp_path, "---\n# only a comment\n---\n\n---\n1\n")
+    assert parse_sessions(path) == [['1']]
+
+
+def test_windows_line_endings_are_stripped(tmp_path):
+    path = write_script(tmp_path, "1\r\n  padded  \r\n---\r\n2\r\n")
+    assert parse_sessions(path) == [['1', '  padded  '], ['2']]
+
+
+def test_shipped_scripts_parse():
+    for name in os.listdir(SESSIONS_DIR):
+        sessions = parse_sessions(os.path.join(SESSIONS_DIR, name))
+        assert sessions and all(sessions), name
+
+
+def test_placeholders_are_filled_and_unknown_ones_kept():
+    lines = ["{member_email}", "{member_password} and {trainer_number}", "{member_unknown}", "{other}"]
+    values = {'member_email': 'ann@club.com', 'member_password': 'pw', 'trainer_number': '2'}
+    assert fill_placeholders(lines, values) == ["ann@club.com", "pw and 2", "{member_unknown}", "{other}"]
+
+
+def test_run_session_feeds_the_script_to_input(monkeypatch):
+    answers = []
+
+    def run_menu():
+        answers.append(input("Choice: "))
+        answers.append(input("Email: "))
+        print("Goodbye")
+
+    monkeypatch.setattr(headless.main, 'run_menu', run_menu)
+    headless.install_scripted_console()
+    try:
+        result = run_session("s", ["1", "ann@club.com"], keep_output=True)
+    finally:
+        headless.uninstall_scripted_console()
+    assert answers == ["1", "ann@club.com"]
+    assert result['status'] == 'completed' and result['inputs'] == 2
+    assert result['output'] == "Choice: 1\nEmail: ann@club.com\nGoodbye\n"
+
+
+def test_run_session_reports_exhausted_and_failed_scripts(monkeypatch):
+    def run_menu():
+        if input() == "fail":
+            raise ValueError("bad choice")
+        input()
+
+    monkeypatch.setattr(headless.main, 'run_menu', run_menu)
+    headless.install_scripted_console()
+    try:
+        exhausted = run_session("short", ["1"])
+        failed = run_session("broken", ["fail"])
+    finally:
+        headless.uninstall_scripted_console()
+    assert exhausted['status'] == 'exhausted' and exhausted['inputs'] == 1
+    assert failed['status'] == 'error' and failed['error'] == "ValueError: bad choice"
+    assert issubclass(ScriptExhausted, EOFError)
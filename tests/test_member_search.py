@@ -0,0 +1,73 @@
+import builtins
+import pytest
+import api
+import trainer
+from api import ApiError, ApiRequest
+
+
+class SearchResults:
+    """
+    Returns MEMBER_SEARCH_QUERY rows for a fixed list of members, sorted and continued after the cursor
+    the way the query does.
+    """
+
+    def __init__(self, count):
+        # (MemberID, FirstName, LastName, Email, Rank, SortLastName, SortFirstName)
+        self.rows = sorted(((member_id, 'Sam', f'Lee{member_id % 7}', f'sam{member_id}@club.com', member_id % 3,
+                             f'lee{member_id % 7}', 'sam') for member_id in range(1, count + 1)),
+                           key=lambda row: (row[4], row[5], row[6], row[0]))
+        self.params = []
+
+    def execute_query(self, query, params=None, fetch=False):
+        self.params.append(params)
+        rows = self.rows
+        if params['after_id'] is not None:
+            after = (params['after_rank'], params['after_last_name'], params['after_first_name'], params['after_id'])
+            rows = [row for row in rows if (row[4], row[5], row[6], row[0]) > after]
+        return rows[:params['limit']]
+
+
+@pytest.fixture
+def results(monkeypatch):
+    results = SearchResults(25)
+    monkeypatch.setattr(trainer, 'db', results)
+    return results
+
+
+def test_pages_follow_each_other_without_gaps(results):
+    seen, cursor = [], None
+    while True:
+        members, cursor = trainer.search_members('sam', 10, cursor)
+        seen.extend(member['MemberID'] for member in members)
+        if cursor is None:
+            break
+    assert seen == [row[0] for row in results.rows]
+    assert [params['limit'] for params in results.params] == [11, 11, 11]
+
+
+def test_failed_search_returns_no_members(monkeypatch):
+    monkeypatch.setattr(trainer, 'db', type('Down', (), {'execute_query': lambda self, *args, **kwargs: None})())
+    assert trainer.search_members('sam') == ([], None)
+
+
+def test_console_search_pages_until_stopped(results, monkeypatch, capsys):
+    answers = iter(['sam', '', 'q'])
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(answers))
+    trainer.view_member_profiles(page_size=10)
+    assert capsys.readouterr().out.count('MemberID:') == 20
+
+
+def test_api_returns_a_cursor_for_the_next_page(results):
+    status, first = api.trainer_member_search(ApiRequest({'name': 'sam', 'limit': '10'}, None, user_id=1))
+    assert status == 200 and len(first['members']) == 10
+    status, second = api.trainer_member_search(ApiRequest({'name': 'sam', 'limit': '10', 'cursor': first['next_cursor']}, None, user_id=1))
+    assert second['members'][0]['MemberID'] == results.rows[10][0]
+    status, last = api.trainer_member_search(ApiRequest({'name': 'sam', 'limit': '10', 'cursor': second['next_cursor']}, None, user_id=1))
+    assert len(last['members']) == 5 and last['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'e30=', api.encode_search_cursor(('0', 'lee', 'sam', 1))])
+def test_api_rejects_a_malformed_cursor(results, cursor):
+    with pytest.raises(ApiError) as error:
+        api.trainer_member_search(ApiRequest({'name': 'sam', 'cursor': cursor}, None, user_id=1))
+    assert error.value.status == 400
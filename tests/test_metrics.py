@@ -0,0 +1,84 @@
+import urllib.request
+from metrics import Counter, Histogram, Registry, start_metrics_server
+
+
+def test_observation_on_a_bound_counts_in_that_bucket():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+    assert histogram.values[()] == [[1, 1, 1], 5.6, 3]
+
+
+def test_buckets_are_sorted():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(1.0, 0.1))
+    assert histogram.buckets == (0.1, 1.0)
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(2.0, "/a")
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 2.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_histogram_without_labels_renders_only_le():
+    histogram = Histogram("wait_seconds", "Wait.", buckets=(1.0,))
+    histogram.observe(0.5)
+    assert 'wait_seconds_bucket{le="1.0"} 1' in histogram.render()
+    assert "wait_seconds_count 1" in histogram.render()
+
+
+def test_time_observes_even_when_the_block_raises():
+    histogram = Histogram("work_seconds", "Work.", ["step"])
+    try:
+        with histogram.time("load"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert histogram.values[("load",)][2] == 1
+
+
+def test_counter_renders_each_label_combination_in_order():
+    counter = Counter("bookings_total", "Bookings.", ["outcome"])
+    counter.inc("success")
+    counter.inc("failure", amount=2)
+    counter.inc("success")
+    assert counter.render()[2:] == ['bookings_total{outcome="failure"} 2', 'bookings_total{outcome="success"} 2']
+
+
+def test_label_values_are_escaped():
+    counter = Counter("errors_total", "Errors.", ["statement"])
+    counter.inc('SELECT "x"\\n\n')
+    assert counter.render()[2] == 'errors_total{statement="SELECT \\"x\\"\\\\n\\n"} 1'
+
+
+def test_registry_renders_every_metric():
+    registry = Registry()
+    registry.counter("a_total", "A.").inc()
+    registry.histogram("b_seconds", "B.", buckets=(1.0,))
+    text = registry.render()
+    assert text.endswith("\n")
+    assert "a_total 1" in text
+    assert "# TYPE b_seconds histogram" in text
+
+
+def test_metrics_server_serves_the_registry():
+    server = start_metrics_server(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.status == 200
+            assert "# TYPE hfc_db_query_seconds histogram" in response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
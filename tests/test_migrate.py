@@ -0,0 +1,92 @@
+import glob
+import os
+import re
+import pytest
+import migrate
+from migrate import check_plan, plan_scans
+
+# Plans as EXPLAIN (FORMAT JSON) returns them, trimmed to the fields the check reads
+INDEX_SCAN_PLAN = {
+    "Node Type": "Index Scan", "Relation Name": "payments", "Alias": "payments",
+    "Index Name": "payments_status_idx", "Index Cond": "((paymentid > 0))"
+}
+
+BITMAP_PLAN = {
+    "Node Type": "Bitmap Heap Scan", "Relation Name": "members", "Alias": "members",
+    "Plans": [{
+        "Node Type": "BitmapOr",
+        "Plans": [
+            {"Node Type": "Bitmap Index Scan", "Index Name": "members_first_name_idx"},
+            {"Node Type": "Bitmap Index Scan", "Index Name": "members_last_name_idx"}
+        ]
+    }]
+}
+
+ENROLL_PLAN = {
+    "Node Type": "ModifyTable", "Operation": "Insert", "Relation Name": "memberschedule",
+    "Plans": [{
+        "Node Type": "ModifyTable", "Operation": "Update", "Relation Name": "fitnessclasses",
+        "Plans": [{
+            "Node Type": "Nested Loop",
+            "Plans": [
+                {"Node Type": "Index Scan", "Relation Name": "fitnessclasses", "Index Name": "fitnessclasses_pkey"},
+                {"Node Type": "Seq Scan", "Relation Name": "rooms"}
+            ]
+        }]
+    }]
+}
+
+
+def test_index_scan_is_reported_with_its_index():
+    assert list(plan_scans(INDEX_SCAN_PLAN)) == [("Index Scan", "payments", "payments_status_idx")]
+
+
+def test_bitmap_index_scans_belong_to_the_heap_scan_table():
+    assert list(plan_scans(BITMAP_PLAN)) == [
+        ("Bitmap Heap Scan", "members", None),
+        ("Bitmap Index Scan", "members", "members_first_name_idx"),
+        ("Bitmap Index Scan", "members", "members_last_name_idx"),
+    ]
+
+
+def test_modify_nodes_are_not_scans():
+    assert list(plan_scans(ENROLL_PLAN)) == [
+        ("Index Scan", "fitnessclasses", "fitnessclasses_pkey"),
+        ("Seq Scan", "rooms", None),
+    ]
+
+
+def test_plan_passes_when_every_table_uses_an_expected_index():
+    scans = list(plan_scans(BITMAP_PLAN))
+    assert check_plan(scans, {'members': {'members_first_name_idx', 'members_last_name_idx'}})
+
+
+def test_sequential_scan_fails_the_plan():
+    scans = list(plan_scans(ENROLL_PLAN))
+    assert check_plan(scans, {'fitnessclasses': {'fitnessclasses_pkey'}})
+    assert not check_plan(scans, {'fitnessclasses': {'fitnessclasses_pkey'}, 'rooms': {'rooms_pkey'}})
+
+
+def test_other_index_fails_the_plan():
+    assert not check_plan(list(plan_scans(INDEX_SCAN_PLAN)), {'payments': {'payments_member_status_idx'}})
+
+
+def test_table_missing_from_the_plan_fails():
+    assert not check_plan(list(plan_scans(INDEX_SCAN_PLAN)), {'members': {'members_first_name_idx'}})
+
+
+def test_expected_indexes_are_created_by_the_migrations():
+    created = set()
+    for path in glob.glob(os.path.join(migrate.MIGRATIONS_DIR, '*.sql')):
+        with open(path) as migration_file:
+            created.update(name.lower() for name in re.findall(r'(?:INDEX IF NOT EXISTS|CONSTRAINT) (\w+)', migration_file.read()))
+    for description, query, params, expected in migrate.hot_queries():
+        for table, index_names in expected.items():
+            assert all(name in created or name == f"{table}_pkey" for name in index_names), description
+
+
+def test_hot_queries_use_their_indexes(club_database):
+    if not all(applied for _, _, applied in migrate.migration_status()):
+        pytest.skip("Migrations are pending; run migrate.py first.")
+    failures = [(description, scans) for description, passed, scans in migrate.check_query_plans() if not passed]
+    assert failures == []
@@ -0,0 +1,91 @@
+from psycopg2 import sql
+from db_connection import QueryStats
+
+
+def test_literals_and_whitespace_are_normalized():
+    stats = QueryStats()
+    text, _ = stats.normalize("SELECT *\n    FROM Members\tWHERE Email = 'a@b.com' AND MemberID = 42")
+    assert text == "SELECT * FROM Members WHERE Email = ? AND MemberID = ?"
+
+
+def test_quoted_quotes_and_decimals_are_one_literal():
+    stats = QueryStats()
+    text, _ = stats.normalize("UPDATE Payments SET Status = 'O''Brien', Amount = 12.50 WHERE PaymentID = 7")
+    assert text == "UPDATE Payments SET Status = ?, Amount = ? WHERE PaymentID = ?"
+
+
+def test_digits_inside_names_are_kept():
+    stats = QueryStats()
+    text, _ = stats.normalize("SELECT Col1 FROM Table2 LIMIT 10")
+    assert text == "SELECT Col1 FROM Table2 LIMIT ?"
+
+
+def test_placeholders_are_kept():
+    stats = QueryStats()
+    text, _ = stats.normalize("SELECT * FROM Members WHERE MemberID = %s OR Email = %(email)s")
+    assert text == "SELECT * FROM Members WHERE MemberID = %s OR Email = %(email)s"
+
+
+def test_statement_name_is_the_keyword_and_first_table():
+    assert QueryStats.statement_name("SELECT FirstName FROM Members m JOIN Payments p ON ?") == "SELECT members"
+    assert QueryStats.statement_name("INSERT INTO MemberSchedule (MemberID) VALUES (%s)") == "INSERT memberschedule"
+    assert QueryStats.statement_name("update Payments SET Status = ?") == "UPDATE payments"
+    assert QueryStats.statement_name("DELETE FROM EquipmentMaintenance WHERE MaintenanceID = ?") == "DELETE equipmentmaintenance"
+    assert QueryStats.statement_name("SELECT ?") == "SELECT"
+    assert QueryStats.statement_name("") == "EMPTY"
+
+
+def test_statement_name_skips_subqueries():
+    query = "SELECT * FROM (SELECT MemberID FROM Members) matches WHERE ?"
+    assert QueryStats.statement_name(query) == "SELECT members"
+
+
+def test_composed_queries_are_recorded_as_text():
+    stats = QueryStats(slow_query_ms=None)
+    query = sql.SQL("UPDATE {} SET {} = %s").format(sql.Identifier('payments'), sql.Identifier('status'))
+    stats.record(query, ('Paid',), 0.001, 1, None)
+    assert stats.snapshot()[0]['query'] == "UPDATE payments SET status = %s"
+
+
+def test_calls_with_different_literals_share_an_entry():
+    stats = QueryStats(slow_query_ms=None)
+    stats.record("SELECT * FROM Members WHERE MemberID = 1", None, 0.002, 1, None)
+    stats.record("SELECT * FROM Members WHERE MemberID = 2", None, 0.004, 0, None, failed=True)
+    [entry] = stats.snapshot()
+    assert entry['calls'] == 2
+    assert entry['errors'] == 1
+    assert entry['rows'] == 1
+    assert round(entry['total_ms'], 6) == 6.0
+    assert round(entry['mean_ms'], 6) == 3.0
+
+
+def test_snapshot_is_ordered_by_total_time():
+    stats = QueryStats(slow_query_ms=None)
+    stats.record("SELECT * FROM Members", None, 0.001, 1, None)
+    stats.record("SELECT * FROM Trainers", None, 0.005, 1, None)
+    assert [entry['query'] for entry in stats.snapshot()] == ["SELECT * FROM Trainers", "SELECT * FROM Members"]
+
+
+def test_percentiles_cover_the_recent_sample():
+    stats = QueryStats(slow_query_ms=None, sample_size=100)
+    for ms in range(1, 201):
+        stats.record("SELECT ?", None, ms / 1000, 1, None)
+    [entry] = stats.snapshot()
+    # Only the last 100 calls, 101 to 200 ms, are in the sample
+    assert round(entry['p95_ms']) == 196
+    assert round(entry['p99_ms']) == 200
+
+
+def test_slow_queries_are_logged_without_parameters(caplog):
+    stats = QueryStats(slow_query_ms=1.0)
+    stats.record("SELECT * FROM Members WHERE Password = %s", ('secret',), 0.5, 0, None)
+    assert "1 parameters redacted" in caplog.text
+    assert "secret" not in caplog.text
+
+
+def test_reset_clears_the_entries():
+    stats = QueryStats(slow_query_ms=None)
+    stats.record("SELECT ?", None, 0.001, 1, None)
+    stats.reset()
+    assert stats.snapshot() == []
+    assert stats.report() == "No queries recorded."
@@ -0,0 +1,327 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+import pytest
+import admin
+import schedule_index as schedule_index_module
+from schedule_index import IntervalSet, ScheduleIndex
+from utils import MAINTENANCE_EXEMPT_SPECIALIZATIONS
+
+BASE = datetime(2024, 5, 1)
+SPECIALIZATIONS = ['Weight Loss', 'Strength', 'Cardio', 'Yoga', 'Swimming', 'Rehab', 'Health', None]
+CLASS_NAMES = ['Yoga', 'Swimming', 'Strength', 'Cardio', None]
+
+
+def at(minutes):
+    return BASE + timedelta(minutes=minutes)
+
+
+def overlaps(start, end, other_start, other_end):
+    return start < other_end and other_start < end
+
+
+#################################################### IntervalSet Section ###################################################
+
+def test_interval_set_treats_intervals_as_half_open():
+    intervals = IntervalSet()
+    intervals.add(at(0), at(60), 'a')
+    assert intervals.find_overlap(at(59), at(61)) == 'a'
+    assert intervals.find_overlap(at(-30), at(0)) is None
+    assert intervals.find_overlap(at(60), at(120)) is None
+
+
+def test_interval_set_add_with_existing_key_moves_the_interval():
+    intervals = IntervalSet()
+    intervals.add(at(0), at(60), 'a')
+    intervals.add(at(120), at(180), 'a')
+    assert len(intervals) == 1
+    assert not intervals.overlaps(at(0), at(60))
+    assert intervals.overlaps(at(150), at(160))
+
+
+def test_interval_set_ignores_unknown_keys_on_remove():
+    intervals = IntervalSet()
+    intervals.add(at(0), at(60), 'a')
+    intervals.remove('b')
+    assert len(intervals) == 1
+
+
+def test_interval_set_max_length_shrinks_when_the_longest_interval_goes():
+    intervals = IntervalSet()
+    intervals.add(at(0), at(60), 'session')
+    intervals.add(at(0), at(60 * 24 * 21), 'absence')
+    intervals.add(at(120), at(180), 'other session')
+    assert intervals.max_length == timedelta(days=21)
+    intervals.remove('absence')
+    assert intervals.max_length == timedelta(minutes=60)
+    intervals.remove('session')
+    assert intervals.max_length == timedelta(minutes=60)
+    intervals.remove('other session')
+    assert intervals.max_length == timedelta(0)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_interval_set_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals, expected = IntervalSet(), {}
+    for step in range(2000):
+        if expected and rng.random() < 0.4:
+            key = rng.choice(list(expected))
+            intervals.remove(key)
+            del expected[key]
+        else:
+            start = at(30 * rng.randrange(200))
+            length = rng.choice([30, 60, 90, 120, 60 * 24 * rng.randint(1, 14)])
+            key = rng.randrange(50)
+            intervals.add(start, start + timedelta(minutes=length), key)
+            expected[key] = (start, start + timedelta(minutes=length))
+        start = at(15 * rng.randrange(400))
+        end = start + timedelta(minutes=rng.choice([15, 30, 60, 120]))
+        found = intervals.find_overlap(start, end)
+        matches = {key for key, (s, e) in expected.items() if overlaps(start, end, s, e)}
+        assert (found in matches) if matches else found is None
+    assert len(intervals) == len(expected)
+
+
+#################################################### Schedule Index Section ###################################################
+
+class ClubTables:
+    """
+    The rows the schedule index mirrors, as plain dictionaries. Stands in for the database when the
+    index loads or looks up a trainer and when the admin console reschedules a class, and answers
+    every conflict check by brute force.
+    """
+
+    def __init__(self):
+        self.trainers = {}
+        self.sessions = {}
+        self.classes = {}
+        self.maintenance = {}
+        self.unavailability = {}
+
+    def execute_query(self, query, params=None, fetch=False):
+        if 'WHERE TrainerID = %s' in query:
+            return [(self.trainers[params[0]],)] if params[0] in self.trainers else []
+        if query.strip().startswith('UPDATE FitnessClasses SET StartTime = %s, EndTime = %s'):
+            start, end, class_id = params
+            if class_id not in self.classes:
+                return []
+            self.classes[class_id] = self.classes[class_id][:3] + (start, end)
+            return [(class_id,)]
+        if 'SELECT MemberID FROM MemberSchedule WHERE ClassID' in query:
+            return []
+        if 'FROM FitnessClasses' in query:
+            # The admin console's class list
+            return [(class_id, name, s, int((e - s).total_seconds()) // 60, trainer_id, room_id)
+                    for class_id, (room_id, trainer_id, name, s, e) in sorted(self.classes.items(), key=lambda item: (item[1][3], item[0]))]
+        return list(self.trainers.items())
+
+    def stream_query(self, query, params=None):
+        if 'FROM MemberSchedule' in query:
+            return [(schedule_id,) + row for schedule_id, row in self.sessions.items()]
+        if 'FROM FitnessClasses' in query:
+            return [(class_id,) + row for class_id, row in self.classes.items()]
+        if 'FROM EquipmentMaintenance' in query:
+            return [(maintenance_id,) + row for maintenance_id, row in self.maintenance.items()]
+        return [(unavailability_id,) + row for unavailability_id, row in self.unavailability.items()]
+
+    def trainer_conflict(self, trainer_id, start, end, exempt):
+        if any(overlaps(start, end, s, e) for s, e in self.maintenance.values()) and self.trainers.get(trainer_id) not in exempt:
+            return 'maintenance'
+        if any(t == trainer_id and overlaps(start, end, s, e) for t, s, e in self.unavailability.values()):
+            return 'unavailable'
+        if any(t == trainer_id and overlaps(start, end, s, e) for t, _, s, e, _ in self.sessions.values()):
+            return 'booked'
+        return None
+
+    def room_booked(self, room_id, start, end):
+        return any(r == room_id and overlaps(start, end, s, e) for r, _, _, s, e in self.classes.values())
+
+    def maintenance_scheduled(self, start, end):
+        return any(overlaps(start, end, s, e) for s, e in self.maintenance.values())
+
+    def sessions_overlap(self, start, end):
+        return any(session_type == 'Personal Training' and overlaps(start, end, s, e) for _, _, s, e, session_type in self.sessions.values()) or \
+            any(name is not None and overlaps(start, end, s, e) for _, _, name, s, e in self.classes.values())
+
+
+class RandomSchedule:
+    """
+    Makes random writes to the tables and sends each one through the index's write hook, the way the
+    admin, member and trainer functions do after their INSERT, UPDATE or DELETE succeeds.
+    """
+
+    def __init__(self, rng, tables, index, console=None):
+        self.rng = rng
+        self.tables = tables
+        self.index = index
+        self.console = console
+        self.ids = itertools.count(1)
+
+    def slot(self, lengths=(30, 60, 90, 120)):
+        start = at(30 * self.rng.randrange(14 * 48))
+        return start, start + timedelta(minutes=self.rng.choice(lengths))
+
+    def trainer_id(self):
+        # Occasionally a trainer that does not exist
+        return self.rng.randint(1, len(self.tables.trainers) + 1)
+
+    def add_trainer(self, hook=True):
+        trainer_id = max(self.tables.trainers, default=0) + 1
+        self.tables.trainers[trainer_id] = self.rng.choice(SPECIALIZATIONS)
+        if hook:
+            self.index.add_trainer(trainer_id, self.tables.trainers[trainer_id])
+
+    def add_trainer_from_another_process(self):
+        self.add_trainer(hook=False)
+
+    def add_session(self):
+        schedule_id = next(self.ids)
+        if self.tables.classes and self.rng.random() < 0.3:
+            class_id = self.rng.choice(list(self.tables.classes))
+            _, trainer_id, _, start, end = self.tables.classes[class_id]
+            row = (trainer_id, class_id, start, end, 'Group Class')
+        else:
+            row = (self.trainer_id(), None) + self.slot() + ('Personal Training',)
+        self.tables.sessions[schedule_id] = row
+        self.index.add_session(schedule_id, *row)
+
+    def remove_session(self):
+        if self.tables.sessions:
+            schedule_id = self.rng.choice(list(self.tables.sessions))
+            del self.tables.sessions[schedule_id]
+            self.index.remove_session(schedule_id)
+
+    def add_class(self):
+        class_id = next(self.ids)
+        row = (self.rng.randint(1, 3), self.trainer_id(), self.rng.choice(CLASS_NAMES)) + self.slot()
+        self.tables.classes[class_id] = row
+        self.index.add_class(class_id, *row)
+
+    def move_class(self):
+        if self.tables.classes:
+            class_id = self.rng.choice(list(self.tables.classes))
+            start, end = self.slot()
+            self.tables.classes[class_id] = self.tables.classes[class_id][:3] + (start, end)
+            self.index.move_class(class_id, start, end)
+
+    def move_class_from_console(self):
+        """
+        Reschedules a class through the admin menu's update_existing_class, so the hook runs after the real UPDATE.
+        """
+        if self.tables.classes and self.console is not None:
+            listed = self.tables.execute_query("SELECT ... FROM FitnessClasses WHERE Status != 'Cancelled'")
+            choice = self.rng.randrange(len(listed))
+            start, end = self.slot()
+            self.console.answers = [choice + 1, start, int((end - start).total_seconds()) // 60]
+            admin.update_existing_class()
+            assert self.tables.classes[listed[choice][0]][3:] == (start, end)
+
+    def cancel_class(self):
+        if self.tables.classes:
+            class_id = self.rng.choice(list(self.tables.classes))
+            self.tables.sessions = {sid: row for sid, row in self.tables.sessions.items() if row[1] != class_id}
+            self.index.remove_class_sessions(class_id)
+            del self.tables.classes[class_id]
+            self.index.remove_class(class_id)
+
+    def add_maintenance(self):
+        maintenance_id = next(self.ids)
+        self.tables.maintenance[maintenance_id] = self.slot((30, 60, 120, 240))
+        self.index.add_maintenance(maintenance_id, *self.tables.maintenance[maintenance_id])
+
+    def remove_maintenance(self):
+        if self.tables.maintenance:
+            maintenance_id = self.rng.choice(list(self.tables.maintenance))
+            del self.tables.maintenance[maintenance_id]
+            self.index.remove_maintenance(maintenance_id)
+
+    def add_unavailability(self):
+        unavailability_id = next(self.ids)
+        trainer_id = self.trainer_id()
+        start, end = self.slot((60, 240, 60 * 24 * 7, 60 * 24 * 21))
+        self.tables.unavailability[unavailability_id] = (trainer_id, start, end)
+        self.index.set_unavailability(unavailability_id, trainer_id, start, end)
+
+    def move_unavailability(self):
+        if self.tables.unavailability:
+            unavailability_id = self.rng.choice(list(self.tables.unavailability))
+            start, end = self.slot((60, 240))
+            self.tables.unavailability[unavailability_id] = (self.tables.unavailability[unavailability_id][0], start, end)
+            self.index.move_unavailability(unavailability_id, start, end)
+
+    def write(self):
+        self.rng.choice([
+            self.add_trainer, self.add_trainer_from_another_process,
+            self.add_session, self.add_session, self.add_session, self.remove_session,
+            self.add_class, self.move_class, self.move_class_from_console, self.cancel_class,
+            self.add_maintenance, self.remove_maintenance,
+            self.add_unavailability, self.move_unavailability
+        ])()
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    tables = ClubTables()
+    monkeypatch.setattr(schedule_index_module, 'db', tables)
+    return tables
+
+
+class Console:
+    """
+    Runs the admin menu functions against the tables, answering their prompts from answers in order.
+    The availability checks are left out; only the writes and their index hooks are under test.
+    """
+
+    def __init__(self, monkeypatch, tables, index):
+        self.answers = []
+        monkeypatch.setattr(admin, 'db', tables)
+        monkeypatch.setattr(admin, 'schedule_index', index)
+        for prompt in ('prompt_for_integer', 'get_date_time_input', 'get_duration'):
+            monkeypatch.setattr(admin, prompt, lambda *args: self.answers.pop(0))
+        monkeypatch.setattr(admin, 'is_trainer_available', lambda *args: True)
+        monkeypatch.setattr(admin, 'check_room_availability', lambda *args: True)
+        monkeypatch.setattr(admin, 'is_equipment_under_maintenance', lambda *args: False)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_index_matches_brute_force_through_random_writes(tables, monkeypatch, seed):
+    rng = random.Random(seed)
+    index = ScheduleIndex()
+    schedule = RandomSchedule(rng, tables, index, Console(monkeypatch, tables, index))
+    for _ in range(4):
+        schedule.add_trainer()
+    for _ in range(20):
+        rng.choice([schedule.add_session, schedule.add_class, schedule.add_maintenance, schedule.add_unavailability])()
+    schedule.index.load()
+
+    for step in range(600):
+        schedule.write()
+        for _ in range(5):
+            start, end = schedule.slot((30, 60, 90, 120))
+            trainer_id, room_id = schedule.trainer_id(), rng.randint(1, 3)
+            context = f"seed {seed}, step {step}, {start} to {end}"
+            assert schedule.index.trainer_conflict(trainer_id, start, end, MAINTENANCE_EXEMPT_SPECIALIZATIONS) == \
+                tables.trainer_conflict(trainer_id, start, end, MAINTENANCE_EXEMPT_SPECIALIZATIONS), f"trainer {trainer_id}, {context}"
+            assert schedule.index.room_booked(room_id, start, end) == tables.room_booked(room_id, start, end), f"room {room_id}, {context}"
+            assert schedule.index.maintenance_scheduled(start, end) == tables.maintenance_scheduled(start, end), context
+            assert schedule.index.sessions_overlap(start, end) == tables.sessions_overlap(start, end), context
+
+
+def test_write_hooks_are_ignored_until_loaded(tables):
+    index = ScheduleIndex()
+    index.add_session(1, 1, None, at(0), at(60), 'Personal Training')
+    index.add_maintenance(1, at(0), at(60))
+    assert not index.loaded
+    assert not index.sessions_overlap(at(0), at(60))
+    assert not index.maintenance_scheduled(at(0), at(60))
+
+
+def test_unload_empties_the_index(tables):
+    tables.sessions[1] = (1, None, at(0), at(60), 'Personal Training')
+    index = ScheduleIndex()
+    index.load()
+    assert index.sessions_overlap(at(0), at(60))
+    index.unload()
+    assert not index.loaded
+    assert not index.sessions_overlap(at(0), at(60))
@@ -1,9 +1,7 @@
 from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index
 import logging
 
-# Setup logging configuration
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 
 # Database instance
 db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
@@ -26,9 +24,10 @@ def add_trainer_unavailability(trainer_id, start_time, end_time):
         str: Status message indicating the outcome of the operation.
     """
     try:
-        query = "INSERT INTO TrainerUnavailability (TrainerID, StartTime, EndTime) VALUES (%s, %s, %s);"
+        query = "INSERT INTO TrainerUnavailability (TrainerID, StartTime, EndTime) VALUES (%s, %s, %s) RETURNING UnavailabilityID;"
         params = (trainer_id, start_time, end_time)
-        db.execute_query(query, params)
+        unavailability_id = db.execute_query(query, params, fetch=True)[0][0]
+        schedule_index.set_unavailability(unavailability_id, trainer_id, start_time, end_time)
         return "Trainer unavailability added successfully."
     except Exception as e:
         logging.error(f"Failed to add unavailability for trainer {trainer_id}: {e}")
@@ -48,9 +47,15 @@ def update_trainer_unavailability(unavailability_id, new_start_time, new_end_tim
         str: Status message indicating the outcome of the update.
     """
     try:
-        query = "UPDATE TrainerUnavailability SET StartTime = %s, EndTime = %s WHERE UnavailabilityID = %s;"
+        query = "UPDATE TrainerUnavailability SET StartTime = %s, EndTime = %s WHERE UnavailabilityID = %s RETURNING UnavailabilityID;"
         params = (new_start_time, new_end_time, unavailability_id)
-        db.execute_query(query, params)
+        # execute_query returns None when the update fails, so the index only follows a row that really changed
+        updated = db.execute_query(query, params, fetch=True)
+        if updated is None:
+            return "Error updating unavailability."
+        if not updated:
+            return "Unavailability record not found."
+        schedule_index.move_unavailability(unavailability_id, new_start_time, new_end_time)
         return "Trainer unavailability updated successfully."
     except Exception as e:
         logging.error(f"Failed to update unavailability record {unavailability_id}: {e}")
@@ -60,6 +65,42 @@ def update_trainer_unavailability(unavailability_id, new_start_time, new_end_tim
 
 #################################################### Member Profile Viewing Section ###################################################
 
+# Case-insensitive prefix and infix name search. The WHERE clause matches the trigram index on the
+# lowercased full name; exact name matches rank first, then names starting with the search text.
+# Pages continue after the sort key of the last member shown, so no page re-reads the ones before it
+# and members added meanwhile do not shift the page boundaries.
+MEMBER_SEARCH_QUERY = """
+SELECT MemberID, FirstName, LastName, Email, Rank, SortLastName, SortFirstName FROM (
+    SELECT MemberID, FirstName, LastName, Email,
+        CASE
+            WHEN lower(FirstName) = %(name)s OR lower(LastName) = %(name)s OR lower(FirstName || ' ' || LastName) = %(name)s THEN 0
+            WHEN lower(FirstName || ' ' || LastName) LIKE %(prefix)s OR lower(LastName) LIKE %(prefix)s THEN 1
+            ELSE 2
+        END AS Rank,
+        lower(LastName) AS SortLastName,
+        lower(FirstName) AS SortFirstName
+    FROM Members
+    WHERE lower(FirstName || ' ' || LastName) LIKE %(infix)s
+) matches
+WHERE %(after_id)s::integer IS NULL
+OR (Rank, SortLastName, SortFirstName, MemberID) > (%(after_rank)s, %(after_last_name)s, %(after_first_name)s, %(after_id)s)
+ORDER BY Rank, SortLastName, SortFirstName, MemberID
+LIMIT %(limit)s;
+"""
+
+
+def member_search_params(name, limit, after=None):
+    """
+    Builds the parameters for MEMBER_SEARCH_QUERY. after is the cursor of the previous page, if any.
+    """
+    name = ' '.join(name.lower().split())
+    # Escape LIKE wildcards so they match literally
+    pattern = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    after_rank, after_last_name, after_first_name, after_id = after or (None, None, None, None)
+    return {'name': name, 'prefix': f'{pattern}%', 'infix': f'%{pattern}%', 'limit': limit, 'after_rank': after_rank,
+            'after_last_name': after_last_name, 'after_first_name': after_first_name, 'after_id': after_id}
+
+
 def search_member_by_name(trainer_id, name):
     """
     Allows a trainer to search for member profiles by name to view their information and related health metrics.
@@ -68,17 +109,39 @@ def search_member_by_name(trainer_id, name):
         trainer_id (int): The ID of the trainer performing the search.
         name (str): The name or partial name of the member to search for.
         
-    Returns:
-        list: A list of member profiles that match the search criteria.
+    Yields:
+        dict: One matching member profile at a time, best matches first, streamed from a server-side cursor.
     """
     try:
-        query = "SELECT MemberID, FirstName, LastName, Email FROM Members WHERE FirstName LIKE %s OR LastName LIKE %s;"
-        params = (f'%{name}%', f'%{name}%')
-        results = db.execute_query(query, params, fetch=True)
-        return [{'MemberID': res[0], 'FirstName': res[1], 'LastName': res[2], 'Email': res[3]} for res in results]
+        # A NULL limit returns every match
+        for res in db.stream_query(MEMBER_SEARCH_QUERY, member_search_params(name, None)):
+            yield {'MemberID': res[0], 'FirstName': res[1], 'LastName': res[2], 'Email': res[3]}
     except Exception as e:
         logging.error(f"Failed to search for members: {e}")
-        return []
+
+
+def search_members(name, limit=20, cursor=None):
+    """
+    Searches members by first name, last name or full name, ignoring case, with the best matches first.
+
+    Args:
+        name (str): The name or part of a name to search for.
+        limit (int): The maximum number of members to return.
+        cursor (tuple): Optional cursor returned by a previous call, to fetch the next page.
+
+    Returns:
+        tuple: (members, next_cursor) where members is a list of member dictionaries and next_cursor
+        is the (rank, last name, first name, MemberID) sort key of the last member returned, or None
+        once there are no more matches.
+    """
+    if not name.strip():
+        return [], None
+    # execute_query logs a failed search and returns None
+    results = db.execute_query(MEMBER_SEARCH_QUERY, member_search_params(name, limit + 1, cursor), fetch=True) or []
+    members = [{'MemberID': res[0], 'FirstName': res[1], 'LastName': res[2], 'Email': res[3]} for res in results[:limit]]
+    last = results[limit - 1] if len(results) > limit else None
+    next_cursor = (last[4], last[5], last[6], last[0]) if last else None
+    return members, next_cursor
 
 
 
@@ -117,9 +180,23 @@ def manage_availability():
     # Implementation to update the trainer's availability for sessions
     pass
 
-def view_member_profiles():
-    # Implementation to search and view details of members
-    pass
+def view_member_profiles(page_size=10):
+    """
+    Searches members by name from the console, one page of best matches at a time.
+    """
+    name = input("Enter the member name to search for: ")
+    members, cursor = search_members(name, page_size)
+    if not members:
+        print("No members found.")
+        return
+    while True:
+        for member in members:
+            print(f"MemberID: {member['MemberID']}, Name: {member['FirstName']} {member['LastName']}, Email: {member['Email']}")
+        if cursor is None:
+            break
+        if input("Press Enter for more members or type q to stop: ").strip().lower() == 'q':
+            break
+        members, cursor = search_members(name, page_size, cursor)
  
 
 
@@ -1,13 +1,11 @@
 from Workflow.db_connection import HealthClubDatabase
+from schedule_index import schedule_index
 from datetime import datetime, timedelta
 import logging
 
 # Database instance
 db = HealthClubDatabase(dbname="Tester", user="postgres", password="postgres", host="localhost")
 
-# Setup logging configuration
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 def format_datetime_for_postgres(datetime_str): 
     """
     Formats a datetime string into PostgreSQL's preferred format.
@@ -38,16 +36,20 @@ def is_equipment_under_maintenance(start_datetime_str, duration):
     try:
         start_time = datetime.strptime(format_datetime_for_postgres(start_datetime_str), '%Y-%m-%d %H:%M:%S')
         end_time = start_time + timedelta(minutes=duration)
-        query = """
-        SELECT COUNT(*) FROM EquipmentMaintenance
-        WHERE (MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration)
-        OVERLAPS (%s, %s)
-        AND Status = 'Scheduled';
-        """
-        params = (start_time, end_time)
-        result = db.execute_query(query, params, fetch=True)
-        
-        if result[0][0] > 0:
+        if schedule_index.loaded:
+            under_maintenance = schedule_index.maintenance_scheduled(start_time, end_time)
+        else:
+            query = """
+            SELECT COUNT(*) FROM EquipmentMaintenance
+            WHERE (MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration)
+            OVERLAPS (%s, %s)
+            AND Status = 'Scheduled';
+            """
+            params = (start_time, end_time)
+            result = db.execute_query(query, params, fetch=True)
+            under_maintenance = result[0][0] > 0
+
+        if under_maintenance:
             logging.info("Equipment maintenance conflicts with the proposed session time.")
             return True
         else:
@@ -58,6 +60,80 @@ def is_equipment_under_maintenance(start_datetime_str, duration):
         return False
     
     
+# Specializations whose private sessions do not need the equipment, so they can run during maintenance
+MAINTENANCE_EXEMPT_SPECIALIZATIONS = ['Weight Loss', 'Strength', 'Cardio', 'Rehab', 'Health']
+
+# Reasons returned by the availability check, keyed by the conflict kinds used by the schedule index
+AVAILABILITY_REASONS = {
+    'maintenance': 'Equipment maintenance is scheduled during this time.',
+    'unavailable': 'Trainer is unavailable during this time.',
+    'booked': 'Trainer already has an appointment during this time.'
+}
+
+# Evaluates every availability rule in one round trip. The CASE stops at the first conflict found,
+# so a busy slot only costs the subqueries up to that conflict.
+TRAINER_AVAILABILITY_QUERY = """
+SELECT CASE
+    WHEN EXISTS (
+        SELECT 1 FROM EquipmentMaintenance
+        WHERE (MaintenanceSchedule, MaintenanceSchedule + INTERVAL '1 minute' * Duration)
+        OVERLAPS (%(start_time)s, %(end_time)s)
+        AND Status = 'Scheduled'
+    ) AND COALESCE(t.Specialization <> ALL(%(exempt)s), TRUE)
+        THEN 'Equipment maintenance is scheduled during this time.'
+    WHEN EXISTS (
+        SELECT 1 FROM TrainerUnavailability
+        WHERE TrainerID = p.TrainerID AND StartTime < %(end_time)s AND EndTime > %(start_time)s
+    )
+        THEN 'Trainer is unavailable during this time.'
+    WHEN EXISTS (
+        SELECT 1 FROM MemberSchedule
+        WHERE TrainerID = p.TrainerID AND NOT (
+            StartTime >= %(end_time)s OR EndTime <= %(start_time)s
+        ) AND Status != 'Cancelled'
+    )
+        THEN 'Trainer already has an appointment during this time.'
+END
+FROM (VALUES (%(trainer_id)s)) AS p (TrainerID)
+LEFT JOIN Trainers t ON t.TrainerID = p.TrainerID;
+"""
+
+
+def trainer_availability_params(trainer_id, start_datetime_str, duration):
+    """
+    Builds the parameters for TRAINER_AVAILABILITY_QUERY, parsing the start time only once.
+    """
+    start_time = datetime.strptime(start_datetime_str, '%m/%d/%Y %H:%M')
+    return {
+        'trainer_id': trainer_id,
+        'start_time': start_time,
+        'end_time': start_time + timedelta(minutes=duration),
+        'exempt': MAINTENANCE_EXEMPT_SPECIALIZATIONS
+    }
+
+
+def check_trainer_availability(trainer_id, start_datetime_str, duration):
+    """
+    Checks equipment maintenance, the trainer's unavailability and the trainer's other appointments
+    in a single query, or without any query once the schedule index is loaded.
+
+    Args:
+        trainer_id (int): The ID of the trainer.
+        start_datetime_str (str): The proposed start time for the session in 'MM/DD/YYYY HH:MM' format.
+        duration (int): The duration of the session in minutes.
+
+    Returns:
+        tuple: (available, reason) where reason explains the conflict, or is None if the trainer is available.
+    """
+    params = trainer_availability_params(trainer_id, start_datetime_str, duration)
+    if schedule_index.loaded:
+        conflict = schedule_index.trainer_conflict(trainer_id, params['start_time'], params['end_time'], MAINTENANCE_EXEMPT_SPECIALIZATIONS)
+        reason = AVAILABILITY_REASONS.get(conflict)
+    else:
+        reason = db.execute_query(TRAINER_AVAILABILITY_QUERY, params, fetch=True)[0][0]
+    return reason is None, reason
+
+
 def is_trainer_available(trainer_id, start_datetime_str, duration, session_type):
     """
     Checks if the trainer is available for a session at the given time, utilizing formatted datetime strings and considering equipment maintenance based on trainer specialization.
@@ -72,46 +148,9 @@ def is_trainer_available(trainer_id, start_datetime_str, duration, session_type)
         bool: True if the trainer is available, False otherwise.
     """
     try:
-        start_time = datetime.strptime(format_datetime_for_postgres(start_datetime_str), '%Y-%m-%d %H:%M:%S')
-        end_time = start_time + timedelta(minutes=duration)
-
-        # Check for unavailability due to equipment maintenance
-        if is_equipment_under_maintenance(db, start_datetime_str, duration):
-            query = "SELECT Specialization FROM Trainers WHERE TrainerID = %s"
-            specialization_result = db.execute_query(query, (trainer_id,), fetch=True)
-            specialization = specialization_result[0][0] if specialization_result else None
-
-            if specialization not in ['Weight Loss', 'Strength', 'Cardio', 'Rehab', 'Health']:
-                logging.debug(f"Session scheduling conflict due to equipment maintenance for {specialization}.")
-                return False
-
-        # Check for trainer-specific unavailability
-        query_unavailability = """
-        SELECT COUNT(*) FROM TrainerUnavailability
-        WHERE TrainerID = %s AND (
-            (StartTime <= %s AND EndTime > %s) OR
-            (StartTime < %s AND EndTime >= %s) OR
-            (StartTime <= %s AND EndTime >= %s)
-        );
-        """
-        params_unavailability = (trainer_id, start_time, start_time, end_time, end_time, start_time, end_time)
-        unavailability_result = db.execute_query(query_unavailability, params_unavailability, fetch=True)
-
-        if unavailability_result[0][0] > 0:
-            logging.debug("Trainer is not available due to specified unavailability.")
-            return False
-
-        # Check if the trainer has other overlapping appointments that are not canceled
-        query_appointments = """
-        SELECT COUNT(*) FROM MemberSchedule
-        WHERE TrainerID = %s AND NOT (
-            StartTime >= %s OR EndTime <= %s
-        ) AND Status != 'Cancelled';
-        """
-        params_appointments = (trainer_id, start_time, end_time)
-        appointments_result = db.execute_query(query_appointments, params_appointments, fetch=True)
-
-        available = appointments_result[0][0] == 0
+        available, reason = check_trainer_availability(trainer_id, start_datetime_str, duration)
+        if not available:
+            logging.debug(f"Trainer {trainer_id} is not available: {reason}")
         logging.info(f"Trainer {trainer_id} availability check for {session_type}: {available}")
         return available
     except Exception as e:
@@ -143,7 +182,7 @@ def get_date_time_input(year, month):
     minute = prompt_for_integer("Enter minute (0 or 30): ", 0, 30)
     if minute not in [0, 30]:
         raise ValueError("Minute must be 0 or 30.")
-    return datetime.datetime(year, month, day, hour, minute)
+    return datetime(year, month, day, hour, minute)
 
 def get_duration():
     """
@@ -166,3 +205,32 @@ def get_session_type():
         print(f"{idx + 1}. {type}")
     type_choice = prompt_for_integer("Choose session type (number): ", 1, len(session_types))
     return session_types[type_choice - 1]
+
+
+def prompt_for_optional_date(prompt_message):
+    """
+    Asks for a date in MM/DD/YYYY format. Returns None if the input is left blank.
+    """
+    while True:
+        input_value = input(prompt_message).strip()
+        if not input_value:
+            return None
+        try:
+            return datetime.strptime(input_value, '%m/%d/%Y')
+        except ValueError:
+            print("Invalid date. Please use MM/DD/YYYY or leave it blank.")
+
+
+def prompt_for_optional_choice(prompt_message, choices):
+    """
+    Asks the user to pick one of the choices by number. Returns None if the input is left blank.
+    """
+    for idx, choice in enumerate(choices):
+        print(f"{idx + 1}. {choice}")
+    while True:
+        input_value = input(prompt_message).strip()
+        if not input_value:
+            return None
+        if input_value.isdigit() and 1 <= int(input_value) <= len(choices):
+            return choices[int(input_value) - 1]
+        print(f"Invalid input. Please enter a number between 1 and {len(choices)} or leave it blank.")